@@ -0,0 +1,90 @@
+from functools import cached_property
+
+import librosa
+import numpy as np
+
+
+class AnalysisContext:
+    # Per-file intermediates shared across checks; each one is computed on first use only
+    def __init__(self, checker, file_path):
+        self.checker = checker
+        self.file_path = file_path
+        self._views = {}  # analysis rate -> ResampledContext
+
+    def at_rate(self, sr):
+        # This file as seen at analysis rate sr, derived from the native decode once per rate; None keeps
+        # the native data. Nothing is decoded or resampled until the view's audio is first used.
+        if sr is None:
+            return self
+        view = self._views.get(sr)
+        if view is None:
+            view = self._views[sr] = ResampledContext(self, sr)
+        return view
+
+    @cached_property
+    def audio(self):
+        return self.checker.load_audio(self.file_path)
+
+    @property
+    def y(self):
+        return self.audio[0]
+
+    @property
+    def sr(self):
+        return self.audio[1]
+
+    @property
+    def loaded(self):
+        return self.y is not None and self.sr is not None
+
+    @cached_property
+    def mono(self):
+        # Downmix for the spectral checks; y itself keeps every channel, as (channels, samples)
+        return self.y.mean(axis=0) if self.y.ndim > 1 else self.y
+
+    @cached_property
+    def stft_magnitude(self):
+        return np.abs(librosa.stft(self.mono))
+
+    @cached_property
+    def rms_frames(self):
+        return librosa.feature.rms(y=self.mono)
+
+    @cached_property
+    def channel_layout(self):
+        num_channels = self.y.shape[0] if self.y.ndim > 1 else 1
+        return 'stereo' if num_channels > 1 else 'mono', num_channels
+
+    def clear(self):
+        for name in ('audio', 'mono', 'stft_magnitude', 'rms_frames', 'channel_layout'):
+            self.__dict__.pop(name, None)
+
+    def release(self):
+        for view in self._views.values():
+            view.clear()
+        self._views.clear()
+        self.clear()
+        self.checker.release_audio(self.file_path)
+
+
+class ResampledContext(AnalysisContext):
+    # A low-rate view of a native context for checks that do not need the full bandwidth; rates at or
+    # above the native one just share the native data
+    def __init__(self, parent, sr):
+        super().__init__(parent.checker, parent.file_path)
+        self.parent = parent
+        self.target_sr = sr
+
+    @cached_property
+    def audio(self):
+        if not self.parent.loaded or self.target_sr >= self.parent.sr:
+            return self.parent.audio
+        with self.checker.instrumentation.timer('resample_s'):
+            y = librosa.resample(self.parent.y, orig_sr=self.parent.sr, target_sr=self.target_sr)
+        return y, self.target_sr
+
+    def at_rate(self, sr):
+        return self.parent.at_rate(sr)
+
+    def release(self):
+        self.parent.release()
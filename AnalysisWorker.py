@@ -0,0 +1,35 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class AnalysisWorker(QThread):
+    # Runs a BatchAnalyzer off the GUI thread and streams one record per finished file
+    result_ready = pyqtSignal(dict)
+    progress = pyqtSignal(int, int)  # files done, files total
+    failed = pyqtSignal(str)
+
+    def __init__(self, analyzer, file_paths, checks, parent=None, total=None, expectations=None):
+        # file_paths may be lazy (manifest rows), in which case total gives their number
+        super().__init__(parent)
+        self.analyzer = analyzer
+        self.file_paths = file_paths
+        self.checks = checks
+        self.total = len(file_paths) if total is None else total
+        self.expectations = expectations
+
+    def run(self):
+        total = max(self.total, 1)
+        try:
+            for done, record in enumerate(self.analyzer.run(self.file_paths, self.checks, self.expectations),
+                                          start=1):
+                self.result_ready.emit(record)
+                self.progress.emit(done, total)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+    def cancel(self):
+        # Files already being analysed finish; nothing new is scheduled
+        self.analyzer.cancel()
+
+    @property
+    def cancelled(self):
+        return self.analyzer.cancelled
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+
+class AudioCache:
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes  # None disables eviction
+        self._entries = OrderedDict()  # file_path -> (y, sr), least recently used first
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def entry_size(entry):
+        y = entry[0]
+        return getattr(y, 'nbytes', 0)
+
+    def __contains__(self, file_path):
+        return file_path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, file_path):
+        entry = self._entries.get(file_path)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(file_path)
+        return entry
+
+    def put(self, file_path, entry):
+        self.discard(file_path)
+        size = self.entry_size(entry)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Larger than the whole budget: hand it back to the caller without keeping it
+            return entry
+        self._entries[file_path] = entry
+        self.resident_bytes += size
+        self._evict()
+        return entry
+
+    def discard(self, file_path):
+        entry = self._entries.pop(file_path, None)
+        if entry is not None:
+            self.resident_bytes -= self.entry_size(entry)
+        return entry is not None
+
+    def clear(self):
+        self._entries.clear()
+        self.resident_bytes = 0
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self.resident_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.resident_bytes -= self.entry_size(entry)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'resident_bytes': self.resident_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -1,24 +1,195 @@
 import os
+import sys
 
 import librosa
 import numpy as np
-from pydub.utils import mediainfo
+
+from AnalysisContext import AnalysisContext
+from AudioCache import AudioCache
+from AudioProbe import AudioProbe, ffprobe_info
+from BandwidthEstimator import BandwidthEstimator, closest_standard_rate
+from ChannelMetrics import ChannelMetrics
+from ClipStack import ClipStack
+from ClippingEvents import ClippingEvents
+from CopyPasteMatcher import CopyPasteMatcher
+from FeatureCache import MISSING
+from Instrumentation import NULL_INSTRUMENTATION
+from SelfSimilarity import SelfSimilarity
+
+# Checks that only look at level or spectral shape well below Nyquist and may run on a low-rate view;
+# sampling rate, bandwidth and clipping always see the native decode
+LOW_RATE_CHECKS = ('noise', 'snr', 'reverb', 'copy_paste', 'repeats')
+# Checks whose features stack_features computes for a whole group of short clips at once
+STACKED_CHECKS = ('noise', 'snr', 'clipping', 'reverb')
+RMS_FRAME_PARAMS = {'frame_length': 2048, 'hop_length': 512}
+
+
+def low_rate_profile(sr):
+    # Analysis-rate profile running every low-rate check at sr (None: everything at the native rate)
+    return {check: sr for check in LOW_RATE_CHECKS} if sr else {}
+
+
+def _feature_key(name, params):
+    return name, tuple(sorted(params.items())) if params else ()
+
 
 class AudioFileChecker:
-    def __init__(self, supported_formats, target_rate):
+    def __init__(self, supported_formats, target_rate, cache_max_bytes=1024 * 1024 * 1024, feature_cache=None,
+                 analysis_rates=None):
         self.supported_formats = supported_formats
         self.target_rate = target_rate
-        self.audio_cache = {}  # Cache for loaded audio files to avoid redundant loads
+        # Decoded audio is kept under a byte budget and evicted least recently used first
+        self.audio_cache = AudioCache(cache_max_bytes)
+        # Prepared copy/paste sources, sized by their pattern spectrograms
+        self.spectrogram_cache = AudioCache(cache_max_bytes // 4 if cache_max_bytes is not None else None)
+        # Optional FeatureCache persisting measurements across runs, keyed by file identity and parameters
+        self.feature_cache = feature_cache
+        # Container metadata is read from file headers; only unparsable formats fall back to ffprobe
+        self.audio_probe = AudioProbe(fallback=self._ffprobe_info)
+        # Set per file by the batch engine when timings are collected
+        self.instrumentation = NULL_INSTRUMENTATION
+        # check -> analysis rate in Hz for the checks in LOW_RATE_CHECKS; missing checks run at the native rate
+        self.analysis_rates = {check: sr for check, sr in (analysis_rates or {}).items()
+                               if check in LOW_RATE_CHECKS and sr}
+        # file path -> {feature key: value} filled by stack_features and dropped when the file is released
+        self._precomputed = {}
 
     def load_audio(self, file_path):
-        if file_path not in self.audio_cache:
+        entry = self.audio_cache.get(file_path)
+        if entry is None:
             try:
-                y, sr = librosa.load(file_path, sr=None)
-                self.audio_cache[file_path] = (y, sr)
+                with self.instrumentation.timer('decode_s'):
+                    y, sr = self.decode_audio(file_path)
+                if self.instrumentation.enabled:
+                    self.instrumentation.add('bytes_read', os.path.getsize(file_path))
+                entry = self.audio_cache.put(file_path, (y, sr))
             except Exception as e:
-                print(f"Error loading audio: {e}")
+                print(f"Error loading audio: {e}", file=sys.stderr)
                 return None, None
-        return self.audio_cache[file_path]
+        return entry
+
+    def decode_audio(self, file_path):
+        # Touches no cache or instrumentation, so read-ahead threads can call it. Every channel is kept:
+        # y is (samples,) for mono and (channels, samples) otherwise
+        return librosa.load(file_path, sr=None, mono=False)
+
+    def adopt_audio(self, file_path, entry):
+        # Audio decoded ahead of time becomes the cached decode of file_path
+        return self.audio_cache.put(file_path, entry)
+
+    def decoded_size_hint(self, file_path):
+        # Bytes of float32 samples a decode of file_path will take, from its container header when that
+        # gives a duration and from the file size otherwise
+        try:
+            info = self.probe_info(file_path)
+            if info.get('duration') and info.get('sample_rate'):
+                return int(info['duration'] * info['sample_rate']) * (info.get('channels') or 1) * 4
+        except Exception:
+            pass
+        return os.path.getsize(file_path) * 4
+
+    def release_audio(self, file_path):
+        # Called once the last check for a file is done so a batch runs in constant memory
+        self.spectrogram_cache.discard(file_path)
+        self._precomputed.pop(file_path, None)
+        return self.audio_cache.discard(file_path)
+
+    def cache_stats(self):
+        return self.audio_cache.stats()
+
+    def _ffprobe_info(self, file_path):
+        with self.instrumentation.timer('ffprobe_s'):
+            return self.cached_feature(file_path, 'ffprobe_info', None, lambda: ffprobe_info(file_path))
+
+    def probe_info(self, file_path):
+        return self.audio_probe.probe(file_path)
+
+    def probe_many(self, file_paths):
+        return self.audio_probe.probe_many(file_paths)
+
+    def analysis_context(self, file_path):
+        return AnalysisContext(self, file_path)
+
+    def context_for(self, check, context):
+        # The view of context at check's analysis rate
+        return context.at_rate(self.analysis_rates.get(check))
+
+    def rate_params(self, check, params):
+        # Features computed on a low-rate view are cached apart from their native-rate values
+        sr = self.analysis_rates.get(check)
+        if sr is None:
+            return params
+        return dict(params or {}, rate=sr)
+
+    def decoding_features(self, checks, rate_estimator='dominant', rate_frames=64, clipping_threshold=0.99,
+                          repeat_min_seconds=1.0):
+        # (name, params) of the cached features behind the decoding checks among checks, as the check methods
+        # look them up; a file with every one of them in the feature cache is analysed without a decode
+        features = []
+        if 'sampling_rate' in checks:
+            if rate_estimator == 'bandwidth':
+                n_fft = BandwidthEstimator(max_frames=rate_frames).n_fft
+                features.append(('bandwidth', {'n_fft': n_fft, 'max_frames': rate_frames}))
+            else:
+                features.append(('dominant_max_freq', {'n_fft': 2048}))
+        for check in ('noise', 'snr'):
+            if check in checks:
+                features.append(('frame_rms_summary', self.rate_params(check, RMS_FRAME_PARAMS)))
+        if 'clipping' in checks:
+            features += [('signal_extent', None), ('clipping_events', {'threshold': clipping_threshold})]
+        if 'reverb' in checks:
+            features.append(('signal_rms', self.rate_params('reverb', None)))
+        if 'channel_mode' in checks:
+            features.append(('channel_metrics', dict(RMS_FRAME_PARAMS, threshold=clipping_threshold)))
+        if 'repeats' in checks:
+            finder = SelfSimilarity(min_seconds=repeat_min_seconds)
+            features.append(('repeated_segments', self.rate_params('repeats', finder.params())))
+        return features
+
+    def features_cached(self, file_path, features):
+        # Whether the feature cache holds all of features (see decoding_features) for file_path
+        if self.feature_cache is None:
+            return False
+        return all(self.feature_cache.contains(file_path, name, params) for name, params in features)
+
+    def cached_feature(self, file_path, name, params, compute):
+        precomputed = self._precomputed.get(file_path)
+        if precomputed is not None:
+            value = precomputed.get(_feature_key(name, params), MISSING)
+            if value is not MISSING:
+                return value
+        if self.feature_cache is None:
+            return compute()
+        value = self.feature_cache.get(file_path, name, params)
+        if value is not MISSING:
+            return value
+        value = compute()
+        if value is not None:
+            self.feature_cache.put(file_path, name, value, params)
+        return value
+
+    def _dominant_max_freq(self, context):
+        if not context.loaded:
+            return None
+
+        # Short-Time Fourier Transform (STFT) magnitude, shared with any other check on this context
+        stft = context.stft_magnitude
+
+        freqs = librosa.fft_frequencies(sr=context.sr)
+        max_freq_index = np.argmax(stft, axis=0)
+        return float(freqs[max_freq_index].max())
+
+    def _rms_summary(self, context):
+        if not context.loaded:
+            return None
+        rms = context.rms_frames
+        return {'mean': float(np.mean(rms)), 'p10': float(np.percentile(rms, 10))}
+
+    def _signal_rms(self, context):
+        if not context.loaded:
+            return None
+        y = context.y
+        return float(np.sqrt(np.mean(y**2)))
 
     def check_format(self, file_path):
         try:
@@ -27,71 +198,133 @@ class AudioFileChecker:
         except Exception as e:
             return False, None
 
-    def check_sampling_rate(self, file_path, target_rates):
-        sample_rates = [8000, 11025, 16000, 22050, 32000, 44100, 48000, 88200, 96000, 176400, 192000, 384000]
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
-            return False, None
-
-        # Compute Short-Time Fourier Transform (STFT) to analyze frequency content
-        stft = np.abs(librosa.stft(y))
+    def estimate_bandwidth(self, file_path, max_frames=64, context=None):
+        # (cutoff Hz, confidence) from a fixed number of sampled frames; see BandwidthEstimator
+        context = context or self.analysis_context(file_path)
+        estimator = BandwidthEstimator(max_frames=max_frames)
+
+        def compute():
+            if not context.loaded:
+                return None
+            return list(estimator.estimate(context.y, context.sr))
+
+        estimate = self.cached_feature(file_path, 'bandwidth', {'n_fft': estimator.n_fft, 'max_frames': max_frames},
+                                       compute)
+        if estimate is None:
+            return None, 0.0
+        return estimate[0], estimate[1]
+
+    def check_sampling_rate(self, file_path, target_rates, context=None, mode='dominant', max_frames=64):
+        # mode 'dominant' maps twice the highest per-frame dominant frequency of a full STFT to a standard
+        # rate; mode 'bandwidth' uses the spectral cutoff of max_frames sampled frames instead
+        rate_ok, closest_sample_rate, _, _ = self.assess_sampling_rate(file_path, target_rates, context, mode,
+                                                                       max_frames)
+        return rate_ok, closest_sample_rate
 
-        # Compute the effective sampling rate
-        freqs = librosa.fft_frequencies(sr=sr)
-        max_freq_index = np.argmax(stft, axis=0)
-        max_freq = freqs[max_freq_index].max()
-        effective_sr = max_freq * 2
+    def assess_sampling_rate(self, file_path, target_rates, context=None, mode='dominant', max_frames=64):
+        # check_sampling_rate plus the frequency it was derived from and, in mode 'bandwidth', the estimate's
+        # confidence (None otherwise): (rate ok, rate, frequency Hz, confidence)
+        context = context or self.analysis_context(file_path)
+        confidence = None
+        if mode == 'bandwidth':
+            max_freq, confidence = self.estimate_bandwidth(file_path, max_frames, context=context)
+        else:
+            max_freq = self.cached_feature(file_path, 'dominant_max_freq', {'n_fft': 2048},
+                                           lambda: self._dominant_max_freq(context))
+        if max_freq is None:
+            return False, None, None, confidence
 
-        # Find closest sample rate
-        closest_sample_rate = min(sample_rates, key=lambda x: abs(x - effective_sr))
+        # Find closest sample rate to the effective sampling rate
+        closest_sample_rate = closest_standard_rate(max_freq)
         rate_ok = closest_sample_rate in target_rates
-        return rate_ok, closest_sample_rate
-
-    def calculate_rms(self, file_path, noise_threshold_db=50):
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
+        return rate_ok, closest_sample_rate, max_freq, confidence
+
+    def calculate_rms(self, file_path, noise_threshold_db=50, context=None):
+        context = self.context_for('noise', context or self.analysis_context(file_path))
+        summary = self.cached_feature(file_path, 'frame_rms_summary',
+                                      self.rate_params('noise', RMS_FRAME_PARAMS),
+                                      lambda: self._rms_summary(context))
+        if summary is None:
             return None, False
-        rms = np.mean(librosa.feature.rms(y=y))
+        rms = summary['mean']
         rms_db = librosa.amplitude_to_db([rms])[0]
         return rms_db, rms_db < noise_threshold_db
 
-    def calculate_snr(self, file_path):
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
+    def calculate_snr(self, file_path, snr_threshold_db=15, context=None):
+        context = self.context_for('snr', context or self.analysis_context(file_path))
+        summary = self.cached_feature(file_path, 'frame_rms_summary',
+                                      self.rate_params('snr', RMS_FRAME_PARAMS),
+                                      lambda: self._rms_summary(context))
+        if summary is None:
             return None, False
 
         epsilon = 1e-10
-        signal_power = np.mean(librosa.feature.rms(y=y)) + epsilon
-        noise_power = np.percentile(librosa.feature.rms(y=y), 10) + epsilon
+        signal_power = summary['mean'] + epsilon
+        noise_power = summary['p10'] + epsilon
 
         if noise_power == 0 or signal_power == 0:
             return None, False
 
         snr_db = 20 * np.log10(signal_power / noise_power)
-        return snr_db, snr_db >= 15
+        return snr_db, snr_db >= snr_threshold_db
 
-    def detect_clipping(self, file_path, clipping_threshold=0.99):
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
-            return False, []
+    def _signal_extent(self, context):
+        if not context.loaded:
+            return None
+        return {'samples': int(context.y.shape[-1]), 'channels': context.channel_layout[1], 'sr': int(context.sr)}
 
-        clipping_points = np.where(np.abs(y) > clipping_threshold)[0]
-        return len(clipping_points) > 0, clipping_points
+    def _clipping_runs(self, context, clipping_threshold):
+        if not context.loaded:
+            return None
+        return ClippingEvents.from_signal(context.y, context.sr, clipping_threshold).events
+
+    def detect_clipping(self, file_path, clipping_threshold=0.99, context=None):
+        # Returns (clipping found, ClippingEvents); clipped samples are kept as runs, not as indices
+        context = context or self.analysis_context(file_path)
+        extent = self.cached_feature(file_path, 'signal_extent', None, lambda: self._signal_extent(context))
+        events = self.cached_feature(file_path, 'clipping_events', {'threshold': clipping_threshold},
+                                     lambda: self._clipping_runs(context, clipping_threshold))
+        if extent is None or events is None:
+            return False, None
 
-    def check_channel_mode(self, file_path):
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
-            return None, 0
+        clipping = ClippingEvents(events, extent['samples'], extent['sr'], extent['channels'])
+        return clipping.event_count > 0, clipping
+
+    def check_channel_mode(self, file_path, context=None):
+        try:
+            num_channels = self.probe_info(file_path).get('channels')
+        except Exception as e:
+            print(f"Error probing {file_path}: {e}", file=sys.stderr)
+            num_channels = None
+
+        if not num_channels:
+            context = context or self.analysis_context(file_path)
+            if not context.loaded:
+                return None, 0
+            return context.channel_layout
 
-        num_channels = y.shape[0] if len(y.shape) > 1 else 1
         return 'stereo' if num_channels > 1 else 'mono', num_channels
 
+    def channel_metrics(self, file_path, clipping_threshold=0.99, context=None):
+        # Per-channel level, SNR, peak, clipping and DC offset plus inter-channel correlation, see ChannelMetrics
+        context = context or self.analysis_context(file_path)
+
+        def compute():
+            if not context.loaded:
+                return None
+            return ChannelMetrics.from_signal(context.y, clipping_threshold).to_dict()
+
+        values = self.cached_feature(file_path, 'channel_metrics',
+                                     {'threshold': clipping_threshold, 'frame_length': 2048, 'hop_length': 512},
+                                     compute)
+        return ChannelMetrics.from_dict(values) if values is not None else None
+
     def check_bit_depth(self, file_path, bit_rates):
         try:
-            info = mediainfo(file_path)
+            info = self.probe_info(file_path)
 
-            codec = info.get('codec_name', '').lower()
-            format_name = info.get('format', '').lower()
+            codec = (info.get('codec_name') or '').lower()
+            format_name = (info.get('format_name') or '').lower()
 
             # bits_per_sample kontrolü
             bit_depth_value = info.get('bits_per_sample', None)
@@ -107,49 +340,127 @@ class AudioFileChecker:
             return bit_depth, str(bit_depth) in bit_rates
 
         except Exception as e:
-            print(f"Error processing {file_path}: {e}")
+            print(f"Error processing {file_path}: {e}", file=sys.stderr)
             return None, False
 
-    def calculate_reverb(self, file_path):
-        y, sr = self.load_audio(file_path)
-        if y is None or sr is None:
-            return None
-
-        return np.sqrt(np.mean(y**2))
+    def check_expectations(self, file_path, expected):
+        # (field, expected, found) for every value of a manifest entry's expectations (see Manifest) that the
+        # file does not match; read from the container header, so no decode. A value the header does not
+        # give (the bit depth of lossy formats) is reported as found None.
+        info = self.probe_info(file_path)
+        found = {'sample_rate': info.get('sample_rate'), 'bit_depth': info.get('bits_per_sample'),
+                 'channels': info.get('channels'), 'format': self.check_format(file_path)[1]}
+        return [(name, value, found.get(name)) for name, value in expected.items() if found.get(name) != value]
+
+    def calculate_reverb(self, file_path, context=None):
+        context = self.context_for('reverb', context or self.analysis_context(file_path))
+        return self.cached_feature(file_path, 'signal_rms', self.rate_params('reverb', None),
+                                   lambda: self._signal_rms(context))
+
+    def stack_features(self, file_paths, checks, clipping_threshold=0.99, max_seconds=30.0):
+        # Computes what the STACKED_CHECKS among checks measure for a group of short clips in stacked passes
+        # over all of them (see ClipStack) and keeps the values until each file is released, so the per-file
+        # methods then find them ready. Values already in the feature cache are taken from it; clips longer
+        # than max_seconds, or that fail to decode, are left to the per-file path.
+        wanted = []  # (feature name, params, check whose analysis rate applies, measurement)
+        for check in ('noise', 'snr'):
+            if check in checks:
+                wanted.append(('frame_rms_summary', self.rate_params(check, RMS_FRAME_PARAMS), check, 'frame_rms'))
+        if 'clipping' in checks:
+            wanted.append(('clipping_events', {'threshold': clipping_threshold}, None, 'clipping'))
+        if 'reverb' in checks:
+            wanted.append(('signal_rms', self.rate_params('reverb', None), 'reverb', 'energy'))
+
+        contexts = [self.analysis_context(file_path) for file_path in file_paths]
+        stacks = {}
+        for name, params, check, measurement in wanted:
+            key = _feature_key(name, params)
+            views = []
+            for context in contexts:
+                precomputed = self._precomputed.setdefault(context.file_path, {})
+                if key in precomputed:
+                    continue
+                if self.feature_cache is not None:
+                    value = self.feature_cache.get(context.file_path, name, params)
+                    if value is not MISSING:
+                        precomputed[key] = value
+                        continue
+                view = self.context_for(check, context)
+                if not view.loaded:
+                    precomputed[key] = None
+                elif 0 < view.y.shape[-1] <= max_seconds * view.sr:
+                    views.append(view)
+            if not views:
+                continue
+
+            # Features of the same views share their pack: level and SNR need the mono downmix, clipping and
+            # energy every channel, and a group of mono files has one pack for all of them
+            downmix = measurement == 'frame_rms' and any(view.y.ndim > 1 for view in views)
+            stack_key = (self.analysis_rates.get(check), downmix, tuple(view.file_path for view in views))
+            stack = stacks.get(stack_key)
+            if stack is None:
+                stack = stacks[stack_key] = ClipStack([view.mono if downmix else view.y for view in views])
+            if measurement == 'frame_rms':
+                values = stack.frame_rms_summaries(**RMS_FRAME_PARAMS)
+            elif measurement == 'clipping':
+                values = stack.clipping_runs(clipping_threshold)
+            else:
+                values = stack.energies()
+            for view, value in zip(views, values):
+                self._precomputed[view.file_path][key] = value
+                if self.feature_cache is not None:
+                    self.feature_cache.put(view.file_path, name, value, params)
+
+    def find_repeated_segments(self, file_path, min_seconds=1.0, context=None):
+        # Stretches of at least min_seconds that occur twice within the file (a phrase duplicated by an
+        # edit); returns (found, SEGMENT_DTYPE array of source/target offsets), see SelfSimilarity
+        context = self.context_for('repeats', context or self.analysis_context(file_path))
+        finder = SelfSimilarity(min_seconds=min_seconds)
+
+        def compute():
+            if not context.loaded:
+                return None
+            return finder.find(context.y, context.sr)
+
+        segments = self.cached_feature(file_path, 'repeated_segments', self.rate_params('repeats', finder.params()),
+                                       compute)
+        if segments is None:
+            return False, None
+        return len(segments) > 0, segments
 
     import os  # Dosya adını almak için os modülünü dahil ediyoruz.
 
-    def detect_copy_paste(self, source_file, target_file):
-        y_source, sr_source = self.load_audio(source_file)
-        y_target, sr_target = self.load_audio(target_file)
-
-        if y_source is None or y_target is None:
-            return False, "Audio files could not be loaded."
-
-        source_spectrogram = np.abs(librosa.stft(y_source))
-        target_spectrogram = np.abs(librosa.stft(y_target))
-
-        source_half_length = source_spectrogram.shape[1] // 2
-        source_half_spectrogram = source_spectrogram[:, :source_half_length]
-
-        target_length = target_spectrogram.shape[1]
+    def copy_paste_source(self, source_file):
+        # The source pattern is prepared once and reused for every target it is compared against
+        entry = self.spectrogram_cache.get(source_file)
+        if entry is None:
+            # Prepared at the same analysis rate as the targets so their spectrogram frames line up
+            context = self.context_for('copy_paste', self.analysis_context(source_file))
+            if not context.loaded:
+                return None
+            matcher = CopyPasteMatcher(context.stft_magnitude, context.sr)
+            entry = self.spectrogram_cache.put(source_file, (matcher, context.sr))
+        return entry[0]
+
+    def find_copy_paste(self, source_file, target_file, target_context=None):
+        matcher = self.copy_paste_source(source_file)
+        target_context = self.context_for('copy_paste', target_context or self.analysis_context(target_file))
+        if matcher is None or not target_context.loaded:
+            return None
 
-        pattern_length = min(source_half_length, target_length)
+        return matcher.find_matches(target_context.stft_magnitude)
 
-        pattern = source_half_spectrogram[:, :pattern_length]
-        spectrogram_to_search = target_spectrogram
+    def detect_copy_paste(self, source_file, target_file, target_context=None):
+        matches = self.find_copy_paste(source_file, target_file, target_context)
 
-        search_length = spectrogram_to_search.shape[1]
-        match_indices = []
-        for start in range(search_length - pattern_length + 1):
-            segment = spectrogram_to_search[:, start:start + pattern_length]
-            if np.all(np.isclose(segment, pattern, atol=1e-1)):
-                match_indices.append(start)
+        if matches is None:
+            return False, "Audio files could not be loaded."
 
-        if match_indices:
+        if matches:
             target_file_name = os.path.basename(target_file)
-            return True, f"Copy/paste detected at file: {target_file_name}"
+            offset, score = matches[0]
+            offset_seconds = self.copy_paste_source(source_file).offset_seconds(offset)
+            return True, (f"Copy/paste detected at file: {target_file_name} "
+                          f"({len(matches)} match(es), first at {offset_seconds:.2f}s, score {score:.3f})")
         else:
             return False, "No copy-paste pattern found."
-
-
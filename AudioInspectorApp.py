@@ -1,36 +1,60 @@
+import multiprocessing
 import os
 import sys
-import numpy as np
-import pandas as pd
-from PyQt5.QtGui import QPixmap, QIcon
+from PyQt5.QtGui import QPixmap, QIcon, QImage
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton,
-                             QFileDialog, QLabel, QVBoxLayout, QWidget, QListWidget,
-                             QProgressBar, QTextEdit, QComboBox, QLineEdit, QHBoxLayout)
-from PyQt5.QtCore import Qt
-from matplotlib import pyplot as plt
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-import AudioFileChecker
+                             QFileDialog, QLabel, QVBoxLayout, QWidget, QListView, QAbstractItemView,
+                             QProgressBar, QTextEdit, QComboBox, QLineEdit, QHBoxLayout, QSpinBox,
+                             QCheckBox)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+import AnalysisWorker
+import ResultTable
+from FileListModel import FileListModel
+from Instrumentation import TimingSummary
+
+# numpy, pandas, matplotlib, reportlab and the analysis modules (librosa) are imported where they
+# are first needed so the window appears without paying for them; see benchmarks/startup_time.py
 
 
 class AudioInspectorApp(QMainWindow):
+    # Manifests are read on the analysis thread, so their skipped lines reach the display through a signal
+    manifest_line_skipped = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
-        self.result_text = None
         self.add_format_button = None
         self.new_format_input = None
         self.supported_formats = ['wav', 'mp3', 'flac', 'm4a']
         self.target_rates = [44100, 48000]
         self.bit_rates = [8, 16, 24, 32]
         self.current_bit_rates = [str(bit) for bit in self.bit_rates]
-        self.audio_checker = AudioFileChecker.AudioFileChecker(self.supported_formats, self.target_rates)
+        self._audio_checker = None
         self.current_analysis = None
-        self.noise_levels = []
-        self.snr_levels = []
-        self.clipping_data = []
-        self.channel_modes = []
+        self.analysis_worker = None
+        self.all_files_valid = True
+        self.invalid_result_count = 0
+        self.pending_rows = []  # table rows received but not drawn yet
+        self.skipped_manifest_lines = 0
+        self.replaced_results = False  # a merged batch re-analysed files already shown
+        self.result_table = ResultTable.ResultTable()  # merged across batches in watch mode
+        self.merging_results = False
+        self.timing_summary = None  # per-check timings of the current or last batch
+        self.statistics_png = None  # (table revision, analysis type, PNG bytes) shared by the exports
+        self.statistics_plots = None  # StatisticsPlots, created on first use and redrawn in place
+        self.folder_watcher = None
+        self.watch_analyzer = None
+        self.watch_queue = []
 
         self.initUI()
+        self.manifest_line_skipped.connect(self.on_manifest_line_skipped)
+
+        self.result_flush_timer = QTimer(self)
+        self.result_flush_timer.setInterval(100)
+        self.result_flush_timer.timeout.connect(self.flush_results)
+
+        self.watch_timer = QTimer(self)
+        self.watch_timer.setInterval(1000)
+        self.watch_timer.timeout.connect(self.poll_watch_folder)
 
     def initUI(self):
         self.setWindowTitle('Audio File Inspection Toolkit')
@@ -88,22 +112,48 @@ class AudioInspectorApp(QMainWindow):
                                     """)
         self.copy_paste_button.clicked.connect(self.upload_source_file)
 
+        self.watch_button = QPushButton('Watch Folder', self)
+        self.watch_button.setStyleSheet(""" 
+                                        QPushButton {
+                                            background-color: #16a085;
+                                            color: white;
+                                            border: none;
+                                            padding: 10px;
+                                            border-radius: 5px;
+                                            font-size: 14px;
+                                            width: 160px;
+                                            height: 20px;
+                                        }
+                                        QPushButton:hover {
+                                            background-color: #138d75;
+                                        }
+                                    """)
+        self.watch_button.clicked.connect(self.toggle_watch_folder)
+
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.copy_paste_button)
+        button_layout.addWidget(self.watch_button)
         button_layout.addWidget(self.exit_button)
         button_layout.addStretch()
         layout.addLayout(button_layout)
 
-        self.file_list = QListWidget(self)
-        self.file_list.setSelectionMode(QListWidget.MultiSelection)
+        # Rows are read from the model only when drawn, so a manifest of a million files is never materialised
+        self.file_list_model = FileListModel(self)
+        self.file_list = QListView(self)
+        self.file_list.setModel(self.file_list_model)
+        self.file_list.setUniformItemSizes(True)
+        # The view still walks every row to lay them out; in batches the window stays responsive meanwhile
+        self.file_list.setLayoutMode(QListView.Batched)
+        self.file_list.setBatchSize(10000)
+        self.file_list.setSelectionMode(QAbstractItemView.MultiSelection)
         self.file_list.setStyleSheet(""" 
-                            QListWidget {
+                            QListView {
                                 background-color: #f9f9f9;
                                 border: 1px dashed #ccc;
                                 border-radius: 5px;
                                 padding: 10px;
                             }
-                            QListWidget::item:hover {
+                            QListView::item:hover {
                                 background-color: #e0e0e0;
                             }
                         """)
@@ -149,6 +199,7 @@ class AudioInspectorApp(QMainWindow):
             "Analyze Reverb",
             "Inspect Channel Mode",
             "Verify Bit Depth",
+            "Detect Repeated Segments",
             "Copy/Paste Detect"
         ])
         layout.addWidget(self.analysis_type)
@@ -398,9 +449,9 @@ class AudioInspectorApp(QMainWindow):
         layout.addLayout(bit_rate_layout)
 
         # Analyze Selected button
-        analyze_button = QPushButton('Analyze Selected', self)
-        analyze_button.clicked.connect(self.perform_analysis)
-        analyze_button.setStyleSheet(""" 
+        self.analyze_button = QPushButton('Analyze Selected', self)
+        self.analyze_button.clicked.connect(self.perform_analysis)
+        self.analyze_button.setStyleSheet(""" 
                             QPushButton {
                                 background-color: #007BFF;
                                 color: white;
@@ -412,12 +463,12 @@ class AudioInspectorApp(QMainWindow):
                                 background-color: #0056b3;
                             }
                         """)
-        button_layout.addWidget(analyze_button)
+        button_layout.addWidget(self.analyze_button)
 
         # Run All Analyses button
-        all_analysis_button = QPushButton('Run All Analyses', self)
-        all_analysis_button.clicked.connect(self.perform_all_analyses)
-        all_analysis_button.setStyleSheet(""" 
+        self.all_analysis_button = QPushButton('Run All Analyses', self)
+        self.all_analysis_button.clicked.connect(self.perform_all_analyses)
+        self.all_analysis_button.setStyleSheet(""" 
                             QPushButton {
                                 background-color: #FF5733;
                                 color: white;
@@ -429,7 +480,22 @@ class AudioInspectorApp(QMainWindow):
                                 background-color: #0056b3;
                             }
                         """)
-        button_layout.addWidget(all_analysis_button)
+        button_layout.addWidget(self.all_analysis_button)
+
+        # Number of worker processes used by the batch engine
+        button_layout.addWidget(QLabel("Workers:", self))
+        self.worker_count_input = QSpinBox(self)
+        self.worker_count_input.setRange(1, max(1, os.cpu_count() or 1) * 2)
+        self.worker_count_input.setValue(os.cpu_count() or 1)
+        self.worker_count_input.setStyleSheet("""
+                            QSpinBox {
+                                background-color: #ffffff;
+                                border: 1px solid #ccc;
+                                padding: 5px;
+                                font-size: 14px;
+                            }
+                        """)
+        button_layout.addWidget(self.worker_count_input)
 
         layout.addLayout(button_layout)
 
@@ -448,6 +514,13 @@ class AudioInspectorApp(QMainWindow):
         self.result_display.setMinimumHeight(240)
         layout.addWidget(self.result_display)
 
+        # The statistics plot is shown beside the results rather than in them, so redrawing it never touches
+        # the result history
+        self.statistics_view = QLabel(self)
+        self.statistics_view.setAlignment(Qt.AlignCenter)
+        self.statistics_view.hide()
+        layout.addWidget(self.statistics_view)
+
         self.download_buttons_layout = QHBoxLayout()
 
         self.pdf_button = QPushButton('Download Results as PDF', self)
@@ -498,6 +571,22 @@ class AudioInspectorApp(QMainWindow):
                         """)
         self.download_buttons_layout.addWidget(self.csv_button)
 
+        self.parquet_button = QPushButton('Download Results as Parquet', self)
+        self.parquet_button.clicked.connect(self.download_parquet)
+        self.parquet_button.setStyleSheet(""" 
+                            QPushButton {
+                                background-color: #8e44ad;
+                                color: white;
+                                border: none;
+                                padding: 10px;
+                                border-radius: 5px;
+                            }
+                            QPushButton:hover {
+                                background-color: #7d3c98;
+                            }
+                        """)
+        self.download_buttons_layout.addWidget(self.parquet_button)
+
         self.statistics_button = QPushButton('Download Statistics', self)
         self.statistics_button.clicked.connect(self.download_statistics)  # Placeholder for the function
         self.statistics_button.setStyleSheet(""" 
@@ -549,7 +638,37 @@ class AudioInspectorApp(QMainWindow):
     """)
         self.progress_bar.setValue(0)
         self.progress_bar.setTextVisible(True)
-        layout.addWidget(self.progress_bar)
+
+        self.cancel_button = QPushButton('Cancel', self)
+        self.cancel_button.clicked.connect(self.cancel_analysis)
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.setStyleSheet("""
+                            QPushButton {
+                                background-color: #e74c3c;
+                                color: white;
+                                border: none;
+                                padding: 10px;
+                                border-radius: 5px;
+                            }
+                            QPushButton:hover {
+                                background-color: #c0392b;
+                            }
+                            QPushButton:disabled {
+                                background-color: #a9b1b2;
+                            }
+                        """)
+
+        # Live timing summary; collecting timings adds a few clock reads per check
+        self.timing_checkbox = QCheckBox('Timings', self)
+        self.timing_checkbox.setChecked(True)
+        self.timing_label = QLabel("", self)
+
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.timing_label)
+        progress_layout.addWidget(self.timing_checkbox)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addLayout(progress_layout)
 
         central_widget.setLayout(layout)
         self.setCentralWidget(central_widget)
@@ -561,13 +680,28 @@ class AudioInspectorApp(QMainWindow):
             event.ignore()
 
     def dropEvent(self, event):
-        files = [u.toLocalFile() for u in event.mimeData().urls()]
-        for file in files:
-            self.file_list.addItem(file)
+        self.add_inputs([u.toLocalFile() for u in event.mimeData().urls()])
+
+    def add_inputs(self, file_paths):
+        # Audio files go into the list as they are; CSV and JSONL manifests are listed entry by entry
+        from Manifest import Manifest, is_manifest
+        files = []
+        for file_path in file_paths:
+            if not is_manifest(file_path):
+                files.append(file_path)
+                continue
+            try:
+                self.file_list_model.add_manifest(Manifest(file_path, on_skipped=self.manifest_line_skipped.emit))
+            except (OSError, ValueError) as e:
+                self.result_display.append(f"Could not read manifest {file_path}: {e}")
+        self.file_list_model.add_files(files)
 
     def upload_source_file(self):
+        # The search runs on the analysis worker like the other analyses; one record per target file
+        import BatchAnalyzer
+        if self.analysis_worker is not None:
+            return
         options = QFileDialog.Options()
-        copied_files = []
         source_file_path, _ = QFileDialog.getOpenFileName(self, "Select SOURCE Audio File", "",
                                                           "Audio Files (*.wav *.mp3)", options=options)
         if not source_file_path:
@@ -580,34 +714,11 @@ class AudioInspectorApp(QMainWindow):
             self.result_display.append("Target file selection cancelled.")
             return
 
-        self.result_display.clear()
+        self.current_analysis_type = "Copy/Paste Detect"
+        self.run_batch(['copy_paste'], file_paths=target_file_paths,
+                       analyzer=BatchAnalyzer.CopyPasteSearch(self.audio_checker, source_file_path))
         self.result_display.append(f"Selected source file: {source_file_path}")
 
-        try:
-            found_any_copy_paste = False
-
-            for target_file_path in target_file_paths:
-
-                result, message = self.audio_checker.detect_copy_paste(source_file_path, target_file_path)
-
-                if result:
-                    found_any_copy_paste = True
-                    self.result_display.append(
-                        f"<span style='color: yellow;'>Target file: {target_file_path.split('/')[-1]}<br>{message}</span>")
-                    copied_files.append(target_file_path.split('/')[-1])
-            if not found_any_copy_paste:
-                self.result_display.append("No copy-paste patterns found in the selected target files.")
-                self.result_display.setStyleSheet("background-color: lightgreen;")
-            else:
-                self.result_display.setStyleSheet("background-color: lightcoral;")
-
-            return found_any_copy_paste, copied_files
-
-        except Exception as e:
-            self.result_display.append(f"An error occurred: {str(e)}")
-
-
-
     def update_inputs(self):
         analysis_type = self.analysis_type.currentText()
         if analysis_type == "Verify Format and Sampling Rate":
@@ -696,250 +807,327 @@ class AudioInspectorApp(QMainWindow):
         self.current_bit_rates_dropdown.addItems(self.current_bit_rates)
 
     def upload_files(self):
-        files, _ = QFileDialog.getOpenFileNames(self, 'Upload Files')
-        for file in files:
-            self.file_list.addItem(file)
+        files, _ = QFileDialog.getOpenFileNames(self, 'Upload Files', "",
+                                                "All Files (*);;Manifests (*.csv *.jsonl)")
+        self.add_inputs(files)
 
     def remove_all_files(self):
-        self.file_list.clear()
+        self.file_list_model.clear()
 
     def perform_analysis(self):
-        QApplication.processEvents()
-        selected_files = [item.text() for item in self.file_list.selectedItems()] or \
-                         [self.file_list.item(i).text() for i in range(self.file_list.count())]
+        import BatchAnalyzer
         analysis_type = self.analysis_type.currentText()
-        files = [self.file_list.item(i).text() for i in range(self.file_list.count())]
         self.result_display.clear()
-        self.noise_levels = []
-        self.snr_levels = []
-        self.clipping_data = []
-        all_files_valid = True
-        result = ""
-
-        invalid_results = ""
-        invalid_reasons = []
-        if analysis_type == "Copy/Paste Detect":
-            QApplication.processEvents()
-            output, copied_files = self.upload_source_file()
-            if output:
-                all_files_valid = False
-                result += f"<b>Status: <span style='color: red;'>INVALID FILE</span></b><br>"
-                result += "<br>"
-                for file in copied_files:
-                    result += f"<span style='color: yellow;'>Copy/Paste File: {file}</span><br><br>"
-                invalid_results += result + "<br>"
-
-        for i, file_path in enumerate(selected_files):
-            QApplication.processEvents()
-            file_name = os.path.basename(file_path)
-            result = f"<b>Analyzed File Name: {file_name}</b><br>"
-            valid_file = True
-
-            if analysis_type == "Verify Format and Sampling Rate":
-                format_ok, file_format = self.audio_checker.check_format(file_path)
-                rate_ok, file_rate = self.audio_checker.check_sampling_rate(file_path, self.target_rates)
-                result += f"Format: {file_format} (Supported: {format_ok})<br>"
-                result += f"Sampling Rate: {file_rate}Hz (Accepted: {rate_ok})<br>"
-                if not format_ok:
-                    invalid_reasons.append("Unsupported Format")
-                if not rate_ok:
-                    invalid_reasons.append("Invalid Sampling Rate")
-                valid_file &= format_ok and rate_ok
-
-            elif analysis_type == "Analyze Background Noise":
-                noise_level, acceptable = self.audio_checker.calculate_rms(file_path)
-                self.noise_levels.append(noise_level)
-                result += f"RMS Noise Level: {noise_level}dB (Acceptable: {acceptable})<br>"
-                if not acceptable:
-                    invalid_reasons.append("High Background Noise")
-                valid_file &= acceptable
-
-            elif analysis_type == "Analyze SNR":
-                snr, acceptable = self.audio_checker.calculate_snr(file_path)
-                self.snr_levels.append(snr)
-                result += f"SNR: {snr}dB (Acceptable: {acceptable})<br>"
-                if not acceptable:
-                    invalid_reasons.append("Low SNR")
-                valid_file &= acceptable
-
-            elif analysis_type == "Detect Clipping":
-                clipping, points = self.audio_checker.detect_clipping(file_path)
-                result += f"Clipping Detected: {clipping} (Points: {len(points)})<br>"
-                if clipping:
-                    self.clipping_data.append((file_name, points))
-                    invalid_reasons.append("Clipping Detected")
-                valid_file &= not clipping
-
-            elif analysis_type == "Analyze Reverb":
-                rt60 = self.audio_checker.calculate_reverb(file_path)
-                result += f"Reverb Time (RT60): {rt60}<br>"
-                if rt60 >= 2:
-                    invalid_reasons.append("High Reverb Time (RT60)")
-                valid_file &= rt60 < 2
-
-            elif analysis_type == "Inspect Channel Mode":
-                channel_mode, num_channels = self.audio_checker.check_channel_mode(file_path)
-                result += f"Channel Mode: {channel_mode} (Channels: {num_channels})<br>"
-                if channel_mode not in ["stereo", "mono"]:
-                    invalid_reasons.append("Invalid Channel Mode")
-                self.channel_modes.append(channel_mode)
-                valid_file &= (channel_mode == "stereo" or channel_mode == "mono")
-
-            elif analysis_type == "Verify Bit Depth":
-                bit_depth, valid = self.audio_checker.check_bit_depth(file_path, self.current_bit_rates)
-                result += f"Bit Depth: {bit_depth} (Valid: {valid})<br>"
-                if not valid:
-                    invalid_reasons.append("Invalid Bit Depth")
-                valid_file &= valid
-
-            if not valid_file:
-                all_files_valid = False
-                result += f"<b>Status: <span style='color: red;'>INVALID FILE</span></b><br>"
-                if invalid_reasons:
-                    reasons = "<br>".join(
-                        [f"<b><span style='background-color: yellow;'>{reason}</span></b>" for reason in
-                         invalid_reasons])
-                    result += f"Reasons:<br>{reasons}<br><br>"
-                invalid_results += result + "<br>"
-
-            if i < len(files) - 1:
-                invalid_results += "<br>---------------------<br>"
-
-            self.current_analysis_type = analysis_type
-            progress_value = int(((i + 1) / len(selected_files)) * 100)
-            self.progress_bar.setValue(progress_value)
-
-        if invalid_results:
-            self.result_display.setHtml(invalid_results)
-        else:
-            self.result_display.setHtml("<b>All files are valid.</b>")
+        self.current_analysis_type = analysis_type
 
-        if all_files_valid:
-            self.result_display.setStyleSheet("background-color: lightgreen;")
-        else:
-            self.result_display.setStyleSheet("background-color: lightcoral;")
-        QApplication.processEvents()
+        if analysis_type == "Copy/Paste Detect":
+            self.upload_source_file()
+            return
 
-        self.result_text = self.result_display.toPlainText()
+        self.run_batch(BatchAnalyzer.ANALYSIS_TYPE_CHECKS[analysis_type])
 
     def perform_all_analyses(self):
-        QApplication.processEvents()
-        selected_files = [item.text() for item in self.file_list.selectedItems()] or \
-                         [self.file_list.item(i).text() for i in range(self.file_list.count())]
-
-        self.result_display.clear()
-        invalid_results = ""
-        all_files_valid = True
-
-        for i, file_path in enumerate(selected_files):
-            QApplication.processEvents()
-            file_name = os.path.basename(file_path)
-            result = f"<b>Analyzed File Name: {file_name}</b><br>"
-            valid_file = True
-            invalid_reasons = []
-
-            format_ok, file_format = self.audio_checker.check_format(file_path)
-            rate_ok, file_rate = self.audio_checker.check_sampling_rate(file_path, self.target_rates)
-            result += f"Format: {file_format} (Supported: {format_ok})<br>"
-            result += f"Sampling Rate: {file_rate}Hz (Accepted: {rate_ok})<br>"
-            if not format_ok:
-                invalid_reasons.append("Unsupported Format")
-            if not rate_ok:
-                invalid_reasons.append("Invalid Sampling Rate")
-            valid_file &= format_ok and rate_ok
-
-            noise_level, acceptable = self.audio_checker.calculate_rms(file_path)
-            result += f"RMS Noise Level: {noise_level}dB (Acceptable: {acceptable})<br>"
-            self.noise_levels.append(noise_level)
-            if not acceptable:
-                invalid_reasons.append("High Background Noise")
-            valid_file &= acceptable
-
-            snr, acceptable = self.audio_checker.calculate_snr(file_path)
-            result += f"SNR: {snr}dB (Acceptable: {acceptable})<br>"
-            self.snr_levels.append(snr)
-            if not acceptable:
-                invalid_reasons.append("Low SNR")
-            valid_file &= acceptable
-
-            clipping, points = self.audio_checker.detect_clipping(file_path)
-            result += f"Clipping Detected: {clipping} (Points: {len(points)})<br>"
-            if clipping:
-                invalid_reasons.append("Clipping Detected")
-                self.clipping_data.append((file_name, points))
-            valid_file &= not clipping
-
-            # Reverb Analizi
-            rt60 = self.audio_checker.calculate_reverb(file_path)
-            result += f"Reverb Time (RT60): {rt60}<br>"
-            if rt60 >= 2:
-                invalid_reasons.append("High Reverb Time (RT60)")
-            valid_file &= rt60 < 2
-
-            channel_mode, num_channels = self.audio_checker.check_channel_mode(file_path)
-            result += f"Channel Mode: {channel_mode} (Channels: {num_channels})<br>"
-            self.channel_modes.append(channel_mode)
-            if channel_mode not in ["stereo", "mono"]:
-                invalid_reasons.append("Invalid Channel Mode")
-            valid_file &= (channel_mode == "stereo" or channel_mode == "mono")
-
-            bit_depth, valid = self.audio_checker.check_bit_depth(file_path, self.current_bit_rates)
-            result += f"Bit Depth: {bit_depth} (Valid: {valid})<br>"
-            if not valid:
-                invalid_reasons.append("Invalid Bit Depth")
-            valid_file &= valid
-
-            # Copy/Paste tespiti
-            """source_file_path, _ = QFileDialog.getOpenFileName(self, "Select Source Audio File for Copy/Paste Detection",
-                                                              "",
-                                                              "Audio Files (*.wav *.mp3)",
-                                                              options=QFileDialog.Options())
-            if not source_file_path:
-                self.result_display.append("Source file selection cancelled.<br>")
+        import BatchAnalyzer
+        self.current_analysis_type = "All"
+        self.run_batch(BatchAnalyzer.CHECKS)
+
+    def selected_spans(self):
+        # Sorted, non-overlapping (first, last) row spans of the selection, read from its ranges so a large
+        # selection is never expanded row by row
+        spans = []
+        for first, last in sorted((span.top(), span.bottom()) for span in self.file_list.selectionModel().selection()):
+            if spans and first <= spans[-1][1] + 1:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], last))
             else:
-                result, message = self.detect_copy_paste(source_file_path, file_path)
-                result += f"{message}<br>"
-                if result:
-                    invalid_reasons.append("Copy/Paste Detected")
-                valid_file &= not result
-
-            if not valid_file:
-                all_files_valid = False
-                result += f"<b>Status: <span style='color: red;'>INVALID FILE</span></b><br>"
-                if invalid_reasons:
-                    reasons = "<br>".join(
-                        [f"<b><span style='background-color: yellow;'>{reason}</span></b>" for reason in
-                         invalid_reasons]
-                    )
-                    result += f"Reasons:<br>{reasons}<br><br>"
-                invalid_results += result + "<br>"""""
-
-            progress_value = int(((i + 1) / len(selected_files)) * 100)
-            self.progress_bar.setValue(progress_value)
-
-            if all_files_valid:
-                self.result_display.setStyleSheet("background-color: lightgreen;")
-            else:
-                self.result_display.setStyleSheet("background-color: lightcoral;")
-
-            QApplication.processEvents()
+                spans.append((first, last))
+        return spans
+
+    def selected_file_paths(self, expectations):
+        # (lazy file paths, count) of the selected rows, or of every row when none is selected; manifest
+        # expectations go into expectations as the paths are read
+        spans = self.selected_spans() or None
+        total = sum(last - first + 1 for first, last in spans) if spans else self.file_list_model.rowCount()
+        return self.file_list_model.paths(expectations, spans), total
+
+    def analysis_settings(self):
+        feature_cache = self.audio_checker.feature_cache
+        return {
+            'supported_formats': list(self.supported_formats),
+            'target_rates': list(self.target_rates),
+            'bit_rates': list(self.current_bit_rates),
+            'feature_cache_path': feature_cache.db_path if feature_cache is not None else None,
+            'instrument': self.timing_checkbox.isChecked(),
+        }
 
-            if invalid_results:
-                self.result_display.setHtml(invalid_results)
-            else:
-                self.result_display.setHtml("<b>All files are valid.</b>")
+    def run_batch(self, checks, file_paths=None, merge=False, analyzer=None):
+        # With merge the records replace those of the same files in the current result set instead of
+        # starting a new one (watch mode)
+        import BatchAnalyzer
+        if self.analysis_worker is not None:
+            return
+        expectations = {}
+        if file_paths is None:
+            file_paths, total = self.selected_file_paths(expectations)
+        else:
+            total = len(file_paths)
+        self.merging_results = merge
+        if not merge:
+            self.result_table.clear()
+            self.all_files_valid = True
+            self.result_display.clear()
+            self.statistics_view.hide()
+        self.invalid_result_count = 0
+        self.skipped_manifest_lines = 0
+        self.replaced_results = False
+        self.pending_rows = []
+        self.progress_bar.setValue(0)
+        self.timing_summary = TimingSummary(analyzer.jobs if analyzer is not None else self.worker_count_input.value())
+        self.timing_summary.start()
+        self.timing_label.setText("")
+        if not total:
+            self.finish_batch()
+            return
 
-            if i < len(selected_files) - 1:
-                invalid_results += "<br>---------------------<br>"
+        if analyzer is None:
+            analyzer = BatchAnalyzer.BatchAnalyzer(self.analysis_settings(), self.worker_count_input.value(),
+                                                   checker=self.audio_checker)
+        self.analysis_worker = AnalysisWorker.AnalysisWorker(analyzer, file_paths, checks, self, total=total,
+                                                             expectations=expectations)
+        self.analysis_worker.result_ready.connect(self.on_result_ready)
+        self.analysis_worker.progress.connect(self.on_analysis_progress)
+        self.analysis_worker.failed.connect(self.on_analysis_failed)
+        self.analysis_worker.finished.connect(self.finish_batch)
+        self.set_analysis_running(True)
+        self.result_flush_timer.start()
+        self.analysis_worker.start()
+
+    def set_analysis_running(self, running):
+        self.analyze_button.setEnabled(not running)
+        self.all_analysis_button.setEnabled(not running)
+        self.copy_paste_button.setEnabled(not running)
+        self.worker_count_input.setEnabled(not running)
+        self.cancel_button.setEnabled(running)
+
+    def cancel_analysis(self):
+        if self.analysis_worker is not None:
+            self.analysis_worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def on_result_ready(self, record):
+        row, replaced = self.result_table.upsert(record)
+        self.replaced_results = self.replaced_results or replaced
+        self.timing_summary.add(record['file_name'], record.get('timings'))
+        if not record['valid']:
+            self.all_files_valid = False
+            self.pending_rows.append(row)
+
+    def flush_results(self):
+        # Records arrive faster than they can be drawn, so only the rows that arrived since the last
+        # timer tick are formatted and appended
+        self.update_timing_label()
+        if not self.pending_rows:
+            return
+        parts = []
+        for row in self.pending_rows:
+            if self.invalid_result_count:
+                parts.append("---------------------<br>")
+            parts.append(self.format_record(self.result_table.record(row)))
+            self.invalid_result_count += 1
+        self.result_display.append("".join(parts))
+        self.pending_rows = []
+
+    def show_invalid_results(self):
+        # The results view redrawn from the table: one entry per file that is invalid now
+        valid = self.result_table.columns['valid']
+        rows = [row for row in range(len(self.result_table)) if not valid[row]]
+        self.result_display.setHtml("---------------------<br>".join(
+            self.format_record(self.result_table.record(row)) for row in rows))
+
+    def on_manifest_line_skipped(self, message):
+        self.skipped_manifest_lines += 1
+        self.result_display.append(message)
+
+    def on_analysis_progress(self, done, total):
+        self.progress_bar.setValue(int((done / total) * 100))
+
+    def on_analysis_failed(self, message):
+        self.flush_results()
+        self.result_display.append(f"<b>Analysis stopped: {message}</b><br>")
+        self.all_files_valid = False
+
+    def finish_batch(self):
+        cancelled = self.analysis_worker is not None and self.analysis_worker.cancelled
+        self.result_flush_timer.stop()
+        self.timing_summary.finish()
+        self.flush_results()
+        if self.analysis_worker is not None:
+            self.analysis_worker.deleteLater()
+            self.analysis_worker = None
+        self.set_analysis_running(False)
+
+        if not cancelled:
+            # Unreadable manifest lines are skipped, so the last file may land short of the row count
+            self.progress_bar.setValue(100)
+        if self.merging_results:
+            # Re-analysed files replaced their rows in the table; redrawing from it drops their old entries
+            self.all_files_valid = not self.result_table.invalid_count
+            if self.replaced_results:
+                self.show_invalid_results()
+        if cancelled:
+            self.result_display.append("<b>Analysis cancelled.</b>")
+        elif self.merging_results:
+            self.result_display.append(f"<b>Watched folder: {self.invalid_result_count} new invalid file(s), "
+                                       f"{self.result_table.invalid_count} of {len(self.result_table)} "
+                                       f"invalid in total.</b>")
+        elif self.current_analysis_type == "Copy/Paste Detect":
+            if not self.invalid_result_count:
+                self.result_display.append("No copy-paste patterns found in the selected target files.")
+        elif not self.invalid_result_count and self.all_files_valid:
+            self.result_display.setHtml("<b>All files are valid.</b>")
+        if self.skipped_manifest_lines:
+            self.result_display.append(f"<b>{self.skipped_manifest_lines} manifest line(s) could not be read and "
+                                       f"were skipped.</b>")
 
-        if all_files_valid:
-            self.result_display.setHtml("<b>All files VALID</b>")
+        if self.all_files_valid:
+            self.result_display.setStyleSheet("background-color: lightgreen;")
         else:
-            self.result_display.setHtml(invalid_results)
+            self.result_display.setStyleSheet("background-color: lightcoral;")
+
+        self.start_watch_batch()
 
-        self.result_text = self.result_display.toPlainText()
+    def toggle_watch_folder(self):
+        if self.folder_watcher is not None:
+            self.stop_watching()
+            return
+        if self.analysis_worker is not None:
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Select Folder to Watch")
+        if not directory:
+            return
+        import BatchAnalyzer
+        from FolderWatcher import FolderWatcher
+        self.folder_watcher = FolderWatcher([directory], extensions=self.supported_formats)
+        # The pool is kept alive between arrivals so each one only pays for its own audio
+        self.watch_analyzer = BatchAnalyzer.BatchAnalyzer(self.analysis_settings(), self.worker_count_input.value(),
+                                                          checker=self.audio_checker, keep_pool=True)
+        self.watch_button.setText('Stop Watching')
+        self.result_display.append(f"<b>Watching {directory} for new or modified files.</b>")
+        self.watch_timer.start()
+        self.poll_watch_folder()
+
+    def stop_watching(self):
+        self.watch_timer.stop()
+        self.folder_watcher = None
+        self.watch_queue = []
+        self.watch_button.setText('Watch Folder')
+        if self.analysis_worker is None and self.watch_analyzer is not None:
+            self.watch_analyzer.close()
+            self.watch_analyzer = None
+
+    def poll_watch_folder(self):
+        if self.folder_watcher is None:
+            return
+        for file_path in self.folder_watcher.poll():
+            if file_path not in self.file_list_model:
+                self.file_list_model.add_files([file_path])
+            if file_path not in self.watch_queue:
+                self.watch_queue.append(file_path)
+        self.start_watch_batch()
+
+    def start_watch_batch(self):
+        # Arrivals during a running analysis wait for it to finish and then go out as one batch
+        if self.folder_watcher is None:
+            if self.analysis_worker is None and self.watch_analyzer is not None:
+                self.watch_analyzer.close()
+                self.watch_analyzer = None
+            return
+        if self.analysis_worker is not None or not self.watch_queue:
+            return
+        import BatchAnalyzer
+        file_paths, self.watch_queue = self.watch_queue, []
+        self.current_analysis_type = "All"
+        self.run_batch(BatchAnalyzer.CHECKS, file_paths=file_paths, merge=True, analyzer=self.watch_analyzer)
+
+    def update_timing_label(self):
+        import BatchAnalyzer
+        summary = self.timing_summary
+        if summary is None or not summary.files:
+            return
+        text = f"{summary.files / summary.wall_s:.1f} files/s"
+        if summary.utilization is not None:
+            text += f" | workers {summary.utilization:.0%} busy"
+        if summary.totals.get('total_s'):
+            text += f" | decode {summary.totals.get('decode_s', 0) / summary.totals['total_s']:.0%}"
+        rate = summary.hit_rate('feature')
+        if rate is not None:
+            text += f" | cache hits {rate:.0%}"
+        steps = [row for row in summary.check_rows() if row[0] in BatchAnalyzer.CHECKS]
+        if steps:
+            text += f" | slowest check: {steps[0][0]}"
+        self.timing_label.setText(text)
+
+    def export_timing_summary(self):
+        # The live summary also knows wall time and utilization, but only covers the last batch
+        if self.timing_summary is not None and not self.merging_results and \
+                self.timing_summary.files == self.result_table.timed_count:
+            return self.timing_summary
+        return self.result_table.timing_summary()
+
+    def format_record(self, record):
+        result = f"<b>Analyzed File Name: {record.file_name}</b><br>"
+        if record.format_ok is not None:
+            result += f"Format: {record.file_format} (Supported: {record.format_ok})<br>"
+        if record.rate_ok is not None:
+            result += f"Sampling Rate: {record.sample_rate}Hz (Accepted: {record.rate_ok})<br>"
+            if record.bandwidth_hz is not None:
+                result += (f"Content Bandwidth: {record.bandwidth_hz:.0f}Hz "
+                           f"(Confidence: {record.bandwidth_confidence:.2f})<br>")
+        if record.noise_ok is not None:
+            result += f"RMS Noise Level: {record.noise_db}dB (Acceptable: {record.noise_ok})<br>"
+        if record.snr_ok is not None:
+            result += f"SNR: {record.snr_db}dB (Acceptable: {record.snr_ok})<br>"
+        if record.clipping is not None:
+            result += f"Clipping Detected: {record.clipping} (Points: {record.clipping_points})<br>"
+            if record.clipping:
+                result += (f"Clipping Events: {record.clipping_events} (Clipped: {record.clipping_ratio:.4%}, "
+                           f"Longest Run: {record.clipping_longest_run} samples)<br>")
+        if record.reverb_ok is not None:
+            result += f"Reverb Time (RT60): {record.rt60}<br>"
+        if record.channel_mode is not None:
+            result += f"Channel Mode: {record.channel_mode} (Channels: {record.num_channels})<br>"
+            if record.channel_rms_db is not None:
+                for channel, (rms_db, snr_db, peak, dc_offset, clipped) in enumerate(zip(
+                        record.channel_rms_db, record.channel_snr_db, record.channel_peak, record.channel_dc_offset,
+                        record.channel_clipped), start=1):
+                    result += (f"Channel {channel}: RMS {rms_db:.1f}dB, SNR {snr_db:.1f}dB, Peak {peak:.3f}, "
+                               f"DC Offset {dc_offset:.4f}, Clipped Samples {int(clipped)}<br>")
+                if record.channel_correlation is not None:
+                    result += (f"Channel Correlation: {record.channel_correlation:.3f} "
+                               f"(Fake Stereo: {record.fake_stereo}, Phase Inverted: {record.phase_inverted})<br>")
+        if record.bit_depth_ok is not None:
+            result += f"Bit Depth: {record.bit_depth} (Valid: {record.bit_depth_ok})<br>"
+        if record.repeats is not None:
+            result += f"Repeated Segments: {record.repeat_count}<br>"
+            for segment in record.repeat_segments or ():
+                result += f"Repeated: {segment}<br>"
+        if record.copy_paste_match is not None and not record.valid:
+            result += f"<span style='color: yellow;'>{record.copy_paste_match}</span><br>"
+        if record.error is not None:
+            result += f"Error: {record.error}<br>"
+
+        if not record.valid:
+            result += "<b>Status: <span style='color: red;'>INVALID FILE</span></b><br>"
+            reasons = "<br>".join(
+                [f"<b><span style='background-color: yellow;'>{reason}</span></b>" for reason in
+                 record.invalid_reasons])
+            result += f"Reasons:<br>{reasons}<br>"
+            if record.expectation_mismatches:
+                result += f"Manifest: {'; '.join(record.expectation_mismatches)}<br>"
+            result += "<br>"
+        return result
 
     def download_pdf(self):
+        import ReportWriters
         try:
             file_path, _ = QFileDialog.getSaveFileName(self, "Save PDF", "", "PDF Files (*.pdf);;All Files (*)")
             if not file_path:
@@ -948,34 +1136,13 @@ class AudioInspectorApp(QMainWindow):
             if not file_path.endswith('.pdf'):
                 file_path += '.pdf'
 
-            text = self.result_text.strip()
-            if not text:
+            if not len(self.result_table):
                 self.result_display.append("\nNo analysis results to download.")
                 return
 
-            pdf_canvas = canvas.Canvas(file_path, pagesize=letter)
-            pdf_canvas.drawString(100, 750, "Audio File Inspection Results")
-
-            lines = text.split('\n')
-            y_position = 700
-            for line in lines:
-                if y_position < 50:
-                    pdf_canvas.showPage()
-                    y_position = 750
-                pdf_canvas.drawString(100, y_position, line)
-                y_position -= 20
-
-            # Generate and embed the plot into the PDF
-            plot_filename = 'temp_plot.png'
-            self.plot_statistics(plot_filename)
-            pdf_canvas.drawImage(plot_filename, 50, 450, width=500, height=300)
-
-            pdf_canvas.save()
-
-            # Remove the temporary plot file
-            if os.path.exists(plot_filename):
-                os.remove(plot_filename)
-
+            # Summary of every file, then the invalid ones as the results view lists them
+            ReportWriters.write_pdf(self.result_table, file_path, image=self.statistics_image(),
+                                    timing_summary=self.export_timing_summary(), invalid_only=True)
             self.result_display.append(f"\nPDF successfully saved at: {file_path}")
 
         except Exception as e:
@@ -987,7 +1154,12 @@ class AudioInspectorApp(QMainWindow):
     def download_csv(self):
         self.download_file("CSV", "csv", "CSV Files (*.csv);;All Files (*)")
 
+    def download_parquet(self):
+        self.download_file("Parquet", "parquet", "Parquet Files (*.parquet);;All Files (*)")
+
     def download_file(self, file_type, extension, dialog_filter):
+        # Written straight from the result table, streaming rows; see ReportWriters
+        import ReportWriters
         try:
             file_path, _ = QFileDialog.getSaveFileName(self, f"Save {file_type}", "", dialog_filter)
             if not file_path:
@@ -996,136 +1168,96 @@ class AudioInspectorApp(QMainWindow):
             if not file_path.endswith(f'.{extension}'):
                 file_path += f'.{extension}'
 
-            text = self.result_text.strip()
-            if not text:
-                self.result_display.append(f"\nNo analysis results to download.")
+            if not len(self.result_table):
+                self.result_display.append("\nNo analysis results to download.")
                 return
 
-            lines = [line.split() for line in text.split('\n') if line.strip()]
-            df = pd.DataFrame(lines)
-
             if extension == "xlsx":
-                with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                    df.to_excel(writer, index=False, header=False)
-
-                    # Embed plot into Excel
-                    plot_filename = 'temp_plot.png'
-                    self.plot_statistics(plot_filename)
-                    workbook = writer.book
-                    worksheet = writer.sheets['Sheet1']
-                    worksheet.insert_image('Z10', plot_filename)
-
-                self.result_display.append(f"\nExcel successfully saved at: {file_path}")
+                ReportWriters.write_excel(self.result_table, file_path, image=self.statistics_image(),
+                                          timing_summary=self.export_timing_summary())
+            elif extension == "parquet":
+                ReportWriters.write_parquet(self.result_table, file_path)
             else:
-                df.to_csv(file_path, index=False, header=False)
-
-                # CSV doesn't support image embedding, so notify the user
-                self.result_display.append(f"\nCSV successfully saved at: {file_path}")
+                ReportWriters.write_csv(self.result_table, file_path)
 
-            # Clean up the plot file
-            if os.path.exists('temp_plot.png'):
-                os.remove('temp_plot.png')
+            self.result_display.append(f"\n{file_type} successfully saved at: {file_path}")
 
+        except ImportError as e:
+            self.result_display.append(f"\n{file_type} export needs an optional package: {e.name}")
         except Exception as e:
             self.result_display.append(f"\nError while saving {file_type}: {str(e)}")
 
     def download_statistics(self):
         filename, _ = QFileDialog.getSaveFileName(self, "Save Statistics", "", "PNG Files (*.png)")
-        if filename and (self.noise_levels or self.snr_levels or self.clipping_data or self.channel_modes):
-            self.plot_statistics(filename)
-
-    def plot_statistics(self, filename):
-        plt.figure(figsize=(15, 10))
-
-        if self.current_analysis_type == "All":
-            self.create_all_plots()
-        elif self.current_analysis_type == "Analyze SNR":
-            self.create_sn_plot()
-        elif self.current_analysis_type == "Detect Clipping":
-            self.create_clipping_plot()
-        elif self.current_analysis_type == "Inspect Channel Mode":
-            self.create_channel_mode_plot()
-        elif self.current_analysis_type == "Analyze Background Noise":
-            self.create_background_noise_plot()
-        else:
-            self.result_display.append("No valid analysis type for plotting.")
-            return
-
-        plt.savefig(filename)
-        plt.close()
-
-    def create_all_plots(self):
-        self.create_bar_plot(self.noise_levels, 'Noise Levels', 'Level (dB)', 'File Number', color='blue', position=1)
-        self.create_bar_plot(self.snr_levels, 'SNR Levels', 'Level (dB)', 'File Number', color='orange', position=2)
-        self.create_line_plot(self.clipping_data, 'Clipping', 'Clipping Level', 'File Number', color='red', position=3)
-        self.create_channel_mode_plot()
-
-    def create_snr_plot(self):
-        self.create_bar_plot(self.snr_levels, 'SNR Levels', 'Level (dB)', 'File Number', color='green', position=1)
-
-    def create_clipping_plot(self):
-        self.create_line_plot(self.clipping_data, 'Clipping Detection', 'Clipping Level', 'File Number', color='red',
-                              position=1)
-
-    def create_background_noise_plot(self):
-        self.create_bar_plot(self.noise_levels, 'Noise Levels', 'Level (dB)', 'File Number', color='blue', position=1)
-
-    def create_bar_plot(self, data, title, ylabel, xlabel, color, position):
-        plt.subplot(2, 2, position)
-        plt.bar(range(len(data)), data, color=color)
-        plt.title(title)
-        plt.ylabel(ylabel)
-        plt.xlabel(xlabel)
-
-    def create_line_plot(self, data, title, ylabel, xlabel, color, position):
-        plt.subplot(2, 2, position)
-        plt.plot(data, label=title, color=color)
-        plt.title(title)
-        plt.ylabel(ylabel)
-        plt.xlabel(xlabel)
-
-    def create_channel_mode_plot(self):
-        labels = ['Mono' if mode == "mono" else "Stereo" for mode in self.channel_modes]
-        unique_modes, counts = np.unique(labels, return_counts=True)
-        plt.subplot(2, 2, 4)
-        plt.bar(unique_modes, counts, color='orange')
-        plt.title('Channel Modes')
-        plt.ylabel('Counts')
-        plt.xlabel('Channel Type')
+        if filename and len(self.result_table):
+            image = self.statistics_image()
+            if image:
+                with open(filename, 'wb') as f:
+                    f.write(image)
+
+    def statistics_image(self):
+        # The statistics plot as PNG bytes, rendered once per table state and analysis type and reused by
+        # every export; None when there is nothing to plot. The table is still exported if plotting fails.
+        key = (self.result_table.revision, self.current_analysis_type)
+        if self.statistics_png is None or self.statistics_png[:2] != key:
+            try:
+                image = self.statistics_plots.png() if self.render_statistics() else None
+            except Exception as e:
+                print(f"Plot not rendered: {e}")
+                image = None
+            self.statistics_png = key + (image,)
+        return self.statistics_png[2]
+
+    def render_statistics(self):
+        # Draws the distributions of the current analysis type on the shared figure; see StatisticsPlots
+        if self.statistics_plots is None:
+            import StatisticsPlots
+            self.statistics_plots = StatisticsPlots.StatisticsPlots()
+        if not self.statistics_plots.render(self.result_table, self.current_analysis_type):
+            self.result_display.append("No valid analysis type for plotting." if len(self.result_table) else
+                                       "\nNo analysis results to plot.")
+            return False
+        return True
 
     def show_statistics(self):
-        previous_results = self.result_display.toHtml()
-        self.result_display.clear()
-        plt.figure(figsize=(15, 10))
-
-        if self.current_analysis_type == "All":
-            self.create_all_plots()
-        elif self.current_analysis_type == "Analyze SNR":
-            self.create_bar_plot(self.snr_levels, 'SNR Levels', 'Level (dB)', 'File Index', color='green', position=1)
-        elif self.current_analysis_type == "Detect Clipping":
-            self.create_line_plot(self.clipping_data, 'Clipping Detection', 'Clipping Level', 'File Index', color='red',
-                                  position=1)
-        elif self.current_analysis_type == "Inspect Channel Mode":
-            self.create_channel_mode_plot()
-        elif self.current_analysis_type == "Analyze Background Noise":
-            self.create_bar_plot(self.noise_levels, 'Noise Levels', 'Level (dB)', 'File Index', color='blue',
-                                 position=1)
-
-        plt.tight_layout()
-        plt.savefig('plot.png', bbox_inches='tight', dpi=150)
-        plt.close()
-        pixmap = QPixmap('plot.png')
-        self.result_display.insertHtml('<img src="plot.png" width="800" />')
-        self.result_display.insertHtml(previous_results)
-
-        # Delete the saved plot file after displaying
-        if os.path.exists('plot.png'):
-            os.remove('plot.png')
+        # The rendered pixels go straight to the statistics view, not through a file
+        if not self.render_statistics():
+            return
+        pixels, width, height = self.statistics_plots.rgba()
+        image = QImage(pixels, width, height, QImage.Format_RGBA8888)
+        self.statistics_view.setPixmap(QPixmap.fromImage(image).scaledToWidth(800, Qt.SmoothTransformation))
+        self.statistics_view.show()
+
+    def closeEvent(self, event):
+        self.watch_timer.stop()
+        self.folder_watcher = None
+        if self.analysis_worker is not None:
+            self.analysis_worker.cancel()
+            self.analysis_worker.wait()
+        if self.watch_analyzer is not None:
+            self.watch_analyzer.close()
+            self.watch_analyzer = None
+        super().closeEvent(event)
 
     def remove_selected_files(self):
-        selected_items = self.file_list.selectedItems()
-        for item in selected_items:
-            self.file_list.takeItem(self.file_list.row(item))
+        for first, last in reversed(self.selected_spans()):
+            self.file_list_model.remove_rows(first, last)
+
+    @property
+    def audio_checker(self):
+        if self._audio_checker is None:
+            import AudioFileChecker
+            self._audio_checker = AudioFileChecker.AudioFileChecker(self.supported_formats, self.target_rates,
+                                                                    feature_cache=self.open_feature_cache())
+        return self._audio_checker
+
+    def open_feature_cache(self):
+        try:
+            import FeatureCache
+            return FeatureCache.FeatureCache()
+        except Exception as e:
+            print(f"Feature cache disabled: {e}")
+            return None
 
     def resource_path(self, relative_path):
         try:
@@ -1137,6 +1269,7 @@ class AudioInspectorApp(QMainWindow):
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # worker processes of the one-file PyInstaller build
     app = QApplication(sys.argv)
     window = AudioInspectorApp()
     window.show()
@@ -10,7 +10,10 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Installed in the dev environment but never used by the app; keeping them out shrinks the
+    # one-file bundle that has to be unpacked on every launch
+    excludes=['torch', 'torchaudio', 'IPython', 'jupyter_client', 'jupyter_core', 'nbconvert', 'nbformat',
+              'tkinter', 'sympy', 'gevent', 'eel', 'tornado', 'zmq'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,292 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+import BatchAnalyzer
+import FeatureCache
+import ReportWriters
+from AudioFileChecker import low_rate_profile
+from FolderWatcher import AUDIO_EXTENSIONS, FolderWatcher
+from Instrumentation import TIMING_FIELDS, TimingSummary
+from Manifest import Manifest, is_manifest
+from ResultTable import RECORD_FIELDS, TIMING_COLUMNS, export_value
+from Sharding import PartialWriter, in_shard, merge_partials, parse_shard
+
+
+def iter_input_files(inputs, extensions=AUDIO_EXTENSIONS, expectations=None):
+    # Files, directories (walked recursively), glob patterns and manifests (CSV or JSONL lists of files, see
+    # Manifest), yielded lazily; the expectations of manifest entries go into expectations as they are read
+    for item in inputs:
+        if is_manifest(item) and os.path.isfile(item):
+            yield from Manifest(item).paths({} if expectations is None else expectations)
+        elif os.path.isdir(item):
+            for root, dirs, names in os.walk(item):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.split('.')[-1].lower() in extensions:
+                        yield os.path.join(root, name)
+        elif os.path.exists(item):
+            yield item
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                print(f"No files match {item}", file=sys.stderr)
+            for match in matches:
+                if os.path.isfile(match):
+                    yield match
+
+
+class JsonlWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        self.stream.write(json.dumps(record) + '\n')
+        self.stream.flush()
+
+
+class CsvWriter:
+    def __init__(self, stream, timings=False):
+        self.stream = stream
+        fieldnames = RECORD_FIELDS + TIMING_COLUMNS if timings else RECORD_FIELDS
+        self.writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        row = {name: export_value(tuple(value)) if isinstance(value, list) else value
+               for name, value in record.items()}
+        timings = row.pop('timings', None) or {}
+        row.update((f'timing_{name}', timings.get(name)) for name in TIMING_FIELDS)
+        self.writer.writerow(row)
+        self.stream.flush()
+
+
+def parse_checks(value):
+    if value == 'all':
+        return list(BatchAnalyzer.CHECKS)
+    checks = [check.strip() for check in value.split(',') if check.strip()]
+    unknown = [check for check in checks if check not in BatchAnalyzer.CHECKS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown check(s): {', '.join(unknown)} "
+                                         f"(choose from {', '.join(BatchAnalyzer.CHECKS)})")
+    return checks
+
+
+def shard_argument(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def comma_list(convert=str):
+    return lambda value: [convert(item.strip()) for item in value.split(',') if item.strip()]
+
+
+def build_parser():
+    defaults = BatchAnalyzer.default_settings()
+    parser = argparse.ArgumentParser(
+        description="Inspect audio files without a display. Exits with status 1 if any file is invalid.")
+    parser.add_argument('inputs', nargs='+',
+                        help="audio files, directories, glob patterns or CSV/JSONL manifests listing files and "
+                             "optionally their expected sample_rate, bit_depth, channels and format "
+                             "(partial result files with --merge)")
+    parser.add_argument('--checks', type=parse_checks, default=list(BatchAnalyzer.CHECKS),
+                        help=f"comma separated subset of {', '.join(BatchAnalyzer.CHECKS)}, or 'all'")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--output', '-o', default='-', help="output file, '-' for stdout")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="output format (default: from extension)")
+    parser.add_argument('--formats', type=comma_list(), default=defaults['supported_formats'],
+                        help="supported file extensions")
+    parser.add_argument('--target-rates', type=comma_list(int), default=defaults['target_rates'],
+                        help="accepted sampling rates in Hz")
+    parser.add_argument('--bit-depths', type=comma_list(), default=defaults['bit_rates'],
+                        help="accepted bit depths")
+    parser.add_argument('--rate-estimator', choices=['dominant', 'bandwidth'], default=defaults['rate_estimator'],
+                        help="'bandwidth' detects the spectral cutoff from a fixed number of sampled frames")
+    parser.add_argument('--rate-frames', type=int, default=defaults['rate_frames'],
+                        help="frames sampled by the bandwidth estimator (accuracy/cost trade-off)")
+    parser.add_argument('--analysis-rate', type=int,
+                        help="run the noise, SNR, reverb and repeats checks on a view resampled to this rate in Hz "
+                             "(e.g. 16000); sampling rate, bandwidth and clipping always use the native decode")
+    parser.add_argument('--noise-threshold-db', type=float, default=defaults['noise_threshold_db'])
+    parser.add_argument('--snr-threshold-db', type=float, default=defaults['snr_threshold_db'])
+    parser.add_argument('--clipping-threshold', type=float, default=defaults['clipping_threshold'])
+    parser.add_argument('--reverb-limit', type=float, default=defaults['reverb_limit'])
+    parser.add_argument('--repeat-min-seconds', type=float, default=defaults['repeat_min_seconds'],
+                        help="shortest stretch the repeats check reports when it occurs twice in one file")
+    parser.add_argument('--cache-max-mb', type=int, default=defaults['cache_max_bytes'] // (1024 * 1024),
+                        help="decoded audio cache budget per worker")
+    parser.add_argument('--prefetch', type=int, default=defaults['prefetch_files'],
+                        help="files read ahead in background threads while one is analysed (0 disables; "
+                             "in-process runs only, i.e. --jobs 1)")
+    parser.add_argument('--prefetch-mb', type=int, default=defaults['prefetch_max_bytes'] // (1024 * 1024),
+                        help="budget for audio held ahead of the analysis")
+    parser.add_argument('--prefetch-mode', choices=['decode', 'read'], default=defaults['prefetch_mode'],
+                        help="'read' only pulls files into the OS cache, e.g. when most features are cached")
+    parser.add_argument('--stack', type=int, default=defaults['stack_files'],
+                        help="analyse short clips in groups of this many, computing level, SNR, clipping and reverb "
+                             "for a whole group in stacked vectorised passes (0 disables)")
+    parser.add_argument('--stack-max-seconds', type=float, default=defaults['stack_max_seconds'],
+                        help="longer files in a group are measured on their own")
+    parser.add_argument('--feature-cache', default=FeatureCache.default_cache_path(),
+                        help="SQLite feature cache reused across runs")
+    parser.add_argument('--no-feature-cache', action='store_true')
+    parser.add_argument('--timings', action='store_true',
+                        help="record per-check wall time, decode time, bytes read and cache counters per file, "
+                             "and print a timing summary")
+    parser.add_argument('--shard', type=shard_argument, metavar='I/N',
+                        help="analyse only shard I of N (0-based), picked by a stable hash of each path, and write a "
+                             "self-describing JSONL partial result; run every shard on the same inputs, e.g. N "
+                             "processes or machines, then combine them with --merge")
+    parser.add_argument('--merge', action='store_true',
+                        help="combine the partial result files given as inputs into one report (csv, xlsx, pdf or "
+                             "jsonl by --output extension) and recompute the aggregate statistics")
+    parser.add_argument('--stats', help="with --merge, also write the aggregate statistics as JSON")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep watching the input directories and analyse new or modified files as they land")
+    parser.add_argument('--poll-interval', type=float, default=1.0, help="seconds between watch polls")
+    parser.add_argument('--settle-seconds', type=float, default=2.0,
+                        help="a file must stop changing for this long before it is analysed")
+    return parser
+
+
+def settings_from_args(args):
+    return {
+        'supported_formats': args.formats,
+        'target_rates': args.target_rates,
+        'bit_rates': args.bit_depths,
+        'rate_estimator': args.rate_estimator,
+        'rate_frames': args.rate_frames,
+        'noise_threshold_db': args.noise_threshold_db,
+        'snr_threshold_db': args.snr_threshold_db,
+        'clipping_threshold': args.clipping_threshold,
+        'reverb_limit': args.reverb_limit,
+        'repeat_min_seconds': args.repeat_min_seconds,
+        'analysis_rates': low_rate_profile(args.analysis_rate),
+        'cache_max_bytes': args.cache_max_mb * 1024 * 1024,
+        'feature_cache_path': None if args.no_feature_cache else args.feature_cache,
+        'prefetch_files': args.prefetch,
+        'prefetch_max_bytes': args.prefetch_mb * 1024 * 1024,
+        'prefetch_mode': args.prefetch_mode,
+        'stack_files': args.stack,
+        'stack_max_seconds': args.stack_max_seconds,
+        'instrument': args.timings,
+    }
+
+
+def merge(args):
+    table, problems = merge_partials(args.inputs)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    output = args.output.lower()
+    if args.output == '-':
+        writer = JsonlWriter(sys.stdout)
+        for record in table.records():
+            writer.write(record.to_dict())
+    elif output.endswith('.csv') or args.format == 'csv':
+        ReportWriters.write_csv(table, args.output)
+    elif output.endswith('.xlsx'):
+        ReportWriters.write_excel(table, args.output)
+    elif output.endswith('.pdf'):
+        ReportWriters.write_pdf(table, args.output)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            writer = JsonlWriter(f)
+            for record in table.records():
+                writer.write(record.to_dict())
+
+    stats = table.statistics()
+    if args.stats:
+        with open(args.stats, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+    print(f"{stats['files']} file(s) merged from {len(args.inputs)} partial(s), {stats['invalid']} invalid",
+          file=sys.stderr)
+    for name in ('noise_db', 'snr_db'):
+        if stats[name]:
+            print(f"{name}: mean {stats[name]['mean']:.2f}, median {stats[name]['median']:.2f}, "
+                  f"min {stats[name]['min']:.2f}, max {stats[name]['max']:.2f}", file=sys.stderr)
+    if stats['clipping_files']:
+        print(f"clipping: {stats['clipping_files']} file(s), {stats['clipping_points']} clipped sample(s)",
+              file=sys.stderr)
+    if stats['channel_modes']:
+        print("channel modes: " + ", ".join(f"{mode} {count}" for mode, count in stats['channel_modes'].items()),
+              file=sys.stderr)
+    if problems:
+        return 2
+    return 1 if stats['invalid'] else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.merge:
+        return merge(args)
+    output_format = args.format or ('csv' if args.output.lower().endswith('.csv') else 'jsonl')
+    if args.shard and output_format != 'jsonl':
+        print("Shard results are written as JSONL partials; use --merge to produce CSV", file=sys.stderr)
+        return 2
+    if args.watch and not any(os.path.isdir(item) for item in args.inputs):
+        print("--watch needs at least one directory to watch", file=sys.stderr)
+        return 2
+    settings = settings_from_args(args)
+    stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    if args.shard:
+        writer = PartialWriter(stream, *args.shard, args.checks, settings, args.inputs)
+    else:
+        writer = CsvWriter(stream, args.timings) if output_format == 'csv' else JsonlWriter(stream)
+
+    analyzer = BatchAnalyzer.BatchAnalyzer(settings, args.jobs, keep_pool=args.watch)
+    counts = {'total': 0, 'invalid': 0}
+    timing_summary = TimingSummary(analyzer.jobs)
+    timing_summary.start()
+
+    expectations = {}  # of manifest entries read but not yet analysed
+
+    def analyse(file_paths):
+        if args.shard:
+            file_paths = in_shard(file_paths, *args.shard, skipped=lambda file_path: expectations.pop(file_path, None))
+        for record in analyzer.run(file_paths, args.checks, expectations):
+            timing_summary.add(record['file_name'], record.get('timings'))
+            writer.write(record)
+            counts['total'] += 1
+            counts['invalid'] += not record['valid']
+
+    try:
+        if args.watch:
+            directories = [item for item in args.inputs if os.path.isdir(item)]
+            watcher = FolderWatcher(directories, settle_seconds=args.settle_seconds)
+            analyse(iter_input_files([item for item in args.inputs if not os.path.isdir(item)],
+                                     expectations=expectations))
+            print(f"Watching {', '.join(directories)} (Ctrl+C to stop)", file=sys.stderr)
+            while True:
+                ready = watcher.poll()
+                if ready:
+                    analyse(ready)
+                else:
+                    time.sleep(args.poll_interval)
+        else:
+            analyse(iter_input_files(args.inputs, expectations=expectations))
+            if args.shard:
+                writer.finish()
+    except KeyboardInterrupt:
+        analyzer.cancel()
+        print("Interrupted", file=sys.stderr)
+    finally:
+        analyzer.close()
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(f"{counts['total']} file(s) analysed, {counts['invalid']} invalid", file=sys.stderr)
+    if args.timings:
+        timing_summary.finish()
+        for line in timing_summary.summary_lines():
+            print(line, file=sys.stderr)
+    return 1 if counts['invalid'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import os
+import struct
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from pydub.utils import mediainfo
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _info(container, codec, sample_rate, channels, bits_per_sample, frames):
+    duration = frames / sample_rate if sample_rate and frames is not None else None
+    return {
+        'format_name': container,
+        'codec_name': codec,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'bits_per_sample': bits_per_sample,
+        'duration': duration,
+    }
+
+
+def _pcm_codec(bits, endian, is_float=False):
+    if is_float:
+        return f'pcm_f{bits}{endian}'
+    if bits <= 8:
+        return 'pcm_u8' if endian == 'le' else 'pcm_s8'
+    return f'pcm_s{(bits + 7) // 8 * 8}{endian}'
+
+
+def _read_wav(f, header):
+    riff_id = header[:4]
+    endian = '>' if riff_id == b'RIFX' else '<'
+    fmt = None
+    data_size = None
+    ds64_data_size = None
+    f.seek(12)
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_id = chunk_header[:4]
+        chunk_size = struct.unpack(endian + 'I', chunk_header[4:])[0]
+        if chunk_id == b'fmt ':
+            fmt = f.read(min(chunk_size, 40))
+            f.seek(chunk_size - len(fmt), os.SEEK_CUR)
+        elif chunk_id == b'ds64':
+            ds64 = f.read(min(chunk_size, 24))
+            if len(ds64) < 16:
+                return None
+            ds64_data_size = struct.unpack('<Q', ds64[8:16])[0]
+            f.seek(chunk_size - len(ds64), os.SEEK_CUR)
+        elif chunk_id == b'data':
+            data_size = ds64_data_size if chunk_size == 0xFFFFFFFF and ds64_data_size is not None else chunk_size
+            if fmt is not None:
+                break
+            f.seek(chunk_size, os.SEEK_CUR)
+        else:
+            f.seek(chunk_size, os.SEEK_CUR)
+        if chunk_size % 2:
+            f.seek(1, os.SEEK_CUR)
+    if fmt is None or len(fmt) < 16:
+        return None
+
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack(endian + 'HHIIHH', fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        valid_bits = struct.unpack(endian + 'H', fmt[18:20])[0]
+        format_tag = struct.unpack(endian + 'H', fmt[24:26])[0]
+        bits = valid_bits or bits
+    if format_tag == WAVE_FORMAT_PCM:
+        codec = _pcm_codec(bits, 'be' if endian == '>' else 'le')
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        codec = _pcm_codec(bits, 'be' if endian == '>' else 'le', is_float=True)
+    else:
+        # Compressed payload (ADPCM, MP3-in-WAV, ...): leave it to ffprobe
+        return None
+    frames = data_size // block_align if data_size is not None and block_align else None
+    return _info('wav', codec, sample_rate, channels, bits, frames)
+
+
+def _read_flac(f, offset):
+    f.seek(offset + 4)
+    while True:
+        block_header = f.read(4)
+        if len(block_header) < 4:
+            return None
+        is_last = block_header[0] & 0x80
+        block_type = block_header[0] & 0x7F
+        block_size = int.from_bytes(block_header[1:], 'big')
+        if block_type == 0:
+            streaminfo = f.read(block_size)
+            if len(streaminfo) < 18:
+                return None
+            packed = int.from_bytes(streaminfo[10:18], 'big')
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x7) + 1
+            bits = ((packed >> 36) & 0x1F) + 1
+            frames = packed & 0xFFFFFFFFF
+            return _info('flac', 'flac', sample_rate, channels, bits, frames or None)
+        if is_last:
+            return None
+        f.seek(block_size, os.SEEK_CUR)
+
+
+def _extended_to_float(data):
+    # 80-bit IEEE 754 extended precision, as used for the AIFF sample rate
+    exponent = struct.unpack('>H', data[:2])[0]
+    mantissa = struct.unpack('>Q', data[2:10])[0]
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+
+def _read_aiff(f, header):
+    is_aifc = header[8:12] == b'AIFC'
+    f.seek(12)
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id = chunk_header[:4]
+        chunk_size = struct.unpack('>I', chunk_header[4:])[0]
+        if chunk_id == b'COMM':
+            comm = f.read(chunk_size)
+            if len(comm) < 18:
+                return None
+            channels, frames, bits = struct.unpack('>HIH', comm[:8])
+            sample_rate = int(round(_extended_to_float(comm[8:18])))
+            compression = comm[18:22] if is_aifc and len(comm) >= 22 else b'NONE'
+            if compression in (b'NONE', b'twos'):
+                codec = _pcm_codec(bits, 'be')
+            elif compression == b'sowt':
+                codec = _pcm_codec(bits, 'le')
+            elif compression in (b'fl32', b'FL32'):
+                codec, bits = 'pcm_f32be', 32
+            elif compression in (b'fl64', b'FL64'):
+                codec, bits = 'pcm_f64be', 64
+            else:
+                return None
+            return _info('aiff', codec, sample_rate, channels, bits, frames)
+        f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _skip_id3(f, header):
+    if header[:3] != b'ID3' or len(header) < 10:
+        return 0
+    size = 0
+    for byte in header[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    return 10 + size
+
+
+def read_header(file_path):
+    with open(file_path, 'rb') as f:
+        header = f.read(12)
+        if len(header) < 12:
+            return None
+        if header[:4] in (b'RIFF', b'RIFX', b'RF64', b'BW64') and header[8:12] == b'WAVE':
+            return _read_wav(f, header)
+        if header[:4] == b'FORM' and header[8:12] in (b'AIFF', b'AIFC'):
+            return _read_aiff(f, header)
+        offset = _skip_id3(f, header)
+        f.seek(offset)
+        if f.read(4) == b'fLaC':
+            return _read_flac(f, offset)
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def ffprobe_info(file_path):
+    info = mediainfo(file_path)
+    return {
+        'format_name': info.get('format_name', ''),
+        'codec_name': info.get('codec_name', ''),
+        'sample_rate': _to_int(info.get('sample_rate')),
+        'channels': _to_int(info.get('channels')),
+        'bits_per_sample': _to_int(info.get('bits_per_sample')),
+        'duration': _to_float(info.get('duration')),
+    }
+
+
+class AudioProbe:
+    def __init__(self, max_workers=8, fallback=None):
+        self.max_workers = max_workers
+        # Used for containers without a parsable header (mp3, m4a, ...); defaults to ffprobe
+        self.fallback = fallback or ffprobe_info
+        self._results = {}  # (path, size, mtime_ns) -> info dict
+
+    def _key(self, file_path):
+        stat = os.stat(file_path)
+        return file_path, stat.st_size, stat.st_mtime_ns
+
+    def probe(self, file_path):
+        key = self._key(file_path)
+        info = self._results.get(key)
+        if info is None:
+            try:
+                info = read_header(file_path)
+            except (OSError, struct.error, ValueError):
+                # Unreadable or truncated header: let the fallback have a go
+                info = None
+            info = info or self.fallback(file_path)
+            self._results[key] = info
+        return info
+
+    def probe_many(self, file_paths):
+        # Container headers are parsed inline; only the leftovers spawn ffprobe, concurrently
+        results = {}
+        remaining = []
+        for file_path in file_paths:
+            try:
+                key = self._key(file_path)
+            except OSError:
+                continue
+            info = self._results.get(key)
+            if info is None:
+                try:
+                    info = read_header(file_path)
+                except OSError:
+                    continue
+                except (struct.error, ValueError):
+                    info = None
+            if info is None:
+                remaining.append((file_path, key))
+            else:
+                self._results[key] = results[file_path] = info
+
+        if remaining:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [(file_path, key, executor.submit(self.fallback, file_path)) for file_path, key in remaining]
+                for file_path, key, future in futures:
+                    try:
+                        self._results[key] = results[file_path] = future.result()
+                    except Exception as e:
+                        print(f"Error probing {file_path}: {e}", file=sys.stderr)
+        return results
+
+    def clear(self):
+        self._results.clear()
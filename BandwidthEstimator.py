@@ -0,0 +1,68 @@
+import numpy as np
+
+STANDARD_RATES = [8000, 11025, 16000, 22050, 32000, 44100, 48000, 88200, 96000, 176400, 192000, 384000]
+
+
+def closest_standard_rate(bandwidth_hz):
+    # Content that stops at bandwidth_hz was most likely produced at twice that rate
+    effective_sr = bandwidth_hz * 2
+    return min(STANDARD_RATES, key=lambda rate: abs(rate - effective_sr))
+
+
+class BandwidthEstimator:
+    # Finds the spectral cutoff (the true content bandwidth) from a bounded, stratified sample of
+    # frames, so the FFT work per file is fixed by max_frames however long the file is. More frames
+    # give a steadier average spectrum at proportionally higher cost.
+    def __init__(self, n_fft=4096, max_frames=64, seed=0, floor_margin_db=10.0, dynamic_range_db=90.0,
+                 min_drop_db=20.0):
+        self.n_fft = n_fft
+        self.max_frames = max_frames
+        self.seed = seed  # fixed so repeated runs (and the feature cache) see the same frames
+        self.floor_margin_db = floor_margin_db
+        self.dynamic_range_db = dynamic_range_db
+        self.min_drop_db = min_drop_db  # a smaller drop across the cutoff is treated as a natural roll-off
+        self.window = np.hanning(n_fft).astype(np.float32)
+
+    def sample_frames(self, y):
+        # One frame from a random position inside each of up to max_frames equal strata of the file
+        if y.ndim > 1:
+            y = y.mean(axis=0)
+        if y.shape[0] < self.n_fft:
+            y = np.pad(y, (0, self.n_fft - y.shape[0]))
+        positions = y.shape[0] - self.n_fft + 1
+        count = max(1, min(self.max_frames, positions // (self.n_fft // 2)))
+        edges = np.linspace(0, positions, count + 1)
+        rng = np.random.default_rng(self.seed)
+        starts = (edges[:-1] + rng.random(count) * (edges[1:] - edges[:-1])).astype(np.int64)
+        starts = np.minimum(starts, positions - 1)
+        return y[starts[:, None] + np.arange(self.n_fft)]
+
+    def estimate(self, y, sr):
+        # Returns (cutoff frequency in Hz, confidence in [0, 1]); (None, 0.0) for silence
+        power = np.abs(np.fft.rfft(self.sample_frames(y) * self.window, axis=1)) ** 2
+        energy = power.sum(axis=1)
+        active = energy > energy.max() * 1e-6 if energy.max() > 0 else np.zeros_like(energy, dtype=bool)
+        if not active.any():
+            return None, 0.0
+        spectrum_db = 10 * np.log10(power[active].mean(axis=0) + 1e-20)
+        band = max(4, spectrum_db.shape[0] // 50)
+        nyquist = sr / 2
+
+        floor = np.percentile(spectrum_db, 5)
+        threshold = max(floor + self.floor_margin_db, spectrum_db.max() - self.dynamic_range_db)
+        above = np.flatnonzero(spectrum_db > threshold)
+        cutoff_bin = above[-1] if above.size else spectrum_db.shape[0] - 1
+        if cutoff_bin >= spectrum_db.shape[0] - band:
+            drop_db = 0.0
+        else:
+            drop_db = (spectrum_db[max(0, cutoff_bin - band):cutoff_bin + 1].mean() -
+                       spectrum_db[cutoff_bin + 1:cutoff_bin + 1 + band].mean())
+
+        # Few usable frames make the averaged spectrum noisy
+        sample_weight = min(1.0, active.sum() / 8)
+        if drop_db < self.min_drop_db:
+            # No steep edge anywhere: the content runs up to Nyquist
+            return nyquist, float(np.clip(1 - drop_db / self.min_drop_db, 0, 1) * sample_weight)
+        cutoff = cutoff_bin * sr / self.n_fft
+        confidence = np.clip((drop_db - self.min_drop_db) / self.min_drop_db, 0, 1) * sample_weight
+        return float(cutoff), float(confidence)
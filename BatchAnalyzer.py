@@ -0,0 +1,475 @@
+import itertools
+import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import AudioFileChecker
+import FeatureCache
+from Instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from Prefetcher import Prefetcher
+
+CHECKS = ['format', 'sampling_rate', 'noise', 'snr', 'clipping', 'reverb', 'channel_mode', 'bit_depth', 'repeats']
+
+# Checks that decode the audio; others only read headers, so decoding ahead for them would be wasted
+DECODING_CHECKS = ('sampling_rate', 'noise', 'snr', 'clipping', 'reverb', 'channel_mode', 'repeats')
+
+ANALYSIS_TYPE_CHECKS = {
+    "Verify Format and Sampling Rate": ['format', 'sampling_rate'],
+    "Analyze Background Noise": ['noise'],
+    "Analyze SNR": ['snr'],
+    "Detect Clipping": ['clipping'],
+    "Analyze Reverb": ['reverb'],
+    "Inspect Channel Mode": ['channel_mode'],
+    "Verify Bit Depth": ['bit_depth'],
+    "Detect Repeated Segments": ['repeats'],
+}
+
+# Invalid reason for a file that does not match its manifest entry (AudioFileChecker.check_expectations)
+EXPECTATION_REASONS = {
+    'sample_rate': "Unexpected Sample Rate",
+    'bit_depth': "Unexpected Bit Depth",
+    'channels': "Unexpected Channel Count",
+    'format': "Unexpected Format",
+}
+
+
+def default_settings():
+    return {
+        'supported_formats': ['wav', 'mp3', 'flac', 'm4a'],
+        'target_rates': [44100, 48000],
+        'bit_rates': ['8', '16', '24', '32'],
+        'noise_threshold_db': 50,
+        'snr_threshold_db': 15,
+        'rate_estimator': 'dominant',  # or 'bandwidth'
+        'rate_frames': 64,
+        'clipping_threshold': 0.99,
+        'reverb_limit': 2,
+        'repeat_min_seconds': 1.0,  # shortest duplicated stretch reported by the repeats check
+        'analysis_rates': {},  # check -> Hz for AudioFileChecker.LOW_RATE_CHECKS, see low_rate_profile
+        'cache_max_bytes': 1024 * 1024 * 1024,
+        'feature_cache_path': None,
+        # Read-ahead of the in-process path: files decoded ('decode') or only read ('read') while the
+        # current one is analysed, under a byte budget; 0 files disables it
+        'prefetch_files': 2,
+        'prefetch_max_bytes': 256 * 1024 * 1024,
+        'prefetch_mode': 'decode',
+        # Clips of at most stack_max_seconds are analysed in groups of stack_files, their level, SNR, clipping
+        # and reverb features computed for the whole group at once (see analyze_stack); 0 analyses file by file
+        'stack_files': 0,
+        'stack_max_seconds': 30.0,
+        'instrument': False,  # per-check timings and cache counters in each record
+    }
+
+
+def create_checker(settings):
+    feature_cache = None
+    if settings.get('feature_cache_path'):
+        try:
+            feature_cache = FeatureCache.FeatureCache(settings['feature_cache_path'])
+        except Exception as e:
+            print(f"Feature cache disabled: {e}", file=sys.stderr)
+    return AudioFileChecker.AudioFileChecker(settings['supported_formats'], settings['target_rates'],
+                                             cache_max_bytes=settings['cache_max_bytes'],
+                                             feature_cache=feature_cache,
+                                             analysis_rates=settings.get('analysis_rates'))
+
+
+def format_segment(segment):
+    return (f"{segment['source']:.2f}s -> {segment['target']:.2f}s ({segment['duration']:.2f}s, "
+            f"{segment['distance']:.2f} dB)")
+
+
+def _to_float(value):
+    return None if value is None else float(value)
+
+
+def _cache_counters(checker):
+    counters = {'audio_cache_hits': checker.audio_cache.hits, 'audio_cache_misses': checker.audio_cache.misses}
+    if checker.feature_cache is not None:
+        counters.update(feature_cache_hits=checker.feature_cache.hits,
+                        feature_cache_misses=checker.feature_cache.misses)
+    return counters
+
+
+def analyze_file(checker, file_path, checks, settings, prefetched=None, expected=None):
+    # Runs the selected checks on one file and returns a compact, picklable record without raw arrays;
+    # prefetched is the file's Prefetched item when it went through a read-ahead stage, expected the
+    # expectations of its manifest entry, checked whatever checks are selected
+    record = {'file_path': file_path, 'file_name': os.path.basename(file_path), 'valid': True,
+              'invalid_reasons': []}
+    reasons = record['invalid_reasons']
+    instrumentation = Instrumentation() if settings.get('instrument') else NULL_INSTRUMENTATION
+    if instrumentation.enabled:
+        counters_before = _cache_counters(checker)
+        started = time.perf_counter()
+    checker.instrumentation = instrumentation
+    context = checker.analysis_context(file_path)
+    if prefetched is not None:
+        if prefetched.audio is not None:
+            # Decoded ahead, so load_audio will not count the file's bytes itself
+            checker.adopt_audio(file_path, prefetched.audio)
+            instrumentation.add('bytes_read', prefetched.bytes_read)
+            instrumentation.add('decode_s', prefetched.decode_s)
+        instrumentation.add('prefetch_wait_s', prefetched.wait_s)
+    try:
+        if 'format' in checks:
+            with instrumentation.timer('format_s'):
+                format_ok, file_format = checker.check_format(file_path)
+                record.update(format_ok=bool(format_ok), file_format=file_format)
+                if not format_ok:
+                    reasons.append("Unsupported Format")
+
+        if 'sampling_rate' in checks:
+            with instrumentation.timer('sampling_rate_s'):
+                rate_ok, file_rate, frequency, confidence = checker.assess_sampling_rate(
+                    file_path, settings['target_rates'], context=context, mode=settings['rate_estimator'],
+                    max_frames=settings['rate_frames'])
+                if settings['rate_estimator'] == 'bandwidth':
+                    record.update(bandwidth_hz=frequency, bandwidth_confidence=confidence)
+                record.update(rate_ok=bool(rate_ok), sample_rate=file_rate)
+                if not rate_ok:
+                    reasons.append("Invalid Sampling Rate")
+
+        if 'noise' in checks:
+            with instrumentation.timer('noise_s'):
+                noise_level, acceptable = checker.calculate_rms(file_path, settings['noise_threshold_db'],
+                                                                context=context)
+                record.update(noise_db=_to_float(noise_level), noise_ok=bool(acceptable))
+                if not acceptable:
+                    reasons.append("High Background Noise")
+
+        if 'snr' in checks:
+            with instrumentation.timer('snr_s'):
+                snr, acceptable = checker.calculate_snr(file_path, settings['snr_threshold_db'], context=context)
+                record.update(snr_db=_to_float(snr), snr_ok=bool(acceptable))
+                if not acceptable:
+                    reasons.append("Low SNR")
+
+        if 'clipping' in checks:
+            with instrumentation.timer('clipping_s'):
+                clipping, events = checker.detect_clipping(file_path, settings['clipping_threshold'], context=context)
+                record.update(clipping=bool(clipping))
+                if events is not None:
+                    record.update(clipping_points=events.clipped_samples, clipping_events=events.event_count,
+                                  clipping_ratio=events.clipped_ratio, clipping_longest_run=events.longest_run)
+                if clipping:
+                    reasons.append("Clipping Detected")
+
+        if 'reverb' in checks:
+            with instrumentation.timer('reverb_s'):
+                rt60 = checker.calculate_reverb(file_path, context=context)
+                reverb_ok = rt60 is not None and rt60 < settings['reverb_limit']
+                record.update(rt60=_to_float(rt60), reverb_ok=reverb_ok)
+                if not reverb_ok:
+                    reasons.append("High Reverb Time (RT60)")
+
+        if 'channel_mode' in checks:
+            with instrumentation.timer('channel_mode_s'):
+                channel_mode, num_channels = checker.check_channel_mode(file_path, context=context)
+                record.update(channel_mode=channel_mode, num_channels=num_channels)
+                if channel_mode not in ["stereo", "mono"]:
+                    reasons.append("Invalid Channel Mode")
+                metrics = checker.channel_metrics(file_path, settings['clipping_threshold'], context=context)
+                if metrics is not None:
+                    record.update(channel_rms_db=metrics.rms_db, channel_snr_db=metrics.snr_db,
+                                  channel_peak=metrics.peak, channel_dc_offset=metrics.dc_offset,
+                                  channel_clipped=metrics.clipped_samples,
+                                  channel_correlation=metrics.stereo_correlation,
+                                  fake_stereo=metrics.fake_stereo, phase_inverted=metrics.phase_inverted)
+                    if metrics.fake_stereo:
+                        reasons.append("Fake Stereo")
+                    if metrics.phase_inverted:
+                        reasons.append("Phase Inverted Channels")
+
+        if 'bit_depth' in checks:
+            with instrumentation.timer('bit_depth_s'):
+                bit_depth, valid = checker.check_bit_depth(file_path, settings['bit_rates'])
+                record.update(bit_depth=bit_depth, bit_depth_ok=bool(valid))
+                if not valid:
+                    reasons.append("Invalid Bit Depth")
+
+        if 'repeats' in checks:
+            with instrumentation.timer('repeats_s'):
+                repeated, segments = checker.find_repeated_segments(file_path, settings['repeat_min_seconds'],
+                                                                    context=context)
+                record.update(repeats=bool(repeated))
+                if segments is not None:
+                    record.update(repeat_count=len(segments),
+                                  repeat_segments=[format_segment(segment) for segment in segments])
+                if repeated:
+                    reasons.append("Repeated Segments")
+
+        if expected:
+            mismatches = checker.check_expectations(file_path, expected)
+            if mismatches:
+                record.update(expectation_mismatches=[f"{name}: expected {value}, found {found}"
+                                                      for name, value, found in mismatches])
+                reasons.extend(EXPECTATION_REASONS[name] for name, _, _ in mismatches)
+    except Exception as e:
+        record['error'] = str(e)
+        reasons.append("Analysis Error")
+    finally:
+        context.release()
+        checker.instrumentation = NULL_INSTRUMENTATION
+
+    if instrumentation.enabled:
+        instrumentation.add('total_s', time.perf_counter() - started)
+        for name, value in _cache_counters(checker).items():
+            instrumentation.add(name, value - counters_before[name])
+        record['timings'] = instrumentation.values
+
+    record['valid'] = not reasons
+    return record
+
+
+def analyze_stack(checker, file_paths, checks, settings, prefetched=None, expected=None):
+    # Analyses a group of short clips: the features of the STACKED_CHECKS among checks are computed for all of
+    # them in stacked passes first (AudioFileChecker.stack_features), then every file goes through analyze_file
+    # and finds them ready. Returns the records in file_paths order; the group's decode and stacking time is
+    # shared out evenly over its records. expected, if given, holds each file's manifest expectations.
+    instrumentation = Instrumentation() if settings.get('instrument') else NULL_INSTRUMENTATION
+    if instrumentation.enabled:
+        counters_before = _cache_counters(checker)
+    checker.instrumentation = instrumentation
+    try:
+        with instrumentation.timer('stack_s'):
+            for item in prefetched or ():
+                if item.audio is not None:
+                    checker.adopt_audio(item.file_path, item.audio)
+                    instrumentation.add('bytes_read', item.bytes_read)
+                    instrumentation.add('decode_s', item.decode_s)
+                instrumentation.add('prefetch_wait_s', item.wait_s)
+            checker.stack_features(file_paths, checks, settings['clipping_threshold'], settings['stack_max_seconds'])
+    except Exception as e:
+        # Whatever was not precomputed is measured file by file below
+        print(f"Error in stacked analysis: {e}", file=sys.stderr)
+    finally:
+        checker.instrumentation = NULL_INSTRUMENTATION
+    if instrumentation.enabled:
+        for name, value in _cache_counters(checker).items():
+            instrumentation.add(name, value - counters_before[name])
+
+    records = [analyze_file(checker, file_path, checks, settings, expected=file_expected)
+               for file_path, file_expected in zip(file_paths, expected or [None] * len(file_paths))]
+    if instrumentation.enabled and records:
+        for record in records:
+            for name, value in instrumentation.values.items():
+                record['timings'][name] = record['timings'].get(name, 0) + value / len(records)
+            record['timings']['total_s'] += instrumentation.values['stack_s'] / len(records)
+    return records
+
+
+def stack_size(settings, checks):
+    # Files per stacked group, or 0 when the selected checks have nothing to stack
+    if not any(check in AudioFileChecker.STACKED_CHECKS for check in checks):
+        return 0
+    return max(0, settings['stack_files'])
+
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+_worker_checker = None
+_worker_settings = None
+
+
+def _init_worker(settings):
+    global _worker_checker, _worker_settings
+    # Ctrl+C reaches the whole process group; the parent cancels the run and shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_settings = settings
+    _worker_checker = create_checker(settings)
+
+
+def _analyze_in_worker(file_path, checks, expected=None):
+    return analyze_file(_worker_checker, file_path, checks, _worker_settings, expected=expected)
+
+
+def _analyze_stack_in_worker(file_paths, checks, expected=None):
+    return analyze_stack(_worker_checker, file_paths, checks, _worker_settings, expected=expected)
+
+
+class BatchAnalyzer:
+    def __init__(self, settings=None, jobs=None, checker=None, keep_pool=False):
+        self.settings = dict(default_settings(), **(settings or {}))
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.checker = checker  # reused by the in-process path so its caches survive between runs
+        # With keep_pool the worker processes outlive a run, so repeated small runs (watch mode) don't
+        # pay process start-up and imports each time; call close() when done
+        self.keep_pool = keep_pool
+        self._executor = None
+        self._prefetcher = None
+        self._cancelled = False
+        self._expectations = {}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def cancel(self):
+        self._cancelled = True
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def run(self, file_paths, checks=None, expectations=None):
+        # Yields one record per file in completion order; file_paths may be any lazy iterable. expectations
+        # maps file paths to their manifest expectations and may be filled while file_paths is iterated
+        # (Manifest.paths); each entry is popped when its file is scheduled.
+        checks = list(checks or CHECKS)
+        self._cancelled = False
+        self._expectations = expectations if expectations is not None else {}
+        if self.jobs == 1:
+            yield from self._run_in_process(file_paths, checks)
+        else:
+            yield from self._run_in_pool(file_paths, checks)
+
+    def _run_in_process(self, file_paths, checks):
+        if self.checker is None:
+            self.checker = create_checker(self.settings)
+        if isinstance(file_paths, (list, tuple)) and ('channel_mode' in checks or 'bit_depth' in checks):
+            # Read every container header up front so leftover ffprobe calls run as one concurrent batch
+            self.checker.probe_many(file_paths)
+        prefetcher = self.create_prefetcher(checks)
+        group_size = stack_size(self.settings, checks)
+        if prefetcher is None:
+            if group_size:
+                for group in _chunks(file_paths, group_size):
+                    yield from self._unless_cancelled(analyze_stack(
+                        self.checker, group, checks, self.settings, expected=[self._expected(path) for path in group]))
+                return
+            for file_path in file_paths:
+                if self._cancelled:
+                    return
+                yield analyze_file(self.checker, file_path, checks, self.settings, expected=self._expected(file_path))
+            return
+
+        self._prefetcher = prefetcher
+        try:
+            if group_size:
+                for group in _chunks(prefetcher.iterate(file_paths), group_size):
+                    group_paths = [item.file_path for item in group]
+                    yield from self._unless_cancelled(analyze_stack(
+                        self.checker, group_paths, checks, self.settings, prefetched=group,
+                        expected=[self._expected(path) for path in group_paths]))
+                return
+            for item in prefetcher.iterate(file_paths):
+                if self._cancelled:
+                    return
+                yield analyze_file(self.checker, item.file_path, checks, self.settings, prefetched=item,
+                                   expected=self._expected(item.file_path))
+        finally:
+            prefetcher.cancel()
+            self._prefetcher = None
+
+    def _expected(self, file_path):
+        return self._expectations.pop(file_path, None)
+
+    def _unless_cancelled(self, records):
+        for record in records:
+            if self._cancelled:
+                return
+            yield record
+
+    def create_prefetcher(self, checks):
+        # Worker processes already overlap one another's I/O, so only the in-process path reads ahead
+        mode = self.settings['prefetch_mode']
+        if self.settings['prefetch_files'] <= 0 or (mode == 'decode' and
+                                                    not any(check in DECODING_CHECKS for check in checks)):
+            return None
+        checker = self.checker
+        # Files whose features are all cached are analysed from the cache alone, so aren't fetched
+        features = checker.decoding_features(checks, self.settings['rate_estimator'], self.settings['rate_frames'],
+                                             self.settings['clipping_threshold'], self.settings['repeat_min_seconds'])
+
+        def needs_decode(file_path):
+            return not checker.features_cached(file_path, features)
+
+        return Prefetcher(self.checker.decode_audio, self.settings['prefetch_files'],
+                          self.settings['prefetch_max_bytes'], mode, size_hint=self.checker.decoded_size_hint,
+                          needs_decode=needs_decode if checker.feature_cache is not None else None)
+
+    def _run_in_pool(self, file_paths, checks):
+        # At most two tasks per worker are in flight, so huge inputs are never queued up front. A task is one
+        # file, or a group of files when stacking
+        max_in_flight = self.jobs * 2
+        pending = {}
+        group_size = stack_size(self.settings, checks)
+        tasks = _chunks(file_paths, group_size) if group_size else ([file_path] for file_path in file_paths)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                                 initargs=(self.settings,))
+        executor = self._executor
+        try:
+            while True:
+                while not self._cancelled and len(pending) < max_in_flight:
+                    group = next(tasks, None)
+                    if group is None:
+                        break
+                    if group_size:
+                        future = executor.submit(_analyze_stack_in_worker, group, checks,
+                                                 [self._expected(file_path) for file_path in group])
+                    else:
+                        future = executor.submit(_analyze_in_worker, group[0], checks, self._expected(group[0]))
+                    pending[future] = group
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    group = pending.pop(future)
+                    try:
+                        result = future.result()
+                        yield from result if group_size else [result]
+                    except Exception as e:
+                        for file_path in group:
+                            yield {'file_path': file_path, 'file_name': os.path.basename(file_path),
+                                   'valid': False, 'invalid_reasons': ["Analysis Error"], 'error': str(e)}
+        finally:
+            for future in pending:
+                future.cancel()
+            if not self.keep_pool:
+                self.close()
+
+
+class CopyPasteSearch:
+    # Looks for a source file's audio in each target file; run() yields one record per target like
+    # BatchAnalyzer.run, so the GUI can run the search on its AnalysisWorker thread
+    jobs = 1
+
+    def __init__(self, checker, source_file):
+        self.checker = checker
+        self.source_file = source_file
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def run(self, file_paths, checks=None, expectations=None):
+        self._cancelled = False
+        try:
+            for file_path in file_paths:
+                if self._cancelled:
+                    return
+                found, message = self.checker.detect_copy_paste(self.source_file, file_path)
+                if file_path != self.source_file:
+                    self.checker.release_audio(file_path)
+                yield {'file_path': file_path, 'file_name': os.path.basename(file_path), 'valid': not found,
+                       'invalid_reasons': ["Copy/Paste Detected"] if found else [], 'copy_paste_match': message}
+        finally:
+            self.checker.release_audio(self.source_file)
@@ -0,0 +1,116 @@
+import numpy as np
+
+# Pairs of channels correlated above this are treated as copies of one another (fake stereo/multichannel)
+DUPLICATE_CORRELATION = 0.999
+# and below this as one channel being the polarity-inverted other
+INVERTED_CORRELATION = -0.9
+
+
+def frame_rms(y, frame_length=2048, hop_length=512, block_frames=4096):
+    # Per-channel frame RMS of a (channels, samples) signal, equal to librosa.feature.rms with center=True
+    # and zero padding, but from running sums of squares over blocks of frames, so no framed copy of the
+    # signal is ever built. Returns (channels, frames).
+    y = np.atleast_2d(y)
+    samples = y.shape[1]
+    half = frame_length // 2
+    frames = 1 + (samples + 2 * half - frame_length) // hop_length
+    rms = np.empty((y.shape[0], frames), dtype=np.float64)
+    for first in range(0, frames, block_frames):
+        last = min(frames, first + block_frames)
+        starts = np.arange(first, last) * hop_length - half
+        low = max(0, starts[0])
+        high = min(samples, starts[-1] + frame_length)
+        sums = np.zeros((y.shape[0], high - low + 1))
+        np.cumsum(np.square(y[:, low:high], dtype=np.float64), axis=1, out=sums[:, 1:])
+        begin = np.clip(starts, low, high) - low
+        end = np.clip(starts + frame_length, low, high) - low
+        rms[:, first:last] = sums[:, end] - sums[:, begin]
+    return np.sqrt(np.maximum(rms, 0) / frame_length)
+
+
+class ChannelMetrics:
+    # Level, SNR, peak, clipping, DC offset and inter-channel correlation of every channel of a file.
+    # from_signal gets all of them from one block-wise pass over the (channels, samples) array plus the
+    # frame RMS above, so a 5.1 or 7.1 stem costs the same number of passes as a mono file.
+    def __init__(self, rms_db, snr_db, peak, dc_offset, clipped_samples, correlation):
+        self.rms_db = list(rms_db)
+        self.snr_db = list(snr_db)
+        self.peak = list(peak)
+        self.dc_offset = list(dc_offset)
+        self.clipped_samples = list(clipped_samples)
+        self.correlation = np.asarray(correlation, dtype=np.float64)  # (channels, channels)
+
+    @classmethod
+    def from_signal(cls, y, clipping_threshold=0.99, frame_length=2048, hop_length=512, block_size=1 << 20):
+        y = np.atleast_2d(y)
+        num_channels, samples = y.shape
+        sums = np.zeros(num_channels)
+        products = np.zeros((num_channels, num_channels))
+        peak = np.zeros(num_channels)
+        clipped = np.zeros(num_channels, dtype=np.int64)
+        for offset in range(0, samples, block_size):
+            block = y[:, offset:offset + block_size].astype(np.float64)
+            sums += block.sum(axis=1)
+            products += block @ block.T
+            magnitude = np.abs(block)
+            peak = np.maximum(peak, magnitude.max(axis=1))
+            clipped += np.count_nonzero(magnitude > clipping_threshold, axis=1)
+
+        count = max(samples, 1)
+        mean = sums / count
+        # Covariance and correlation from the accumulated sums, without a second pass over the samples
+        covariance = products / count - np.outer(mean, mean)
+        deviation = np.sqrt(np.maximum(np.diag(covariance), 0))
+        scale = np.outer(deviation, deviation)
+        correlation = np.divide(covariance, scale, out=np.zeros_like(covariance), where=scale > 0)
+        np.fill_diagonal(correlation, 1.0)
+
+        rms = frame_rms(y, frame_length, hop_length)
+        epsilon = 1e-10
+        signal = rms.mean(axis=1)
+        noise = np.percentile(rms, 10, axis=1)
+        rms_db = 20 * np.log10(np.maximum(signal, 1e-5))
+        snr_db = 20 * np.log10((signal + epsilon) / (noise + epsilon))
+        return cls(rms_db, snr_db, peak, mean, clipped, correlation)
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values['rms_db'], values['snr_db'], values['peak'], values['dc_offset'],
+                   values['clipped_samples'], values['correlation'])
+
+    def to_dict(self):
+        return {'rms_db': [float(value) for value in self.rms_db], 'snr_db': [float(value) for value in self.snr_db],
+                'peak': [float(value) for value in self.peak],
+                'dc_offset': [float(value) for value in self.dc_offset],
+                'clipped_samples': [int(value) for value in self.clipped_samples],
+                'correlation': self.correlation.tolist()}
+
+    @property
+    def num_channels(self):
+        return len(self.rms_db)
+
+    def _pairs(self, condition):
+        first, second = np.nonzero(np.triu(condition(self.correlation), k=1))
+        return [(int(a), int(b)) for a, b in zip(first, second)]
+
+    @property
+    def duplicate_pairs(self):
+        # Channel pairs carrying the same signal (up to gain); silent channels correlate with nothing
+        return self._pairs(lambda correlation: correlation > DUPLICATE_CORRELATION)
+
+    @property
+    def inverted_pairs(self):
+        return self._pairs(lambda correlation: correlation < INVERTED_CORRELATION)
+
+    @property
+    def stereo_correlation(self):
+        # Correlation of the first two channels (left/right), None for mono
+        return float(self.correlation[0, 1]) if self.num_channels > 1 else None
+
+    @property
+    def fake_stereo(self):
+        return bool(self.duplicate_pairs)
+
+    @property
+    def phase_inverted(self):
+        return bool(self.inverted_pairs)
@@ -0,0 +1,92 @@
+from functools import cached_property
+
+import numpy as np
+
+from ClippingEvents import find_clipping_runs
+
+
+def segment_percentile(values, offsets, counts, q):
+    # Percentile q of each segment values[offsets[i]:offsets[i] + counts[i]], with numpy's default linear
+    # interpolation, for all segments in one sort instead of one np.percentile call per segment
+    segments = np.repeat(np.arange(len(counts)), counts)
+    ordered = values[np.lexsort((values, segments))]
+    position = (counts - 1) * (q / 100)
+    low = np.floor(position).astype(np.intp)
+    high = np.minimum(low + 1, counts - 1)
+    lower = ordered[offsets + low]
+    return lower + (ordered[offsets + high] - lower) * (position - low)
+
+
+class ClipStack:
+    # Many short signals packed end to end into one flat array, every channel of every clip as its own row.
+    # Rows start on a multiple of block samples and are followed by at least one zero, so sums of squares
+    # come from one pass of per-block sums over the whole pack, and no clipping run or frame crosses into
+    # the next row. Measuring a group of clips is then a few vectorised calls rather than a Python and
+    # librosa call chain per file, and unlike padding every clip to the longest one almost no work is
+    # spent on samples a clip does not have. Every value equals the one computed from that clip alone.
+    def __init__(self, signals, block=512):
+        signals = [np.atleast_2d(signal) for signal in signals]
+        self.block = block
+        self.channels = np.array([signal.shape[0] for signal in signals], dtype=np.intp)
+        self.lengths = np.array([signal.shape[1] for signal in signals], dtype=np.intp)
+        self.first_rows = np.concatenate(([0], np.cumsum(self.channels)))
+        row_blocks = np.repeat(self.lengths // block + 1, self.channels)
+        self.row_starts = np.concatenate(([0], np.cumsum(row_blocks))) * block
+        self.samples = np.zeros(int(self.row_starts[-1]), dtype=np.result_type(np.float32, *signals))
+        for signal, first in zip(signals, self.first_rows):
+            for channel, row in enumerate(signal):
+                start = self.row_starts[first + channel]
+                self.samples[start:start + len(row)] = row
+        self.clip_starts = self.row_starts[self.first_rows]
+
+    def __len__(self):
+        return len(self.lengths)
+
+    @cached_property
+    def block_energy(self):
+        # Sum of squares of every block of the pack; the float32 sums are pairwise, so as accurate as
+        # np.mean over a whole clip, and only the short per-block result is widened to float64
+        return np.square(self.samples).reshape(-1, self.block).sum(axis=1).astype(np.float64)
+
+    def frame_rms_summaries(self, frame_length=2048, hop_length=512):
+        # Mean and 10th percentile of the frame RMS of every clip, as AudioFileChecker._rms_summary gives for
+        # librosa.feature.rms with center=True and zero padding (see ChannelMetrics.frame_rms); clips must be
+        # single-channel, so pass the mono downmixes
+        if (self.channels != 1).any():
+            raise ValueError("Frame RMS summaries need one channel per clip")
+        half = frame_length // 2
+        counts = 1 + (self.lengths + 2 * half - frame_length) // hop_length
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        clips = np.repeat(np.arange(len(self)), counts)
+        frames = np.arange(offsets[-1]) - offsets[clips]
+        # Frame k of a clip covers [start + k * hop - half, + frame_length), cut to the clip's own row
+        starts = self.clip_starts[clips]
+        ends = self.row_starts[1:][clips]
+        begin = np.clip(starts + frames * hop_length - half, starts, ends)
+        end = np.clip(starts + frames * hop_length - half + frame_length, starts, ends)
+        if hop_length % self.block or half % self.block or frame_length % self.block:
+            # Frame edges off the block grid: running sums over samples instead of blocks
+            sums = np.concatenate(([0.0], np.cumsum(np.square(self.samples, dtype=np.float64))))
+        else:
+            sums = np.concatenate(([0.0], np.cumsum(self.block_energy)))
+            begin, end = begin // self.block, end // self.block
+        rms = np.sqrt(np.maximum(sums[end] - sums[begin], 0) / frame_length)
+        means = np.add.reduceat(rms, offsets[:-1]) / counts
+        p10 = segment_percentile(rms, offsets[:-1], counts, 10)
+        return [{'mean': float(mean), 'p10': float(low)} for mean, low in zip(means, p10)]
+
+    def energies(self):
+        # RMS over every sample of every channel of each clip (AudioFileChecker._signal_rms)
+        sums = np.add.reduceat(self.block_energy, self.clip_starts[:-1] // self.block)
+        return [float(value) for value in np.sqrt(sums / (self.channels * self.lengths))]
+
+    def clipping_runs(self, threshold):
+        # Clipping runs of every clip (see find_clipping_runs) from one scan of the pack, mapped back to
+        # their clip, channel and offset
+        events = find_clipping_runs(self.samples, threshold)
+        rows = np.searchsorted(self.row_starts, events['start'], side='right') - 1
+        clips = np.searchsorted(self.first_rows, rows, side='right') - 1
+        events['start'] -= self.row_starts[rows]
+        events['channel'] = rows - self.first_rows[clips]
+        bounds = np.searchsorted(clips, np.arange(len(self) + 1))
+        return [events[bounds[clip]:bounds[clip + 1]] for clip in range(len(self))]
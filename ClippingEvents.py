@@ -0,0 +1,128 @@
+import numpy as np
+
+EVENT_DTYPE = np.dtype([('start', np.int64), ('length', np.int64), ('channel', np.int16), ('peak', np.float32)])
+
+
+def _merge_adjacent(events):
+    # Runs are found per block, so one run crossing a block boundary arrives as two touching events
+    if len(events) < 2:
+        return events
+    ends = events['start'] + events['length']
+    joins = (events['start'][1:] == ends[:-1]) & (events['channel'][1:] == events['channel'][:-1])
+    if not joins.any():
+        return events
+    first = np.flatnonzero(np.concatenate(([True], ~joins)))
+    last = np.append(first[1:], len(events)) - 1
+    merged = events[first]
+    merged['length'] = ends[last] - merged['start']
+    merged['peak'] = np.maximum.reduceat(events['peak'], first)
+    return merged
+
+
+def find_clipping_runs(y, threshold, block_size=1 << 20):
+    # Runs of consecutive samples whose magnitude exceeds threshold, as (start, length, channel, peak)
+    # events. y is (samples,) or (channels, samples); every channel of a block is scanned in the same
+    # vectorised pass and temporaries are bounded by block_size samples per channel.
+    y = np.atleast_2d(y)
+    num_channels = y.shape[0]
+    parts = []
+    for offset in range(0, y.shape[1], block_size):
+        # One unclipped column after each channel's row keeps runs from continuing into the next channel
+        width = min(block_size, y.shape[1] - offset) + 1
+        magnitude = np.zeros((num_channels, width), dtype=y.dtype)
+        np.abs(y[:, offset:offset + width - 1], out=magnitude[:, :-1])
+        magnitude = magnitude.ravel()
+        clipped = np.flatnonzero(magnitude > threshold)
+        if not len(clipped):
+            continue
+        # A run ends wherever the next clipped position is not the adjacent sample; the work after the
+        # comparison is proportional to the clipped samples, not the block
+        breaks = np.flatnonzero(np.diff(clipped) != 1) + 1
+        firsts = np.concatenate(([0], breaks))
+        starts = clipped[firsts]
+        ends = clipped[np.append(breaks, len(clipped)) - 1] + 1
+        block_events = np.empty(len(starts), dtype=EVENT_DTYPE)
+        block_events['start'] = starts % width + offset
+        block_events['length'] = ends - starts
+        block_events['channel'] = starts // width
+        block_events['peak'] = np.maximum.reduceat(magnitude[clipped], firsts)
+        parts.append(block_events)
+    if not parts:
+        return np.empty(0, dtype=EVENT_DTYPE)
+    events = np.concatenate(parts)
+    events = events[np.lexsort((events['start'], events['channel']))]
+    return _merge_adjacent(events)
+
+
+class ClippingEvents:
+    # Run-length encoded clipping of one file; memory is proportional to the number of events, the
+    # per-sample index list is only expanded on request
+    def __init__(self, events, total_samples, sr, num_channels=1):
+        self.events = events
+        self.total_samples = total_samples
+        self.sr = sr
+        self.num_channels = num_channels
+
+    @classmethod
+    def from_signal(cls, y, sr, threshold, block_size=1 << 20):
+        num_channels = y.shape[0] if y.ndim > 1 else 1
+        return cls(find_clipping_runs(y, threshold, block_size), y.shape[-1], sr, num_channels)
+
+    @property
+    def event_count(self):
+        return len(self.events)
+
+    @property
+    def clipped_samples(self):
+        return int(self.events['length'].sum())
+
+    @property
+    def clipped_ratio(self):
+        total = self.total_samples * self.num_channels
+        return self.clipped_samples / total if total else 0.0
+
+    @property
+    def longest_run(self):
+        return int(self.events['length'].max()) if len(self.events) else 0
+
+    @property
+    def peak(self):
+        return float(self.events['peak'].max()) if len(self.events) else 0.0
+
+    @property
+    def nbytes(self):
+        return self.events.nbytes
+
+    def per_second_histogram(self):
+        # Clipped samples in each second of audio (all channels summed), computed from the runs alone:
+        # the samples clipped before position b are sum(b - start) over runs starting before b minus
+        # sum(b - end) over runs ending before b
+        sr = int(self.sr)
+        seconds = -(-self.total_samples // sr) if sr else 0
+        if not seconds:
+            return np.zeros(0, dtype=np.int64)
+        boundaries = np.arange(seconds + 1, dtype=np.int64) * sr
+        starts = np.sort(self.events['start'])
+        ends = np.sort(self.events['start'] + self.events['length'])
+        start_sums = np.concatenate(([0], np.cumsum(starts)))
+        end_sums = np.concatenate(([0], np.cumsum(ends)))
+        started = np.searchsorted(starts, boundaries, side='left')
+        ended = np.searchsorted(ends, boundaries, side='left')
+        clipped_before = (started * boundaries - start_sums[started]) - (ended * boundaries - end_sums[ended])
+        return np.diff(clipped_before)
+
+    def indices(self, channel=None):
+        # Every clipped sample position, in event order; O(clipped samples) memory, so only on request
+        events = self.events if channel is None else self.events[self.events['channel'] == channel]
+        lengths = events['length']
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(events['start'] - offsets, lengths) + np.arange(int(lengths.sum()), dtype=np.int64)
+
+    def summary(self):
+        return {
+            'clipped_samples': self.clipped_samples,
+            'events': self.event_count,
+            'clipped_ratio': self.clipped_ratio,
+            'longest_run': self.longest_run,
+            'peak': self.peak,
+        }
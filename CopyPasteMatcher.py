@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class CopyPasteMatcher:
+    # Finds offsets where the first half of a source spectrogram reappears in a target spectrogram.
+    # A match means every bin satisfies np.isclose(target, pattern, atol, rtol), the same test the
+    # original sliding-window loop applied, but candidates are rejected column by column in bulk.
+    def __init__(self, source_spectrogram, sr=None, hop_length=512, atol=1e-1, rtol=1e-5):
+        half_length = source_spectrogram.shape[1] // 2
+        self.pattern = np.ascontiguousarray(source_spectrogram[:, :half_length])
+        self.sr = sr
+        self.hop_length = hop_length
+        self.atol = atol
+        self.rtol = rtol
+        self.tolerance = atol + rtol * np.abs(self.pattern)
+        # Loud columns discriminate best, so they are tested first
+        self.column_order = np.argsort(-self.pattern.sum(axis=0), kind='stable')
+        self.column_sums = self.pattern.sum(axis=0)
+        self.tolerance_sums = self.tolerance.sum(axis=0)
+
+    @property
+    def nbytes(self):
+        return self.pattern.nbytes + self.tolerance.nbytes
+
+    def find_matches(self, target_spectrogram):
+        target_length = target_spectrogram.shape[1]
+        pattern_length = min(self.pattern.shape[1], target_length)
+        if pattern_length == 0 or target_spectrogram.shape[0] != self.pattern.shape[0]:
+            return []
+
+        pattern = self.pattern[:, :pattern_length]
+        tolerance = self.tolerance[:, :pattern_length]
+        candidates = np.arange(target_length - pattern_length + 1)
+
+        # Early rejection: an element-wise match bounds the difference of the window sums
+        target_sums = np.concatenate(([0.0], np.cumsum(target_spectrogram.sum(axis=0, dtype=np.float64))))
+        window_sums = target_sums[candidates + pattern_length] - target_sums[candidates]
+        pattern_sum = self.column_sums[:pattern_length].sum(dtype=np.float64)
+        tolerance_sum = self.tolerance_sums[:pattern_length].sum(dtype=np.float64)
+        candidates = candidates[np.abs(window_sums - pattern_sum) <= tolerance_sum * (1 + 1e-6) + 1e-6]
+
+        for column in self.column_order:
+            if candidates.size == 0:
+                break
+            if column >= pattern_length:
+                continue
+            segment = target_spectrogram[:, candidates + column]
+            close = np.abs(segment - pattern[:, column:column + 1]) <= tolerance[:, column:column + 1]
+            candidates = candidates[np.all(close, axis=0)]
+
+        return [(int(offset), self.score(target_spectrogram[:, offset:offset + pattern_length], pattern))
+                for offset in candidates]
+
+    @staticmethod
+    def score(segment, pattern):
+        # Normalized cross-correlation of the matched block, 1.0 for an identical copy
+        norm = np.linalg.norm(segment) * np.linalg.norm(pattern)
+        if norm == 0:
+            return 1.0
+        return min(float(np.vdot(segment, pattern) / norm), 1.0)
+
+    def offset_seconds(self, offset):
+        if not self.sr:
+            return None
+        return offset * self.hop_length / self.sr
@@ -0,0 +1,148 @@
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+MISSING = object()
+
+
+def default_cache_path():
+    return os.path.join(os.path.expanduser('~'), '.audio_inspector', 'feature_cache.sqlite')
+
+
+class FeatureCache:
+    # Bump when a cached feature's computation changes so old rows stop matching
+    VERSION = 2
+
+    def __init__(self, db_path=None, hash_prefix_bytes=64 * 1024):
+        self.db_path = db_path or default_cache_path()
+        self.hash_prefix_bytes = hash_prefix_bytes
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._identities = {}  # (path, size, mtime_ns) -> content hash prefix
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS features (
+                path TEXT NOT NULL,
+                name TEXT NOT NULL,
+                params TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                value BLOB,
+                PRIMARY KEY (path, name, params)
+            )
+        """)
+        self._conn.commit()
+
+    def file_identity(self, file_path):
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        content_hash = self._identities.get(key)
+        if content_hash is None:
+            digest = hashlib.sha1()
+            with open(path, 'rb') as f:
+                digest.update(f.read(self.hash_prefix_bytes))
+            content_hash = digest.hexdigest()
+            self._identities[key] = content_hash
+        return path, stat.st_size, stat.st_mtime_ns, content_hash
+
+    def _params_key(self, params):
+        return json.dumps({'version': self.VERSION, 'params': params or {}}, sort_keys=True)
+
+    def get(self, file_path, name, params=None):
+        try:
+            path, size, mtime_ns, content_hash = self.file_identity(file_path)
+        except OSError:
+            return MISSING
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash, kind, value FROM features "
+                "WHERE path = ? AND name = ? AND params = ?",
+                (path, name, self._params_key(params))).fetchone()
+        if row is None or tuple(row[:3]) != (size, mtime_ns, content_hash):
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return self._decode(row[3], row[4])
+
+    def contains(self, file_path, name, params=None):
+        # Whether get would hit, without reading the value or counting the lookup
+        try:
+            path, size, mtime_ns, content_hash = self.file_identity(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM features WHERE path = ? AND name = ? AND params = ?",
+                (path, name, self._params_key(params))).fetchone()
+        return row is not None and tuple(row) == (size, mtime_ns, content_hash)
+
+    def put(self, file_path, name, value, params=None):
+        try:
+            path, size, mtime_ns, content_hash = self.file_identity(file_path)
+        except OSError:
+            return
+        kind, blob = self._encode(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO features "
+                "(path, name, params, size, mtime_ns, content_hash, kind, value) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, name, self._params_key(params), size, mtime_ns, content_hash, kind, blob))
+            self._conn.commit()
+
+    def invalidate(self, file_path):
+        with self._lock:
+            self._conn.execute("DELETE FROM features WHERE path = ?", (os.path.abspath(file_path),))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM features")
+            self._conn.commit()
+        self._identities.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, np.ndarray):
+            buffer = io.BytesIO()
+            np.save(buffer, value, allow_pickle=False)
+            return 'npy', buffer.getvalue()
+        return 'json', json.dumps(value, default=FeatureCache._json_default)
+
+    @staticmethod
+    def _decode(kind, blob):
+        if kind == 'npy':
+            return np.load(io.BytesIO(blob), allow_pickle=False)
+        return json.loads(blob)
+
+    @staticmethod
+    def _json_default(value):
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Cannot cache value of type {type(value).__name__}")
@@ -0,0 +1,134 @@
+import bisect
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class FileListModel(QAbstractListModel):
+    # The files queued for analysis, for a QListView. Files added one at a time are kept in a list; a
+    # manifest (see Manifest) stays on disk and a row is read from it only when the view asks for it, which
+    # it does for the visible rows alone. The rows are a sequence of ranges over those sources, so removing
+    # rows splits a range rather than copying paths out of a manifest.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.files = []  # paths added one at a time
+        self._known = set()
+        self.ranges = []  # [source, start, stop]; source is self.files or a Manifest
+        self._starts = [0]  # first row of each range, plus the row count
+
+    def _reindex(self):
+        starts = [0]
+        for _, start, stop in self.ranges:
+            starts.append(starts[-1] + stop - start)
+        self._starts = starts
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._starts[-1]
+
+    def _locate(self, row):
+        # (range index, row within the range's source)
+        index = bisect.bisect_right(self._starts, row) - 1
+        return index, self.ranges[index][1] + row - self._starts[index]
+
+    def entry(self, row):
+        # (file path, expectations or None); None for a manifest line that does not parse
+        index, source_row = self._locate(row)
+        source = self.ranges[index][0]
+        if source is self.files:
+            return source[source_row], None
+        return source.entry(source_row)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        entry = self.entry(index.row())
+        if entry is None:
+            return "(unreadable manifest line)"
+        file_path, expected = entry
+        if role == Qt.ToolTipRole and expected:
+            return f"{file_path}\nexpected: " + ", ".join(f"{name} {value}" for name, value in expected.items())
+        return file_path
+
+    def __contains__(self, file_path):
+        # Only files added one at a time are known; manifest entries are never held in memory
+        return file_path in self._known
+
+    def add_files(self, file_paths):
+        file_paths = [file_path for file_path in dict.fromkeys(file_paths) if file_path not in self._known]
+        if not file_paths:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(file_paths) - 1)
+        if self.ranges and self.ranges[-1][0] is self.files and self.ranges[-1][2] == len(self.files):
+            self.ranges[-1][2] += len(file_paths)
+        else:
+            self.ranges.append([self.files, len(self.files), len(self.files) + len(file_paths)])
+        self.files.extend(file_paths)
+        self._known.update(file_paths)
+        self._reindex()
+        self.endInsertRows()
+
+    def add_manifest(self, manifest):
+        count = len(manifest)
+        if not count:
+            return
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + count - 1)
+        self.ranges.append([manifest, 0, count])
+        self._reindex()
+        self.endInsertRows()
+
+    def remove_rows(self, first, last):
+        # Removes rows first..last (inclusive); a manifest range is narrowed or split, never read
+        self.beginRemoveRows(QModelIndex(), first, last)
+        ranges = []
+        for (source, start, stop), row in zip(self.ranges, self._starts):
+            end = row + stop - start
+            if end <= first or row > last:
+                ranges.append([source, start, stop])
+                continue
+            if row < first:
+                ranges.append([source, start, start + first - row])
+            if end > last + 1:
+                ranges.append([source, start + last + 1 - row, stop])
+            if source is self.files:
+                self._known.difference_update(self.files[max(start, start + first - row):
+                                                         min(stop, start + last + 1 - row)])
+        for source, _, _ in self.ranges:
+            if source is not self.files and not any(kept is source for kept, _, _ in ranges):
+                source.close()
+        self.ranges = ranges
+        self._reindex()
+        self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        for source, _, _ in self.ranges:
+            if source is not self.files:
+                source.close()
+        self.files = []
+        self._known = set()
+        self.ranges = []
+        self._reindex()
+        self.endResetModel()
+
+    def paths(self, expectations, spans=None):
+        # File paths of rows in spans, a sorted list of (first, last) row spans (default every row), read
+        # lazily; the expectations of manifest entries are stored in expectations as they are yielded. The
+        # rows are fixed when this is called, so the list can change while an analysis goes through them.
+        if spans is None:
+            spans = [(0, self.rowCount() - 1)]
+        ranges = [(source, start, stop, row) for (source, start, stop), row in zip(self.ranges, self._starts)]
+        return self._paths(ranges, spans, expectations)
+
+    def _paths(self, ranges, spans, expectations):
+        for first, last in spans:
+            for source, start, stop, row in ranges:
+                end = row + stop - start
+                if end <= first or row > last:
+                    continue
+                begin = start + max(first - row, 0)
+                finish = start + min(last + 1 - row, stop - start)
+                if source is self.files:
+                    yield from source[begin:finish]
+                else:
+                    yield from source.paths(expectations, begin, finish)
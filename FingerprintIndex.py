@@ -0,0 +1,242 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+import librosa
+import numpy as np
+from scipy.ndimage import maximum_filter
+
+
+class FingerprintIndex:
+    # Spectral-landmark (constellation hash) index: peaks of the log spectrogram are paired with
+    # a few later peaks, and each (f1, f2, dt) triple is stored with the anchor frame of its file.
+    # Reused material shows up as many hashes agreeing on the same time offset between two files.
+    def __init__(self, db_path, sr=11025, n_fft=1024, hop_length=512, fan_out=8, max_dt=63,
+                 peak_neighborhood=(21, 11), min_peak_db=-60.0):
+        self.db_path = db_path
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.fan_out = fan_out
+        self.max_dt = max_dt
+        self.peak_neighborhood = peak_neighborhood
+        self.min_peak_db = min_peak_db
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                duration REAL,
+                hash_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS hashes (
+                hash INTEGER NOT NULL,
+                file_id INTEGER NOT NULL,
+                t INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes (hash);
+            CREATE INDEX IF NOT EXISTS hashes_by_file ON hashes (file_id);
+        """)
+        self._conn.commit()
+
+    @property
+    def frame_seconds(self):
+        return self.hop_length / self.sr
+
+    def fingerprint(self, y, sr):
+        if sr != self.sr:
+            y = librosa.resample(y, orig_sr=sr, target_sr=self.sr)
+        if y.size < self.n_fft:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        spectrogram = librosa.amplitude_to_db(np.abs(librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length)),
+                                              ref=np.max)
+        is_peak = (spectrogram == maximum_filter(spectrogram, size=self.peak_neighborhood)) & \
+                  (spectrogram > self.min_peak_db)
+        freqs, times = np.nonzero(is_peak)
+        order = np.lexsort((freqs, times))
+        freqs, times = freqs[order], times[order]
+
+        hashes = []
+        anchors = []
+        for k in range(1, self.fan_out + 1):
+            f1, f2 = freqs[:-k], freqs[k:]
+            t1, dt = times[:-k], times[k:] - times[:-k]
+            valid = (dt > 0) & (dt <= self.max_dt)
+            hashes.append((f1[valid].astype(np.int64) << 16) | (f2[valid].astype(np.int64) << 6) | dt[valid])
+            anchors.append(t1[valid])
+        return np.concatenate(hashes), np.concatenate(anchors).astype(np.int64)
+
+    def _file_row(self, path):
+        return self._conn.execute("SELECT id, size, mtime_ns FROM files WHERE path = ?", (path,)).fetchone()
+
+    def add_file(self, file_path, y=None, sr=None):
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        row = self._file_row(path)
+        if row is not None and tuple(row[1:]) == (stat.st_size, stat.st_mtime_ns):
+            return False  # unchanged since it was indexed
+
+        if y is None:
+            y, sr = librosa.load(path, sr=self.sr)
+        hashes, anchors = self.fingerprint(y, sr)
+        with self._conn:
+            if row is not None:
+                self._conn.execute("DELETE FROM hashes WHERE file_id = ?", (row[0],))
+                self._conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+            cursor = self._conn.execute(
+                "INSERT INTO files (path, size, mtime_ns, duration, hash_count) VALUES (?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, len(y) / sr, len(hashes)))
+            file_id = cursor.lastrowid
+            self._conn.executemany("INSERT INTO hashes (hash, file_id, t) VALUES (?, ?, ?)",
+                                   ((int(h), file_id, int(t)) for h, t in zip(hashes, anchors)))
+        return True
+
+    def add_files(self, file_paths):
+        added = 0
+        for file_path in file_paths:
+            try:
+                added += self.add_file(file_path)
+            except Exception as e:
+                print(f"Error indexing {file_path}: {e}", file=sys.stderr)
+        return added
+
+    def remove_file(self, file_path):
+        row = self._file_row(os.path.abspath(file_path))
+        if row is None:
+            return False
+        with self._conn:
+            self._conn.execute("DELETE FROM hashes WHERE file_id = ?", (row[0],))
+            self._conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+        return True
+
+    def file_count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def _stored_hashes(self, file_id):
+        rows = self._conn.execute("SELECT hash, t FROM hashes WHERE file_id = ?", (file_id,)).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        data = np.array(rows, dtype=np.int64)
+        return data[:, 0], data[:, 1]
+
+    def query_hashes(self, hashes, anchors, min_count=20, exclude_file_id=None, min_file_id=None):
+        if len(hashes) == 0:
+            return []
+        self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS query_hashes (hash INTEGER, t INTEGER)")
+        self._conn.execute("DELETE FROM query_hashes")
+        self._conn.executemany("INSERT INTO query_hashes (hash, t) VALUES (?, ?)",
+                               ((int(h), int(t)) for h, t in zip(hashes, anchors)))
+        # Every lookup goes through the hash index, so cost follows the number of hits, not the corpus size
+        rows = self._conn.execute("""
+            SELECT h.file_id, h.t - q.t AS delta, COUNT(*), MIN(q.t), MAX(q.t)
+            FROM query_hashes q JOIN hashes h ON h.hash = q.hash
+            WHERE h.file_id != ? AND h.file_id > ?
+            GROUP BY h.file_id, delta
+            HAVING COUNT(*) >= ?
+            ORDER BY COUNT(*) DESC
+        """, (-1 if exclude_file_id is None else exclude_file_id,
+              -1 if min_file_id is None else min_file_id, max(2, min_count // 4))).fetchall()
+        self._conn.execute("DELETE FROM query_hashes")
+        self._conn.commit()
+
+        # Material not aligned to the hop size splits its votes between neighbouring offsets
+        clusters = {}
+        for file_id, delta, count, first_t, last_t in rows:
+            for key in ((file_id, delta - 1), (file_id, delta + 1)):
+                if key in clusters:
+                    cluster = clusters[key]
+                    cluster[1] += count
+                    cluster[2] = min(cluster[2], first_t)
+                    cluster[3] = max(cluster[3], last_t)
+                    break
+            else:
+                clusters[(file_id, delta)] = [delta, count, first_t, last_t]
+
+        query_times = np.sort(anchors)
+        paths = {}
+        matches = []
+        for (file_id, _), (delta, count, first_t, last_t) in clusters.items():
+            if count < min_count:
+                continue
+            if file_id not in paths:
+                paths[file_id] = self._conn.execute("SELECT path FROM files WHERE id = ?", (file_id,)).fetchone()[0]
+            in_span = int(np.searchsorted(query_times, last_t, side='right') - np.searchsorted(query_times, first_t))
+            matches.append({
+                'file': paths[file_id],
+                'offset': (first_t + delta) * self.frame_seconds,
+                'query_offset': first_t * self.frame_seconds,
+                'duration': (last_t - first_t) * self.frame_seconds,
+                'confidence': min(count / in_span, 1.0) if in_span else 0.0,
+                'hash_matches': count,
+            })
+        matches.sort(key=lambda match: match['hash_matches'], reverse=True)
+        return matches
+
+    def query_file(self, file_path, min_count=20, y=None, sr=None):
+        path = os.path.abspath(file_path)
+        row = self._file_row(path)
+        if y is None:
+            y, sr = librosa.load(path, sr=self.sr)
+        hashes, anchors = self.fingerprint(y, sr)
+        return self.query_hashes(hashes, anchors, min_count, exclude_file_id=row[0] if row else None)
+
+    def find_reused_material(self, min_count=20):
+        # Each indexed file is queried with its stored hashes against files inserted after it,
+        # so every pair is reported once and nothing is decoded again
+        file_rows = self._conn.execute("SELECT id, path FROM files ORDER BY id").fetchall()
+        for file_id, path in file_rows:
+            hashes, anchors = self._stored_hashes(file_id)
+            for match in self.query_hashes(hashes, anchors, min_count, min_file_id=file_id):
+                match['source'] = path
+                yield match
+
+    def close(self):
+        self._conn.close()
+
+
+def collect_audio_files(inputs, extensions=('wav', 'mp3', 'flac', 'm4a', 'aiff', 'aif', 'ogg')):
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                for name in sorted(names):
+                    if name.split('.')[-1].lower() in extensions:
+                        yield os.path.join(root, name)
+        else:
+            yield item
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Landmark fingerprint index for reused audio material")
+    parser.add_argument('index', help="SQLite index file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_parser = subparsers.add_parser('add', help="index new or modified files")
+    add_parser.add_argument('inputs', nargs='+')
+    query_parser = subparsers.add_parser('query', help="find indexed material reused in the given files")
+    query_parser.add_argument('inputs', nargs='+')
+    scan_parser = subparsers.add_parser('scan', help="report material shared between any two indexed files")
+    for sub in (query_parser, scan_parser):
+        sub.add_argument('--min-count', type=int, default=20)
+    args = parser.parse_args()
+
+    index = FingerprintIndex(args.index)
+    if args.command == 'add':
+        print(f"Indexed {index.add_files(collect_audio_files(args.inputs))} file(s), {index.file_count()} total")
+    elif args.command == 'query':
+        for file_path in collect_audio_files(args.inputs):
+            for match in index.query_file(file_path, args.min_count):
+                print(f"{file_path}\t{match['file']}\t{match['offset']:.2f}s\t{match['duration']:.2f}s\t"
+                      f"{match['confidence']:.3f}")
+    else:
+        for match in index.find_reused_material(args.min_count):
+            print(f"{match['source']}\t{match['query_offset']:.2f}s\t{match['file']}\t{match['offset']:.2f}s\t"
+                  f"{match['duration']:.2f}s\t{match['confidence']:.3f}")
+    index.close()
@@ -0,0 +1,111 @@
+import os
+import time
+
+AUDIO_EXTENSIONS = ('wav', 'mp3', 'flac', 'm4a', 'aiff', 'aif', 'ogg')
+
+
+class FolderWatcher:
+    # Polling watcher for drop folders. A directory is only rescanned when its own mtime changes (a file
+    # was added, removed or renamed) or every rescan_interval seconds to catch in-place rewrites; files
+    # still being written are re-stat'ed until their size and mtime have been stable for settle_seconds.
+    def __init__(self, directories, extensions=AUDIO_EXTENSIONS, settle_seconds=2.0, rescan_interval=60.0,
+                 recursive=True, include_existing=True):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.settle_seconds = settle_seconds
+        self.rescan_interval = rescan_interval
+        self.recursive = recursive
+        self._known = {}  # path -> (size, mtime_ns) already handed out
+        self._pending = {}  # path -> [(size, mtime_ns), time the signature was last seen changing]
+        self._dir_mtimes = {}
+        self._subdirectories = {}  # directory -> subdirectories seen at its last scan
+        self._last_full_scan = None
+        if not include_existing:
+            for path, signature in self._scan_all():
+                self._known[path] = signature
+            self._last_full_scan = time.monotonic()
+
+    def _is_audio(self, name):
+        return name.split('.')[-1].lower() in self.extensions
+
+    def _scan_directory(self, directory, found, force):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        subdirectories = []
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif self._is_audio(entry.name):
+                    stat = entry.stat()
+                    found.append((entry.path, (stat.st_size, stat.st_mtime_ns)))
+            except OSError:
+                continue
+        self._subdirectories[directory] = subdirectories
+        if self.recursive:
+            for subdirectory in subdirectories:
+                self._visit(subdirectory, found, force)
+
+    def _visit(self, directory, found, force):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            self._dir_mtimes.pop(directory, None)
+            self._subdirectories.pop(directory, None)
+            return
+        changed = self._dir_mtimes.get(directory) != mtime
+        self._dir_mtimes[directory] = mtime
+        if changed or force:
+            self._scan_directory(directory, found, force)
+        elif self.recursive:
+            # Unchanged directories still need their known subdirectories checked
+            for subdirectory in self._subdirectories.get(directory, ()):
+                self._visit(subdirectory, found, force)
+
+    def _scan_all(self, force=True):
+        found = []
+        for directory in self.directories:
+            self._visit(directory, found, force)
+        return found
+
+    def poll(self):
+        # Returns the new or modified files that have finished being written since the last poll
+        now = time.monotonic()
+        full_scan = self._last_full_scan is None or now - self._last_full_scan >= self.rescan_interval
+        if full_scan:
+            self._last_full_scan = now
+
+        for path, signature in self._scan_all(force=full_scan):
+            if self._known.get(path) == signature:
+                continue
+            entry = self._pending.get(path)
+            if entry is None or entry[0] != signature:
+                self._pending[path] = [signature, now]
+
+        ready = []
+        wall_now = time.time()
+        for path, entry in list(self._pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature != entry[0]:
+                entry[0], entry[1] = signature, now
+                continue
+            # Files last written long ago are complete already and need no settle wait
+            if now - entry[1] >= self.settle_seconds or wall_now - stat.st_mtime >= self.settle_seconds:
+                ready.append(path)
+                self._known[path] = signature
+                del self._pending[path]
+        return sorted(ready)
+
+    @property
+    def pending_count(self):
+        return len(self._pending)
+
+    def forget(self, file_path):
+        self._known.pop(os.path.abspath(file_path), None)
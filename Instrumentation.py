@@ -0,0 +1,139 @@
+import time
+
+# Per-file measurements, in export column order; check timings include any decode the check triggered
+TIMING_FIELDS = ['total_s', 'decode_s', 'prefetch_wait_s', 'bytes_read', 'ffprobe_s', 'resample_s', 'stack_s',
+                 'format_s', 'sampling_rate_s', 'noise_s', 'snr_s', 'clipping_s', 'reverb_s', 'channel_mode_s',
+                 'bit_depth_s', 'repeats_s', 'audio_cache_hits', 'audio_cache_misses', 'feature_cache_hits',
+                 'feature_cache_misses']
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class NullInstrumentation:
+    # Used when instrumentation is off: every hook is a no-op on a shared object
+    enabled = False
+    values = None
+
+    def timer(self, name):
+        return _NULL_TIMER
+
+    def add(self, name, value):
+        pass
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class _Timer:
+    __slots__ = ('owner', 'name', 'start')
+
+    def __init__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.owner.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Instrumentation:
+    # Accumulates named timings and counters for one file
+    enabled = True
+
+    def __init__(self):
+        self.values = {}
+
+    def timer(self, name):
+        return _Timer(self, name)
+
+    def add(self, name, value):
+        self.values[name] = self.values.get(name, 0) + value
+
+
+class TimingSummary:
+    # Aggregates the per-file timings of a batch: totals per check, the slowest file of each, decode share,
+    # cache hit rates and worker utilization (busy time over wall time times workers)
+    def __init__(self, jobs=1):
+        self.jobs = jobs
+        self.started = None  # wall time and utilization are only known for a summary that was start()ed
+        self.finished = None
+        self.files = 0
+        self.totals = {}
+        self.slowest = {}  # field -> (seconds, file name)
+
+    def add(self, file_name, timings):
+        if not timings:
+            return
+        self.files += 1
+        for name, value in timings.items():
+            self.totals[name] = self.totals.get(name, 0) + value
+            if name.endswith('_s') and value > self.slowest.get(name, (-1, None))[0]:
+                self.slowest[name] = (value, file_name)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def wall_s(self):
+        if self.started is None:
+            return None
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def utilization(self):
+        capacity = (self.wall_s or 0) * self.jobs
+        return min(1.0, self.totals.get('total_s', 0) / capacity) if capacity else None
+
+    def hit_rate(self, cache):
+        hits = self.totals.get(f'{cache}_cache_hits', 0)
+        lookups = hits + self.totals.get(f'{cache}_cache_misses', 0)
+        return hits / lookups if lookups else None
+
+    def check_rows(self):
+        # (field, total seconds, mean seconds, slowest seconds, slowest file), slowest total first
+        rows = []
+        for name in TIMING_FIELDS:
+            if name.endswith('_s') and name in self.totals:
+                slowest, file_name = self.slowest[name]
+                rows.append((name[:-2], self.totals[name], self.totals[name] / self.files, slowest, file_name))
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def overview_lines(self):
+        line = f"Files: {self.files}, busy time: {self.totals.get('total_s', 0):.2f} s"
+        if self.wall_s is not None:
+            line += f", wall time: {self.wall_s:.2f} s, workers: {self.jobs}"
+            if self.utilization is not None:
+                line += f", utilization: {self.utilization:.0%}"
+        lines = [line]
+        if 'bytes_read' in self.totals:
+            lines.append(f"Decoded: {self.totals['bytes_read'] / (1024 * 1024):.1f} MB in "
+                         f"{self.totals.get('decode_s', 0):.2f} s")
+        for cache in ('audio', 'feature'):
+            rate = self.hit_rate(cache)
+            if rate is not None:
+                lines.append(f"{cache.capitalize()} cache hit rate: {rate:.0%}")
+        return lines
+
+    def summary_lines(self):
+        lines = self.overview_lines()
+        for name, total, mean, slowest, file_name in self.check_rows():
+            lines.append(f"{name}: total {total:.2f} s, mean {mean * 1000:.1f} ms, "
+                         f"slowest {slowest * 1000:.1f} ms ({file_name})")
+        return lines
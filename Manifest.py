@@ -0,0 +1,141 @@
+import csv
+import json
+import os
+import sys
+from array import array
+
+MANIFEST_EXTENSIONS = ('csv', 'jsonl')
+# Column (CSV) or key (JSONL) holding the file path, first match wins
+PATH_FIELDS = ('file_path', 'path', 'file')
+# Optional per-file expectations: manifest field -> converter
+EXPECTATION_FIELDS = {
+    'sample_rate': int,
+    'bit_depth': int,
+    'channels': int,
+    'format': lambda value: str(value).lower().lstrip('.'),
+}
+
+
+def is_manifest(file_path):
+    return file_path.split('.')[-1].lower() in MANIFEST_EXTENSIONS
+
+
+class Manifest:
+    # A list of files to analyse, one per line: CSV with a header row naming a path column (a CSV without
+    # one is read as bare paths in its first column) or JSONL objects, each optionally carrying the
+    # EXPECTATION_FIELDS the file must match. Relative paths are taken from the manifest's directory.
+    # Nothing is held per entry: iterating streams the file, and the index behind len() and entry(row) is
+    # one byte offset per line, so a million-line manifest costs 8 MB whatever its paths look like.
+    # on_skipped(message) is told about each line skipped while streaming; by default it goes to stderr.
+    def __init__(self, file_path, on_skipped=None):
+        self.file_path = file_path
+        self.on_skipped = on_skipped
+        self.directory = os.path.dirname(os.path.abspath(file_path))
+        self.jsonl = file_path.lower().endswith('.jsonl')
+        self.columns = None
+        self.data_start = 0  # byte offset of the first entry line
+        self._offsets = None
+        self._handle = None
+        if not self.jsonl:
+            with open(file_path, 'rb') as f:
+                first = f.readline()
+            header = next(csv.reader([first.decode('utf-8-sig')]), [])
+            names = [name.strip().lower() for name in header]
+            if any(name in PATH_FIELDS for name in names):
+                self.columns = names
+                self.data_start = len(first)
+
+    @property
+    def name(self):
+        return os.path.basename(self.file_path)
+
+    def parse(self, line):
+        # (file path, expectations dict or None) of one manifest line; None for blank lines. Raises
+        # ValueError for a line without a path or with an unusable expectation.
+        text = line.decode('utf-8-sig').strip()
+        if not text:
+            return None
+        if self.jsonl:
+            fields = json.loads(text)
+            if not isinstance(fields, dict):
+                raise ValueError("JSONL entries must be objects")
+        elif self.columns is None:
+            fields = {'file_path': next(csv.reader([text]))[0]}
+        else:
+            fields = dict(zip(self.columns, next(csv.reader([text]))))
+        file_path = next((fields[name] for name in PATH_FIELDS if fields.get(name)), None)
+        if not file_path:
+            raise ValueError("No file path")
+        expected = {name: convert(fields[name]) for name, convert in EXPECTATION_FIELDS.items()
+                    if fields.get(name) not in (None, '')}
+        return os.path.join(self.directory, file_path), expected or None
+
+    def entries(self, start=0, stop=None):
+        # (file path, expectations) of entries start..stop, read lazily; lines that don't parse are
+        # reported and skipped. Without a start row the file is streamed without building the index.
+        if start and start >= len(self):
+            return
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.data_start if not start else self.offsets[start])
+            row = start
+            for line in f:
+                if stop is not None and row >= stop:
+                    return
+                try:
+                    entry = self.parse(line)
+                except (ValueError, TypeError) as e:
+                    message = f"Skipping entry {row + 1} of {self.name}: {e}"
+                    if self.on_skipped is None:
+                        print(message, file=sys.stderr)
+                    else:
+                        self.on_skipped(message)
+                    row += 1
+                    continue
+                if entry is not None:
+                    row += 1
+                    yield entry
+
+    def __iter__(self):
+        return self.entries()
+
+    def paths(self, expectations, start=0, stop=None):
+        # File paths only, with the expectations of each one stored in the expectations dict as it is
+        # yielded; the consumer pops them (see BatchAnalyzer.run), so the dict only ever holds the entries
+        # read ahead of the analysis
+        for file_path, expected in self.entries(start, stop):
+            if expected is not None:
+                expectations[file_path] = expected
+            yield file_path
+
+    @property
+    def offsets(self):
+        # Byte offset of every non-blank entry line, built on first use
+        if self._offsets is None:
+            offsets = array('q')
+            with open(self.file_path, 'rb') as f:
+                f.seek(self.data_start)
+                position = self.data_start
+                for line in f:
+                    if line.strip():
+                        offsets.append(position)
+                    position += len(line)
+            self._offsets = offsets
+        return self._offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def entry(self, row):
+        # Entry of one row, read with a seek; None when the line does not parse
+        if self._handle is None:
+            self._handle = open(self.file_path, 'rb')
+        self._handle.seek(self.offsets[row])
+        try:
+            return self.parse(self._handle.readline())
+        except (ValueError, TypeError):
+            return None
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
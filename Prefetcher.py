@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class Prefetched:
+    # One file handed out by Prefetcher.iterate; audio is None when the file was only read, did not fit the
+    # budget or failed to decode, in which case the checks load it on demand as usual
+    __slots__ = ('file_path', 'audio', 'bytes_read', 'decode_s', 'wait_s')
+
+    def __init__(self, file_path, audio=None, bytes_read=0, decode_s=0.0, wait_s=0.0):
+        self.file_path = file_path
+        self.audio = audio
+        self.bytes_read = bytes_read
+        self.decode_s = decode_s  # time the background decode took, overlapped with other work
+        self.wait_s = wait_s  # time the consumer spent blocked on this file
+
+
+class Prefetcher:
+    # Read-ahead stage for the in-process batch path: while one file is analysed, the next `depth` files are
+    # decoded (mode 'decode') or only read through the OS page cache (mode 'read') in background threads, so
+    # disk or network I/O overlaps with analysis. max_bytes bounds what is held ahead of the consumer, by
+    # size_hint(file_path) estimates; a file that does not fit even on its own is left to load on demand.
+    # needs_decode(file_path), if given, says whether the analysis will decode a file at all (it won't when
+    # every feature it needs is cached); files it turns down are neither decoded nor read ahead.
+    def __init__(self, decode, depth=2, max_bytes=256 * 1024 * 1024, mode='decode', size_hint=None,
+                 needs_decode=None):
+        if mode not in ('decode', 'read'):
+            raise ValueError(f"Unknown prefetch mode: {mode}")
+        self.decode = decode  # file_path -> (y, sr); called from worker threads
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.size_hint = size_hint if size_hint is not None and mode == 'decode' else os.path.getsize
+        self.needs_decode = needs_decode
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        # Stops submitting work; decodes already running finish in the background and are dropped
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def _fetch(self, file_path):
+        if self._cancelled.is_set() or (self.needs_decode is not None and not self.needs_decode(file_path)):
+            return None, 0, 0.0
+        if self.mode == 'read':
+            bytes_read = 0
+            with open(file_path, 'rb') as f:
+                while not self._cancelled.is_set():
+                    chunk = f.read(READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    bytes_read += len(chunk)
+            return None, bytes_read, 0.0
+        started = time.perf_counter()
+        audio = self.decode(file_path)
+        return audio, os.path.getsize(file_path), time.perf_counter() - started
+
+    def _estimate(self, file_path):
+        try:
+            return self.size_hint(file_path)
+        except Exception:
+            return None
+
+    def iterate(self, file_paths):
+        # Yields a Prefetched per file, in input order; file_paths may be any lazy iterable
+        self._cancelled.clear()
+        paths = iter(file_paths)
+        window = deque()  # (file_path, future or None, reserved bytes), oldest first
+        reserved = 0
+        next_path = None
+        exhausted = False
+        executor = ThreadPoolExecutor(max_workers=self.depth, thread_name_prefix='prefetch')
+        try:
+            while True:
+                while not exhausted and not self._cancelled.is_set() and len(window) < self.depth:
+                    if next_path is None:
+                        next_path = next(paths, None)
+                        if next_path is None:
+                            exhausted = True
+                            break
+                    size = self._estimate(next_path)
+                    if size is None or size > self.max_bytes:
+                        window.append((next_path, None, 0))
+                    elif reserved + size <= self.max_bytes:
+                        window.append((next_path, executor.submit(self._fetch, next_path), size))
+                        reserved += size
+                    elif window:
+                        break  # submitted once earlier files have been consumed and freed the budget
+                    next_path = None
+                if not window or self._cancelled.is_set():
+                    return
+
+                file_path, future, size = window.popleft()
+                reserved -= size
+                item = Prefetched(file_path)
+                if future is not None:
+                    started = time.perf_counter()
+                    try:
+                        item.audio, item.bytes_read, item.decode_s = future.result()
+                    except Exception:
+                        pass  # reported by the on-demand load the checks fall back to
+                    item.wait_s = time.perf_counter() - started
+                yield item
+        finally:
+            for _, future, _ in window:
+                if future is not None:
+                    future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
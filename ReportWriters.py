@@ -0,0 +1,229 @@
+import csv
+import io
+import itertools
+import time
+
+from Instrumentation import TIMING_FIELDS
+from ResultTable import RESULT_COLUMNS, TIMING_COLUMNS
+
+# Rows handed to the CSV writer per call; rows are produced lazily from the table's columns, so only one
+# chunk of formatted rows exists at a time whatever the table size
+CHUNK_ROWS = 10000
+
+# (heading, column, width in points) of the per-file table of the PDF report
+PDF_COLUMNS = [
+    ('File', 'file_name', 200), ('Valid', 'valid', 32), ('Noise dB', 'noise_db', 44), ('SNR dB', 'snr_db', 44),
+    ('Clipped', 'clipping_points', 48), ('RT60', 'rt60', 40), ('Channels', 'num_channels', 42),
+    ('Bits', 'bit_depth', 28), ('Reasons', 'invalid_reasons', 242),
+]
+PDF_FONT_SIZE = 7
+PDF_LEADING = 10
+PDF_MARGIN = 36
+
+
+def write_csv(table, file_path, chunk_rows=CHUNK_ROWS):
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(table.header)
+        rows = table.rows()
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            writer.writerows(['' if value is None else value for value in row] for row in chunk)
+
+
+def write_excel(table, file_path, image=None, timing_summary=None):
+    # constant_memory flushes each row to disk once the next one starts, so memory stays flat; image is
+    # PNG bytes (the statistics plot), embedded without going through a file
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(file_path, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet('Results')
+        header_format = workbook.add_format({'bold': True})
+        header = table.header
+        worksheet.write_row(0, 0, header, header_format)
+        for row_index, row in enumerate(table.rows(), start=1):
+            for column_index, value in enumerate(row):
+                if value is not None:
+                    worksheet.write(row_index, column_index, value)
+        if image:
+            worksheet.insert_image(1, len(header) + 1, 'statistics.png', {'image_data': io.BytesIO(image)})
+        if table.timed_count:
+            _write_timing_sheet(workbook, header_format, timing_summary or table.timing_summary())
+    finally:
+        workbook.close()
+
+
+def _write_timing_sheet(workbook, header_format, summary):
+    worksheet = workbook.add_worksheet('Timing')
+    row_index = 0
+    for line in summary.overview_lines():
+        worksheet.write(row_index, 0, line)
+        row_index += 1
+    row_index += 1
+    worksheet.write_row(row_index, 0, ['step', 'total_s', 'mean_s', 'slowest_s', 'slowest_file'], header_format)
+    for row in summary.check_rows():
+        row_index += 1
+        worksheet.write_row(row_index, 0, row)
+
+
+def write_parquet(table, file_path, row_group_size=10000):
+    # Needs pyarrow, which is optional; written one row group at a time
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    arrow_types = {'str': pa.string(), 'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(),
+                   'list': pa.list_(pa.string()), 'floats': pa.list_(pa.float64())}
+    columns = list(RESULT_COLUMNS)
+    if table.timed_count:
+        columns += [(name, 'float') for name in TIMING_COLUMNS]
+    schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns])
+    with pq.ParquetWriter(file_path, schema) as writer:
+        for start in range(0, max(len(table), 1), row_group_size):
+            arrays = []
+            for name, kind in RESULT_COLUMNS:
+                values = table.columns[name][start:start + row_group_size]
+                if kind in ('list', 'floats'):
+                    values = [None if value is None else list(value) for value in values]
+                arrays.append(pa.array(values, type=arrow_types[kind]))
+            if table.timed_count:
+                timings = [value or {} for value in table.columns['timings'][start:start + row_group_size]]
+                for name in TIMING_FIELDS:
+                    arrays.append(pa.array([value.get(name) for value in timings], type=pa.float64()))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def _pdf_cell(value, width):
+    if value is None:
+        text = ''
+    elif isinstance(value, bool):
+        text = 'yes' if value else 'no'
+    elif isinstance(value, float):
+        text = f'{value:.2f}'
+    elif isinstance(value, tuple):
+        text = '; '.join(map(str, value))
+    else:
+        text = str(value)
+    # Helvetica averages about half the font size per character; longer text is cut rather than measured
+    limit = int(width / (PDF_FONT_SIZE * 0.5)) - 1
+    return text if len(text) <= limit else text[:limit - 1] + '...'
+
+
+def summary_lines(statistics):
+    # (label, value) rows of the PDF summary table, from ResultTable.statistics()
+    lines = [('Files', statistics['files']), ('Invalid files', statistics['invalid'])]
+    lines += [(f'  {reason}', count) for reason, count in statistics['invalid_reasons'].items()]
+    for name, label in (('noise_db', 'Noise level (dB)'), ('snr_db', 'SNR (dB)')):
+        values = statistics[name]
+        if values:
+            lines.append((label, f"mean {values['mean']:.2f}, median {values['median']:.2f}, "
+                                 f"min {values['min']:.2f}, max {values['max']:.2f} ({values['count']} files)"))
+    if statistics['clipping_files']:
+        lines.append(('Clipping', f"{statistics['clipping_files']} file(s), "
+                                  f"{statistics['clipping_points']} clipped sample(s)"))
+    if statistics['channel_modes']:
+        lines.append(('Channel modes', ', '.join(f'{mode} {count}' for mode, count in
+                                                 statistics['channel_modes'].items())))
+    return lines
+
+
+class PdfReport:
+    # Paginated PDF: a summary page (aggregate statistics, the statistics plot and any timing summary)
+    # followed by a table of the files, written page by page from the table's columns. Each column of a
+    # page is a single text object, so a page costs a handful of drawing calls however many rows it holds.
+    def __init__(self, file_path, title="Audio File Inspection Results"):
+        from reportlab.lib.pagesizes import landscape, letter
+        from reportlab.pdfgen import canvas
+        self.canvas = canvas.Canvas(file_path, pagesize=landscape(letter), pageCompression=1)
+        self.width, self.height = landscape(letter)
+        self.title = title
+        self.page = 0
+
+    def _new_page(self):
+        if self.page:
+            self.canvas.showPage()
+        self.page += 1
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawRightString(self.width - PDF_MARGIN, PDF_MARGIN / 2, f"Page {self.page}")
+
+    def write_summary(self, statistics, image=None, timing_lines=()):
+        self._new_page()
+        top = self.height - PDF_MARGIN
+        self.canvas.setFont('Helvetica-Bold', 14)
+        self.canvas.drawString(PDF_MARGIN, top - 14, self.title)
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawString(PDF_MARGIN, top - 28, time.strftime('%Y-%m-%d %H:%M'))
+
+        lines = summary_lines(statistics)
+        labels = self.canvas.beginText(PDF_MARGIN, top - 50)
+        labels.setFont('Helvetica-Bold', 9)
+        labels.setLeading(12)
+        values = self.canvas.beginText(PDF_MARGIN + 140, top - 50)
+        values.setFont('Helvetica', 9)
+        values.setLeading(12)
+        for label, value in lines:
+            labels.textLine(label)
+            values.textLine(str(value))
+        self.canvas.drawText(labels)
+        self.canvas.drawText(values)
+        bottom = top - 50 - 12 * len(lines)
+
+        if image:
+            from reportlab.lib.utils import ImageReader
+            reader = ImageReader(io.BytesIO(image))
+            image_width, image_height = reader.getSize()
+            scale = min((self.width - 2 * PDF_MARGIN) / image_width, (bottom - PDF_MARGIN - 12) / image_height)
+            if scale > 0:
+                self.canvas.drawImage(reader, PDF_MARGIN, bottom - 12 - image_height * scale,
+                                      width=image_width * scale, height=image_height * scale)
+        if timing_lines:
+            self._new_page()
+            text = self.canvas.beginText(PDF_MARGIN, self.height - PDF_MARGIN - 10)
+            text.setFont('Helvetica-Bold', 10)
+            text.textLine("Timing")
+            text.setFont('Helvetica', 8)
+            text.setLeading(PDF_LEADING)
+            for line in timing_lines:
+                text.textLine(line)
+            self.canvas.drawText(text)
+
+    def write_rows(self, table, rows):
+        # rows: row indices of table, consumed one page at a time
+        per_page = int((self.height - 2 * PDF_MARGIN) // PDF_LEADING) - 1
+        rows = iter(rows)
+        while True:
+            page_rows = list(itertools.islice(rows, per_page))
+            if not page_rows:
+                return
+            self._new_page()
+            x = PDF_MARGIN
+            for heading, name, width in PDF_COLUMNS:
+                column = self.canvas.beginText(x, self.height - PDF_MARGIN - PDF_LEADING)
+                column.setFont('Helvetica-Bold', PDF_FONT_SIZE)
+                column.setLeading(PDF_LEADING)
+                column.textLine(heading)
+                column.setFont('Helvetica', PDF_FONT_SIZE)
+                values = table.columns[name]
+                for row in page_rows:
+                    column.textLine(_pdf_cell(values[row], width))
+                self.canvas.drawText(column)
+                x += width
+
+    def close(self):
+        if not self.page:
+            self._new_page()
+        self.canvas.save()
+
+
+def write_pdf(table, file_path, image=None, timing_summary=None, invalid_only=False):
+    # image is PNG bytes drawn on the summary page; invalid_only lists just the invalid files after the
+    # summary, which still covers every file
+    report = PdfReport(file_path)
+    timing_lines = (timing_summary or table.timing_summary()).summary_lines() if table.timed_count else ()
+    report.write_summary(table.statistics(), image, timing_lines)
+    rows = range(len(table))
+    if invalid_only:
+        valid = table.columns['valid']
+        rows = (row for row in rows if not valid[row])
+    report.write_rows(table, rows)
+    report.close()
@@ -0,0 +1,152 @@
+import statistics
+from collections import Counter
+
+from Instrumentation import TIMING_FIELDS, TimingSummary
+
+# Column name -> type; the order is the export column order
+RESULT_COLUMNS = [
+    ('file_path', 'str'), ('file_name', 'str'), ('valid', 'bool'), ('invalid_reasons', 'list'),
+    ('format_ok', 'bool'), ('file_format', 'str'), ('rate_ok', 'bool'), ('sample_rate', 'int'),
+    ('bandwidth_hz', 'float'), ('bandwidth_confidence', 'float'),
+    ('noise_db', 'float'), ('noise_ok', 'bool'), ('snr_db', 'float'), ('snr_ok', 'bool'),
+    ('clipping', 'bool'), ('clipping_points', 'int'), ('clipping_events', 'int'), ('clipping_ratio', 'float'),
+    ('clipping_longest_run', 'int'), ('rt60', 'float'), ('reverb_ok', 'bool'),
+    ('channel_mode', 'str'), ('num_channels', 'int'), ('channel_rms_db', 'floats'), ('channel_snr_db', 'floats'),
+    ('channel_peak', 'floats'), ('channel_dc_offset', 'floats'), ('channel_clipped', 'floats'),
+    ('channel_correlation', 'float'), ('fake_stereo', 'bool'), ('phase_inverted', 'bool'),
+    ('bit_depth', 'int'), ('bit_depth_ok', 'bool'),
+    ('repeats', 'bool'), ('repeat_count', 'int'), ('repeat_segments', 'list'), ('copy_paste_match', 'str'),
+    ('expectation_mismatches', 'list'), ('error', 'str'),
+]
+RECORD_FIELDS = [name for name, _ in RESULT_COLUMNS]
+# Sequence columns (one value per reason, segment or channel) are held as tuples
+SEQUENCE_FIELDS = [name for name, kind in RESULT_COLUMNS if kind in ('list', 'floats')]
+# Exported after the result columns when the batch collected timings
+TIMING_COLUMNS = [f'timing_{name}' for name in TIMING_FIELDS]
+
+
+class ResultRecord:
+    # One analysed file; fields of checks that were not run stay None, timings is a dict or None
+    __slots__ = RECORD_FIELDS + ['timings']
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+        self.invalid_reasons = tuple(self.invalid_reasons or ())
+        for name in SEQUENCE_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, tuple(value))
+
+    @classmethod
+    def from_dict(cls, record):
+        return cls(**record)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+
+def export_value(value):
+    if isinstance(value, tuple):
+        return ';'.join(value if all(isinstance(item, str) for item in value) else
+                        (f'{item:.6g}' for item in value))
+    return value
+
+
+class ResultTable:
+    # Column-oriented result set: one list per field, one row per file. Re-analysing a file that is
+    # already in the table replaces its row in place, so the table can be merged into (watch mode).
+    def __init__(self):
+        self.columns = {name: [] for name in ResultRecord.__slots__}
+        self._rows = {}  # file path -> row index
+        self.invalid_count = 0
+        self.timed_count = 0
+        self.revision = 0  # bumped on every change, so derived views (plots) know when to rebuild
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, file_path):
+        return file_path in self._rows
+
+    def clear(self):
+        for values in self.columns.values():
+            values.clear()
+        self._rows.clear()
+        self.invalid_count = 0
+        self.timed_count = 0
+        self.revision += 1
+
+    def upsert(self, record):
+        # Accepts a record dict or ResultRecord; returns (row index, whether an existing row was replaced)
+        if not isinstance(record, ResultRecord):
+            record = ResultRecord.from_dict(record)
+        row = self._rows.get(record.file_path)
+        replaced = row is not None
+        if replaced:
+            self.invalid_count -= not self.columns['valid'][row]
+            self.timed_count -= self.columns['timings'][row] is not None
+            for name in ResultRecord.__slots__:
+                self.columns[name][row] = getattr(record, name)
+        else:
+            row = len(self._rows)
+            self._rows[record.file_path] = row
+            for name in ResultRecord.__slots__:
+                self.columns[name].append(getattr(record, name))
+        self.invalid_count += not record.valid
+        self.timed_count += record.timings is not None
+        self.revision += 1
+        return row, replaced
+
+    def record(self, row):
+        return ResultRecord(**{name: values[row] for name, values in self.columns.items()})
+
+    def records(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def values(self, name):
+        # The non-missing values of one column, in row order
+        return [value for value in self.columns[name] if value is not None]
+
+    @property
+    def header(self):
+        return RECORD_FIELDS + TIMING_COLUMNS if self.timed_count else RECORD_FIELDS
+
+    def rows(self):
+        # Export rows in header order, produced lazily from the columns
+        with_timings = bool(self.timed_count)
+        for row in zip(*(self.columns[name] for name in RECORD_FIELDS + ['timings'])):
+            values = [export_value(value) for value in row[:-1]]
+            if with_timings:
+                timings = row[-1] or {}
+                values.extend(timings.get(name) for name in TIMING_FIELDS)
+            yield values
+
+    def statistics(self):
+        # The aggregates behind the statistics plots (noise and SNR levels, clipping, channel modes) plus
+        # validity counts; computed from the columns alone, so a merged table gives the same numbers
+        def describe(name):
+            values = self.values(name)
+            if not values:
+                return None
+            return {'count': len(values), 'mean': statistics.fmean(values), 'min': min(values),
+                    'median': statistics.median(values), 'max': max(values)}
+
+        reasons = Counter(reason for row in self.columns['invalid_reasons'] for reason in row)
+        return {
+            'files': len(self),
+            'invalid': self.invalid_count,
+            'invalid_reasons': dict(reasons.most_common()),
+            'noise_db': describe('noise_db'),
+            'snr_db': describe('snr_db'),
+            'clipping_files': sum(1 for clipping in self.columns['clipping'] if clipping),
+            'clipping_points': sum(self.values('clipping_points')),
+            'channel_modes': dict(Counter(self.values('channel_mode')).most_common()),
+        }
+
+    def timing_summary(self, jobs=1):
+        summary = TimingSummary(jobs)
+        for file_name, timings in zip(self.columns['file_name'], self.columns['timings']):
+            summary.add(file_name, timings)
+        return summary
@@ -0,0 +1,150 @@
+import librosa
+import numpy as np
+from scipy.fft import next_fast_len
+from scipy.ndimage import uniform_filter1d
+
+# Segment pair found inside one file: times in seconds, distance in dB (RMS over bands and frames)
+SEGMENT_DTYPE = np.dtype([('source', np.float64), ('target', np.float64), ('duration', np.float64),
+                          ('distance', np.float64)])
+
+
+def sliding_dot_products(query, series):
+    # Dot products of a (m, d) query with every (m, d) window of a (n, d) series, summed over d, in
+    # O(n log n) with one FFT per dimension instead of O(n * m * d)
+    m, n = query.shape[0], series.shape[0]
+    size = 1 << int(np.ceil(np.log2(n + m)))
+    spectrum = np.fft.rfft(series, size, axis=0) * np.conj(np.fft.rfft(query, size, axis=0))
+    return np.fft.irfft(spectrum.sum(axis=1), size)[:n - m + 1]
+
+
+def matrix_profile(features, m, exclusion=None, valid=None, refresh=4096):
+    # STOMP over a multi-dimensional series: for every window of m frames, the squared Euclidean distance to
+    # its nearest other window and that window's index. The first row of dot products comes from an FFT; each
+    # later row is updated from the previous one along the diagonals in O(n * d), so the whole profile costs
+    # O(n^2 * d) rather than the O(n^2 * m * d) of comparing every pair of windows. The update runs in float32
+    # and every `refresh` rows is recomputed exactly by FFT so rounding cannot build up. Windows closer than
+    # `exclusion` frames (default m) are trivial matches and windows with valid False are never matched.
+    # Distances do not change under a shift, and centred values keep the float32 dot products small
+    x = np.asarray(features, dtype=np.float64)
+    x = x - x.mean(axis=0)
+    n = x.shape[0] - m + 1
+    if n < 2:
+        return np.full(max(n, 0), np.inf), np.full(max(n, 0), -1, dtype=np.int64)
+    exclusion = m if exclusion is None else exclusion
+    valid = np.ones(n, dtype=bool) if valid is None else valid
+    energy = np.concatenate(([0.0], np.cumsum((x ** 2).sum(axis=1))))
+    norms = energy[m:] - energy[:n]
+    candidates = np.where(valid, norms, np.inf).astype(np.float32)
+
+    # Row i of the dot products lives at diagonal[n - i:2 * n - i]: QT[i, j] sits at slot n + j - i, the same
+    # slot as QT[i - 1, j - 1], so moving to the next row is one in-place add and no shift
+    diagonal = np.zeros(2 * n, dtype=np.float32)
+    first_column = sliding_dot_products(x[:m], x)
+    # The update for row i is tail . x[i + m - 1] - head . x[i - 1], done as a single matrix-vector product
+    pairs = np.hstack([x[m:m + n - 1], x[:n - 1]]).astype(np.float32)
+    step = np.empty(2 * x.shape[1], dtype=np.float32)
+    scores = np.empty(n, dtype=np.float32)
+    profile = np.full(n, np.inf)
+    index = np.full(n, -1, dtype=np.int64)
+    for i in range(n):
+        row = diagonal[n - i:2 * n - i]
+        if i % refresh == 0:
+            row[:] = first_column[:n] if i == 0 else sliding_dot_products(x[i:i + m], x)
+        else:
+            step[:x.shape[1]] = x[i + m - 1]
+            step[x.shape[1]:] = -x[i - 1]
+            row[1:] += pairs @ step
+            row[0] = first_column[i]
+        if not valid[i]:
+            continue
+        np.multiply(row, -2, out=scores)
+        scores += candidates
+        scores[max(0, i - exclusion + 1):i + exclusion] = np.inf
+        j = int(np.argmin(scores))
+        if np.isfinite(scores[j]):
+            profile[i] = max(float(scores[j]) + norms[i], 0.0)
+            index[i] = j
+    return profile, index
+
+
+class SelfSimilarity:
+    # Finds stretches of a recording that reappear elsewhere in the same recording (duplicated phrases).
+    # The file is reduced to coarse log-mel frames (hop_seconds apart), the matrix profile of windows of
+    # min_seconds is computed over them, and windows whose nearest neighbour is both close in absolute terms
+    # (max_distance_db) and much closer than is typical for the file (relative_distance times the median)
+    # are chained by constant lag into segment pairs. Quiet windows are ignored so silences don't match.
+    def __init__(self, min_seconds=1.0, hop_seconds=0.05, window_seconds=0.8, n_mels=16, fmax=5000.0,
+                 max_distance_db=3.0, relative_distance=0.35, floor_db=30.0):
+        self.min_seconds = min_seconds
+        self.hop_seconds = hop_seconds
+        self.window_seconds = window_seconds
+        self.n_mels = n_mels
+        self.fmax = fmax
+        self.max_distance_db = max_distance_db
+        self.relative_distance = relative_distance
+        self.floor_db = floor_db  # windows this far below the loudest window are skipped
+
+    def params(self):
+        return {'min_seconds': self.min_seconds, 'hop_seconds': self.hop_seconds,
+                'window_seconds': self.window_seconds, 'n_mels': self.n_mels,
+                'fmax': self.fmax, 'max_distance_db': self.max_distance_db,
+                'relative_distance': self.relative_distance, 'floor_db': self.floor_db}
+
+    def frame_features(self, y, sr):
+        # (frames, n_mels) log-mel energies in dB and the hop in seconds actually used. Power is taken from
+        # short frames at half the hop and averaged over window_seconds, so a copy that is not aligned to
+        # the frame grid still gets nearly the same features without paying for long FFTs.
+        if y.ndim > 1:
+            y = y.mean(axis=0)
+        hop_length = max(1, int(round(self.hop_seconds * sr / 2)))
+        mel = librosa.feature.melspectrogram(y=y, sr=sr, n_fft=next_fast_len(2 * hop_length), hop_length=hop_length,
+                                             n_mels=self.n_mels, fmax=min(self.fmax, sr / 2))
+        span = max(1, int(round(self.window_seconds * sr / hop_length)))
+        mel = uniform_filter1d(mel, span, axis=1, mode='nearest')[:, ::2]
+        return librosa.power_to_db(mel, ref=np.max, top_db=None).T, 2 * hop_length / sr
+
+    def find(self, y, sr):
+        features, hop = self.frame_features(y, sr)
+        m = max(2, int(np.ceil(self.min_seconds / hop)))
+        n = features.shape[0] - m + 1
+        if n < 2 * m:
+            return np.empty(0, dtype=SEGMENT_DTYPE)
+
+        loudness = np.concatenate(([0.0], np.cumsum(features.mean(axis=1))))
+        window_loudness = (loudness[m:] - loudness[:n]) / m
+        valid = window_loudness > window_loudness.max() - self.floor_db
+        profile, index = matrix_profile(features, m, valid=valid)
+
+        distance_db = np.sqrt(profile / (m * features.shape[1]))
+        finite = np.isfinite(distance_db)
+        if not finite.any():
+            return np.empty(0, dtype=SEGMENT_DTYPE)
+        threshold = min(self.max_distance_db, self.relative_distance * np.median(distance_db[finite]))
+        return self._segments(np.flatnonzero(finite & (distance_db < threshold)), index, distance_db, m, hop)
+
+    @staticmethod
+    def _segments(hits, index, distance_db, m, hop):
+        # Consecutive matching windows with the same lag (within a frame) form one repeated stretch. Both
+        # occurrences usually match each other, so stretches are normalised to (earlier, later) and those
+        # covering the same pair are merged; each pair is reported once, the earlier occurrence as source.
+        runs = []
+        for i in hits:
+            lag = int(index[i]) - int(i)
+            if runs and i == runs[-1][1] + 1 and abs(lag - runs[-1][2]) <= 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i, lag])
+
+        pairs = []
+        for first, last, lag in sorted(((first + min(lag, 0), last + min(lag, 0), abs(lag))
+                                        for first, last, lag in runs), key=lambda run: (run[2], run[0])):
+            distance = float(distance_db[first:last + 1].mean())
+            previous = pairs[-1] if pairs else None
+            if previous and abs(lag - previous[2]) <= 1 and first <= previous[1] + 1:
+                previous[1] = max(previous[1], last)
+                previous[3] = min(previous[3], distance)
+            else:
+                pairs.append([first, last, lag, distance])
+        pairs.sort()
+        return np.array([(first * hop, (first + lag) * hop, (last - first + m) * hop, distance)
+                         for first, last, lag, distance in pairs], dtype=SEGMENT_DTYPE)
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import platform
+import time
+
+from ResultTable import ResultTable
+
+PARTIAL_VERSION = 1
+# Settings that only affect how a machine runs, not what it measures; shards may differ in these
+LOCAL_SETTINGS = ('feature_cache_path', 'cache_max_bytes', 'prefetch_files', 'prefetch_max_bytes', 'prefetch_mode',
+                  'stack_files', 'stack_max_seconds', 'instrument')
+
+
+def parse_shard(value):
+    # 'i/N' with 0 <= i < N
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in 0..{count - 1}, got {index}")
+    return index, count
+
+
+def shard_of(file_path, count):
+    # Stable across processes, machines and Python versions (unlike hash()), so every shard agrees on the
+    # partition without talking to the others; all shards must be given the same input paths
+    key = os.path.normpath(file_path).replace(os.sep, '/')
+    return int.from_bytes(hashlib.sha1(key.encode('utf-8')).digest()[:8], 'big') % count
+
+
+def in_shard(file_paths, index, count, skipped=None):
+    # skipped, if given, is called with every path of another shard
+    for file_path in file_paths:
+        if shard_of(file_path, count) == index:
+            yield file_path
+        elif skipped is not None:
+            skipped(file_path)
+
+
+class PartialWriter:
+    # JSONL partial result of one shard: a header line describing the run, one line per record (the same
+    # records the plain JSONL output has) and a footer written only when the shard ran to completion
+    def __init__(self, stream, index, count, checks, settings, inputs):
+        self.stream = stream
+        self.files = 0
+        self.invalid = 0
+        self._write({'shard': {'version': PARTIAL_VERSION, 'index': index, 'count': count, 'checks': list(checks),
+                               'settings': settings, 'inputs': list(inputs), 'host': platform.node(),
+                               'started': time.time()}})
+
+    def _write(self, value):
+        self.stream.write(json.dumps(value) + '\n')
+        self.stream.flush()
+
+    def write(self, record):
+        self.files += 1
+        self.invalid += not record['valid']
+        self._write(record)
+
+    def finish(self):
+        self._write({'shard_end': {'files': self.files, 'invalid': self.invalid, 'finished': time.time()}})
+
+
+class PartialResult:
+    # A partial result file read back; complete is False when the shard stopped before its footer
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.footer = None
+        self.records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                value = json.loads(line)
+                if 'shard' in value and self.header is None:
+                    self.header = value['shard']
+                elif 'shard_end' in value:
+                    self.footer = value['shard_end']
+                else:
+                    self.records.append(value)
+        if self.header is None:
+            raise ValueError(f"{path} is not a partial result file (no shard header)")
+
+    @property
+    def complete(self):
+        return self.footer is not None and self.footer['files'] == len(self.records)
+
+
+def _analysis_settings(header):
+    return {name: value for name, value in header['settings'].items() if name not in LOCAL_SETTINGS}
+
+
+def merge_partials(paths):
+    # Combines partial results into one ResultTable; returns (table, problems). Problems (missing,
+    # duplicate, incomplete or mismatched shards) don't stop the merge but are reported to the caller.
+    partials = [PartialResult(path) for path in paths]
+    problems = []
+    table = ResultTable()
+    if not partials:
+        return table, ["No partial result files given"]
+
+    first = partials[0].header
+    seen = {}
+    for partial in partials:
+        header = partial.header
+        if header['version'] != PARTIAL_VERSION:
+            problems.append(f"{partial.path}: partial format version {header['version']}, expected {PARTIAL_VERSION}")
+        if header['count'] != first['count']:
+            problems.append(f"{partial.path}: shard of {header['count']}, others are shards of {first['count']}")
+        if header['checks'] != first['checks'] or _analysis_settings(header) != _analysis_settings(first):
+            problems.append(f"{partial.path}: ran with different checks or settings than {partials[0].path}")
+        if header['index'] in seen:
+            problems.append(f"{partial.path}: shard {header['index']} already read from {seen[header['index']]}")
+            continue
+        seen[header['index']] = partial.path
+        if not partial.complete:
+            problems.append(f"{partial.path}: shard {header['index']} did not finish "
+                            f"({len(partial.records)} record(s) so far)")
+        for record in partial.records:
+            table.upsert(record)
+
+    missing = sorted(set(range(first['count'])) - set(seen))
+    if missing:
+        problems.append(f"Missing shard(s) {', '.join(map(str, missing))} of {first['count']}")
+    return table, problems
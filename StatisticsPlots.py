@@ -0,0 +1,111 @@
+import io
+from collections import Counter
+
+import numpy as np
+
+# Panels drawn for each analysis type of the app
+ANALYSIS_PANELS = {
+    'All': ('noise', 'snr', 'clipping', 'channels'),
+    'Analyze SNR': ('snr',),
+    'Detect Clipping': ('clipping',),
+    'Inspect Channel Mode': ('channels',),
+    'Analyze Background Noise': ('noise',),
+}
+HISTOGRAM_BINS = 60
+# Clipped-sample ratios are binned in quarter decades between these powers of ten
+CLIPPING_RATIO_DECADES = (-7, 0)
+
+
+def binned_kde(counts, edges):
+    # Gaussian KDE evaluated at the bin centres, smoothed from the histogram rather than the raw values
+    # (Scott's bandwidth), so it costs the same for any number of files; scaled to the histogram's counts
+    total = counts.sum()
+    centres = (edges[:-1] + edges[1:]) / 2
+    if total < 2:
+        return centres, counts.astype(float)
+    mean = np.average(centres, weights=counts)
+    spread = np.sqrt(np.average((centres - mean) ** 2, weights=counts))
+    bandwidth = max(spread * total ** -0.2, edges[1] - edges[0])
+    kernel = np.exp(-0.5 * ((centres[:, None] - centres[None, :]) / bandwidth) ** 2)
+    density = kernel @ counts
+    return centres, density * total / density.sum()
+
+
+def _column(table, name):
+    return np.fromiter((value for value in table.columns[name] if value is not None), dtype=float)
+
+
+class StatisticsPlots:
+    # Distributions of the result table (noise and SNR histograms with a KDE, clipped-sample ratios on a
+    # log scale, channel mode counts) drawn on one Figure and Agg canvas that are reused for every render.
+    # Every panel is binned first, so drawing takes about the same time for ten files or a million.
+    def __init__(self, width=12, height=8, dpi=100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        self.figure = Figure(figsize=(width, height), dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+
+    def render(self, table, analysis_type='All'):
+        # Draws the panels of analysis_type; returns False when it has none or there are no results
+        panels = ANALYSIS_PANELS.get(analysis_type)
+        self.figure.clear()
+        if not panels or not len(table):
+            return False
+        rows, columns = (1, 1) if len(panels) == 1 else (2, 2)
+        for position, panel in enumerate(panels, start=1):
+            axes = self.figure.add_subplot(rows, columns, position)
+            getattr(self, f'_draw_{panel}')(axes, table)
+        self.figure.tight_layout()
+        self.canvas.draw()
+        return True
+
+    def png(self):
+        # The last render as PNG bytes
+        buffer = io.BytesIO()
+        self.canvas.print_png(buffer)
+        return buffer.getvalue()
+
+    def rgba(self):
+        # The last render as (RGBA bytes, width, height), for handing to a QImage without encoding
+        width, height = self.canvas.get_width_height()
+        return bytes(self.canvas.buffer_rgba()), width, height
+
+    def _draw_levels(self, axes, values, title, color):
+        axes.set_title(f'{title} ({len(values)} files)')
+        axes.set_xlabel('Level (dB)')
+        axes.set_ylabel('Files')
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+        axes.stairs(counts, edges, fill=True, color=color, alpha=0.5)
+        centres, density = binned_kde(counts, edges)
+        axes.plot(centres, density, color=color)
+        axes.axvline(np.median(values), color='black', linestyle='--', linewidth=1,
+                     label=f'median {np.median(values):.1f} dB')
+        axes.legend()
+
+    def _draw_noise(self, axes, table):
+        self._draw_levels(axes, _column(table, 'noise_db'), 'Noise Levels', 'tab:blue')
+
+    def _draw_snr(self, axes, table):
+        self._draw_levels(axes, _column(table, 'snr_db'), 'SNR Levels', 'tab:orange')
+
+    def _draw_clipping(self, axes, table):
+        ratios = _column(table, 'clipping_ratio')
+        clipped = ratios[ratios > 0]
+        low, high = CLIPPING_RATIO_DECADES
+        edges = np.logspace(low, high, 4 * (high - low) + 1)
+        counts, _ = np.histogram(np.clip(clipped, edges[0], edges[-1]), bins=edges)
+        axes.stairs(counts, edges, fill=True, color='tab:red', alpha=0.7)
+        axes.set_xscale('log')
+        axes.set_title(f'Clipping ({len(clipped)} of {len(ratios)} files clipped)')
+        axes.set_xlabel('Clipped sample ratio')
+        axes.set_ylabel('Files')
+
+    def _draw_channels(self, axes, table):
+        modes = Counter(value for value in table.columns['channel_mode'] if value is not None).most_common()
+        axes.bar([mode.capitalize() for mode, _ in modes], [count for _, count in modes], color='tab:green')
+        axes.set_title('Channel Modes')
+        axes.set_xlabel('Channel Type')
+        axes.set_ylabel('Files')
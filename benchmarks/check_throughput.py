@@ -0,0 +1,209 @@
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+
+def _all_checks(checker, entry, entries, settings):
+    import BatchAnalyzer
+    return BatchAnalyzer.analyze_file(checker, entry['path'], BatchAnalyzer.CHECKS, settings)
+
+
+def _all_checks_stacked(checker, group, entries, settings):
+    import BatchAnalyzer
+    return BatchAnalyzer.analyze_stack(checker, [entry['path'] for entry in group], BatchAnalyzer.CHECKS, settings)
+
+
+# Benchmarked call per name: (checker, corpus entry, entries by name, settings) -> result
+METHODS = {
+    'load_audio': lambda c, e, entries, s: c.load_audio(e['path']),
+    'check_format': lambda c, e, entries, s: c.check_format(e['path']),
+    'check_sampling_rate': lambda c, e, entries, s: c.check_sampling_rate(e['path'], s['target_rates']),
+    'check_sampling_rate[bandwidth]': lambda c, e, entries, s: c.check_sampling_rate(
+        e['path'], s['target_rates'], mode='bandwidth', max_frames=s['rate_frames']),
+    'calculate_rms': lambda c, e, entries, s: c.calculate_rms(e['path'], s['noise_threshold_db']),
+    'calculate_snr': lambda c, e, entries, s: c.calculate_snr(e['path'], s['snr_threshold_db']),
+    'detect_clipping': lambda c, e, entries, s: c.detect_clipping(e['path'], s['clipping_threshold']),
+    'calculate_reverb': lambda c, e, entries, s: c.calculate_reverb(e['path']),
+    'check_channel_mode': lambda c, e, entries, s: c.check_channel_mode(e['path']),
+    'check_bit_depth': lambda c, e, entries, s: c.check_bit_depth(e['path'], s['bit_rates']),
+    'channel_metrics': lambda c, e, entries, s: c.channel_metrics(e['path'], s['clipping_threshold']),
+    'find_repeated_segments': lambda c, e, entries, s: c.find_repeated_segments(e['path'], s['repeat_min_seconds']),
+    'detect_copy_paste': lambda c, e, entries, s: c.detect_copy_paste(entries[e['source']]['path'], e['path']),
+    'all_checks': _all_checks,
+}
+# Benchmarked on groups of up to STACK_GROUP_FILES clips no longer than stack_max_seconds rather than file by
+# file: (checker, list of corpus entries, entries by name, settings) -> result
+GROUP_METHODS = {
+    'analyze_stack': _all_checks_stacked,
+}
+STACK_GROUP_FILES = 8
+ALL_METHODS = list(METHODS) + list(GROUP_METHODS)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _reset(checker, group, entries):
+    # Every timed call starts cold: no decoded audio, probe results or prepared copy/paste source
+    for entry in group:
+        checker.release_audio(entry['path'])
+        if 'source' in entry:
+            checker.release_audio(entries[entry['source']]['path'])
+    checker.audio_probe.clear()
+
+
+def _groups(method, entries, settings):
+    # The corpus entries of each timed call
+    if method in GROUP_METHODS:
+        short = [entry for entry in entries if entry['seconds'] <= settings['stack_max_seconds']]
+        return [short[i:i + STACK_GROUP_FILES] for i in range(0, len(short), STACK_GROUP_FILES)]
+    if method == 'detect_copy_paste':
+        return [[entry] for entry in entries if 'source' in entry]
+    return [[entry] for entry in entries]
+
+
+def measure_method(method, entries, repeat):
+    # Runs in a fresh process per method so its peak RSS is its own
+    import AudioFileChecker
+    import BatchAnalyzer
+    settings = BatchAnalyzer.default_settings()
+    checker = AudioFileChecker.AudioFileChecker(settings['supported_formats'], settings['target_rates'])
+    by_name = {entry['name']: entry for entry in entries}
+    groups = _groups(method, entries, settings)
+    if method in GROUP_METHODS:
+        call = GROUP_METHODS[method]
+    else:
+        per_file = METHODS[method]
+
+        def call(c, group, entries, s):
+            return per_file(c, group[0], entries, s)
+    rss_after_import = peak_rss_mb()
+
+    # Untimed warm-up so one-off costs (numba compilation in librosa, lazy imports) are not counted
+    _reset(checker, groups[0], by_name)
+    try:
+        call(checker, groups[0], by_name, settings)
+    except Exception:
+        pass  # recorded below
+
+    # Calls that raise are recorded and left out of the timings: a failure is not throughput
+    runs = []
+    failed = {}  # group index -> error
+    for _ in range(repeat):
+        wall = 0.0
+        for index, group in enumerate(groups):
+            _reset(checker, group, by_name)
+            start = time.perf_counter()
+            try:
+                call(checker, group, by_name, settings)
+            except Exception as e:
+                failed[index] = f"{type(e).__name__}: {e}"
+                continue
+            wall += time.perf_counter() - start
+        runs.append(wall)
+
+    wall = statistics.median(runs)
+    timed = [entry for index, group in enumerate(groups) if index not in failed for entry in group]
+    audio_seconds = sum(entry['seconds'] for entry in timed)
+    return {
+        'files': len(timed),
+        'audio_s': audio_seconds,
+        'wall_s': wall,
+        'audio_s_per_wall_s': audio_seconds / wall if wall else None,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_after_import_mb': rss_after_import,  # the check's own working set is the difference
+        'errors': len(failed),
+        'failed': {', '.join(entry['name'] for entry in groups[index]): error for index, error in failed.items()},
+    }
+
+
+def compare(result, baseline, tolerance):
+    failures = []
+    for method, measured in result['methods'].items():
+        previous = baseline.get('methods', {}).get(method)
+        if not previous or measured['audio_s_per_wall_s'] is None or previous['audio_s_per_wall_s'] is None:
+            continue
+        if measured['audio_s_per_wall_s'] < previous['audio_s_per_wall_s'] * (1 - tolerance):
+            failures.append(f"{method}: {measured['audio_s_per_wall_s']:.1f} audio-s/s vs baseline "
+                            f"{previous['audio_s_per_wall_s']:.1f}")
+        if measured['peak_rss_mb'] and previous.get('peak_rss_mb') and \
+                measured['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + tolerance):
+            failures.append(f"{method}: peak RSS {measured['peak_rss_mb']:.0f} MB vs baseline "
+                            f"{previous['peak_rss_mb']:.0f} MB")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and peak memory of every AudioFileChecker check "
+                                                 "on a deterministic synthetic corpus")
+    parser.add_argument('--corpus', default=os.path.join(tempfile.gettempdir(), 'audio_inspector_corpus'),
+                        help="directory the corpus is generated into (reused while unchanged)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies every corpus duration")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--methods', help=f"comma separated subset of {', '.join(ALL_METHODS)}")
+    parser.add_argument('--output', help="write the measurement as JSON (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="JSON from an earlier --output run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression vs baseline")
+    args = parser.parse_args(argv)
+
+    from synthetic_corpus import build_corpus
+    entries = build_corpus(args.corpus, args.scale)
+    methods = args.methods.split(',') if args.methods else ALL_METHODS
+    unknown = [method for method in methods if method not in ALL_METHODS]
+    if unknown:
+        parser.error(f"unknown method(s): {', '.join(unknown)}")
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'scale': args.scale,
+        'repeat': args.repeat,
+        'corpus': {'files': len(entries), 'audio_s': sum(entry['seconds'] for entry in entries)},
+        'methods': {},
+    }
+    context = multiprocessing.get_context('spawn')
+    for method in methods:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            measured = executor.submit(measure_method, method, entries, args.repeat).result()
+        result['methods'][method] = measured
+        print(f"{method:32s} {measured['audio_s_per_wall_s'] or 0:10.1f} audio-s/s {measured['wall_s']:8.2f} s "
+              f"peak {measured['peak_rss_mb'] or 0:7.0f} MB "
+              f"(+{(measured['peak_rss_mb'] or 0) - (measured['rss_after_import_mb'] or 0):.0f} MB over imports)",
+              file=sys.stderr)
+        for names, error in measured['failed'].items():
+            print(f"{'':32s} skipped {names}: {error}", file=sys.stderr)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(result, json.load(f), args.tolerance)
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
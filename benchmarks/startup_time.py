@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded before the window is painted
+HEAVY_MODULES = ['librosa', 'pandas', 'matplotlib', 'reportlab', 'numpy', 'scipy']
+
+# Runs in a fresh interpreter so every measurement is a cold start
+PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+import AudioInspectorApp
+imported = time.perf_counter()
+app = QApplication(sys.argv[:1])
+window = AudioInspectorApp.AudioInspectorApp()
+constructed = time.perf_counter()
+painted = []
+
+class PaintWatcher(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and not painted:
+            painted.append(time.perf_counter())
+            QTimer.singleShot(0, app.quit)
+        return False
+
+watcher = PaintWatcher()
+window.installEventFilter(watcher)
+window.show()
+QTimer.singleShot(5000, app.quit)
+app.exec_()
+first_paint = painted[0] if painted else None
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'construct_ms': (constructed - imported) * 1000,
+    'first_paint_ms': (first_paint - start) * 1000 if first_paint else None,
+    'heavy_modules_loaded': sorted(name for name in sys.argv[2].split(',') if name in sys.modules),
+}))
+"""
+
+
+def measure_once():
+    output = subprocess.run([sys.executable, '-c', PROBE, REPO_DIR, ','.join(HEAVY_MODULES)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import and first-paint time of the desktop app")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="fail if median first paint exceeds this")
+    parser.add_argument('--output', help="write the measurement as JSON (e.g. a new baseline)")
+    parser.add_argument('--baseline', help="JSON from an earlier --output run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed relative regression vs baseline")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get('DISPLAY') and sys.platform.startswith('linux'):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    runs = [measure_once() for _ in range(args.repeat)]
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'repeat': args.repeat,
+        'import_ms': statistics.median(run['import_ms'] for run in runs),
+        'construct_ms': statistics.median(run['construct_ms'] for run in runs),
+        'first_paint_ms': statistics.median(run['first_paint_ms'] or float('inf') for run in runs),
+        'heavy_modules_loaded': sorted({name for run in runs for name in run['heavy_modules_loaded']}),
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if result['first_paint_ms'] > args.budget_ms:
+        failures.append(f"first paint {result['first_paint_ms']:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if result['heavy_modules_loaded']:
+        failures.append(f"loaded before first paint: {', '.join(result['heavy_modules_loaded'])}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for key in ('import_ms', 'first_paint_ms'):
+            if result[key] > baseline[key] * (1 + args.tolerance):
+                failures.append(f"{key} regressed: {result[key]:.0f} ms vs baseline {baseline[key]:.0f} ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
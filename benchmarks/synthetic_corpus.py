@@ -0,0 +1,149 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+CORPUS_VERSION = 2
+
+# name, kind, seconds (before --scale), sample rate, channels, container, subtype
+CORPUS_SPEC = [
+    ('tone_mono_16', 'tone', 10, 48000, 1, 'WAV', 'PCM_16'),
+    ('tone_stereo_24', 'tone', 10, 44100, 2, 'WAV', 'PCM_24'),
+    ('noise_mono_16', 'noise', 30, 48000, 1, 'WAV', 'PCM_16'),
+    ('noise_stereo_flac', 'noise', 30, 44100, 2, 'FLAC', 'PCM_24'),
+    ('noise_surround_51', 'noise', 10, 48000, 6, 'WAV', 'PCM_16'),
+    ('speechlike_8bit', 'speechlike', 10, 16000, 1, 'WAV', 'PCM_U8'),
+    ('speechlike_float32', 'speechlike', 30, 48000, 1, 'WAV', 'FLOAT'),
+    ('clipped_mono', 'clipped', 30, 48000, 1, 'WAV', 'PCM_16'),
+    ('clipped_stereo_long', 'clipped', 120, 48000, 2, 'WAV', 'PCM_16'),
+    ('upsampled_44k_to_48k', 'upsampled', 30, 48000, 1, 'WAV', 'PCM_16'),
+    ('upsampled_16k_to_48k', 'upsampled', 30, 48000, 1, 'WAV', 'PCM_16'),
+    ('reverberant', 'reverberant', 10, 48000, 1, 'WAV', 'PCM_16'),
+    ('music_long_flac', 'speechlike', 300, 44100, 2, 'FLAC', 'PCM_16'),
+    ('noise_aiff', 'noise', 10, 44100, 2, 'AIFF', 'PCM_16'),
+    ('noise_ogg', 'noise', 10, 48000, 2, 'OGG', 'VORBIS'),
+    ('noise_mp3', 'noise', 10, 44100, 2, 'MP3', 'MPEG_LAYER_III'),
+    # Copy/paste pairs: the target repeats a stretch of its source
+    ('duplicate_source', 'speechlike', 20, 44100, 1, 'WAV', 'PCM_16'),
+    ('duplicate_target', 'duplicate', 20, 44100, 1, 'WAV', 'PCM_16'),
+]
+UPSAMPLED_FROM = {'upsampled_44k_to_48k': 44100, 'upsampled_16k_to_48k': 16000}
+EXTENSIONS = {'WAV': 'wav', 'FLAC': 'flac', 'AIFF': 'aiff', 'OGG': 'ogg', 'MP3': 'mp3'}
+
+
+def _seed(name):
+    return int.from_bytes(hashlib.sha1(name.encode()).digest()[:4], 'little')
+
+
+def _speechlike(rng, samples, sr):
+    # Noise bursts shaped by a slow syllable envelope and a few formant-like resonances
+    t = np.arange(samples) / sr
+    carrier = rng.standard_normal(samples)
+    spectrum = np.fft.rfft(carrier)
+    freqs = np.fft.rfftfreq(samples, 1 / sr)
+    shape = sum(np.exp(-((freqs - f) / 150.0) ** 2) for f in (500, 1500, 2500)) + 0.05
+    voiced = np.fft.irfft(spectrum * shape, samples)
+    envelope = np.clip(np.sin(2 * np.pi * 3.1 * t) * np.sin(2 * np.pi * 0.37 * t), 0, None)
+    signal = voiced * envelope
+    return 0.5 * signal / (np.abs(signal).max() + 1e-12) + 0.001 * rng.standard_normal(samples)
+
+
+def synthesize(kind, seconds, sr, channels, rng, source_rate=None):
+    samples = int(seconds * sr)
+    t = np.arange(samples) / sr
+    if kind == 'tone':
+        y = 0.5 * np.sin(2 * np.pi * 440.0 * t) + 0.001 * rng.standard_normal(samples)
+    elif kind == 'noise':
+        y = 0.1 * rng.standard_normal(samples)
+    elif kind == 'speechlike':
+        y = _speechlike(rng, samples, sr)
+    elif kind == 'clipped':
+        # Speech-like peaks at 0.5, so 2.5x drives the loudest stretches into the rails
+        y = np.clip(2.5 * _speechlike(rng, samples, sr), -1.0, 1.0)
+    elif kind == 'upsampled':
+        # Band-limited to the source rate's Nyquist, then resampled up
+        import librosa
+        y = librosa.resample(0.1 * rng.standard_normal(int(seconds * source_rate)), orig_sr=source_rate, target_sr=sr)
+    elif kind == 'reverberant':
+        dry = _speechlike(rng, samples, sr)
+        tail = rng.standard_normal(int(1.5 * sr)) * np.exp(-np.arange(int(1.5 * sr)) / (0.4 * sr))
+        y = np.convolve(dry, tail)[:samples]
+        y = 0.5 * y / np.abs(y).max()
+    else:
+        raise ValueError(f"Unknown signal kind: {kind}")
+    y = np.asarray(y, dtype=np.float64)[:samples]
+    if channels > 1:
+        # Decorrelated channels so nothing looks like fake stereo
+        y = np.stack([y] + [np.roll(y, 101 * c) * (1 - 0.05 * c) for c in range(1, channels)], axis=1)
+    return y
+
+
+def _write_entry(directory, spec, scale, written):
+    name, kind, seconds, sr, channels, container, subtype = spec
+    seconds = seconds * scale
+    rng = np.random.default_rng(_seed(name))
+    entry = {'name': name, 'kind': kind, 'seconds': seconds, 'sample_rate': sr, 'channels': channels,
+             'format': EXTENSIONS[container], 'subtype': subtype}
+    if kind == 'duplicate':
+        source = written['duplicate_source']
+        y, _ = sf.read(source['path'], always_2d=False)
+        # Replace a middle stretch with a copy of an earlier one
+        length = int(seconds * sr / 4)
+        y = np.array(y)
+        y[2 * length:3 * length] = y[length // 2:length // 2 + length]
+        entry['source'] = 'duplicate_source'
+    else:
+        if kind == 'upsampled':
+            entry['source_rate'] = UPSAMPLED_FROM[name]
+        y = synthesize(kind, seconds, sr, channels, rng, entry.get('source_rate'))
+    path = os.path.join(directory, f"{name}.{entry['format']}")
+    try:
+        sf.write(path, y, sr, format=container, subtype=subtype)
+    except Exception as e:
+        # e.g. MP3 needs libsndfile >= 1.1
+        print(f"Skipping {name}: {e}", file=sys.stderr)
+        return None
+    entry['path'] = path
+    return entry
+
+
+def build_corpus(directory, scale=1.0):
+    # Writes the corpus (deterministically, seeded per file) once and reuses it while the manifest matches
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+    key = {'version': CORPUS_VERSION, 'scale': scale}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('key') == key and all(os.path.exists(entry['path']) for entry in manifest['entries']):
+            return manifest['entries']
+
+    written = {}
+    for spec in CORPUS_SPEC:
+        entry = _write_entry(directory, spec, scale, written)
+        if entry is not None:
+            written[entry['name']] = entry
+    entries = list(written.values())
+    with open(manifest_path, 'w') as f:
+        json.dump({'key': key, 'entries': entries}, f, indent=2)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the deterministic synthetic benchmark corpus")
+    parser.add_argument('directory')
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies every duration")
+    args = parser.parse_args(argv)
+    entries = build_corpus(args.directory, args.scale)
+    for entry in entries:
+        print(f"{entry['name']:24s} {entry['seconds']:8.1f}s {entry['sample_rate']:6d}Hz "
+              f"{entry['channels']}ch {entry['format']}/{entry['subtype']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import struct
+
+import numpy as np
+import soundfile as sf
+
+from AudioProbe import AudioProbe, read_header
+
+
+def fallback_info(file_path):
+    return {'format_name': 'fallback', 'codec_name': '', 'sample_rate': None, 'channels': None,
+            'bits_per_sample': None, 'duration': None}
+
+
+def test_headers_of_pcm_containers(tmp_path):
+    y = np.zeros((4410, 2), dtype=np.float32)
+    cases = [('a.wav', 'PCM_24', 'wav', 'pcm_s24le', 24), ('a.flac', 'PCM_16', 'flac', 'flac', 16),
+             ('a.aiff', 'PCM_16', 'aiff', 'pcm_s16be', 16), ('b.wav', 'FLOAT', 'wav', 'pcm_f32le', 32)]
+    for name, subtype, container, codec, bits in cases:
+        path = str(tmp_path / name)
+        sf.write(path, y, 44100, subtype=subtype)
+        info = read_header(path)
+        assert (info['format_name'], info['codec_name'], info['bits_per_sample']) == (container, codec, bits)
+        assert (info['sample_rate'], info['channels'], info['duration']) == (44100, 2, 0.1)
+
+
+def test_truncated_headers_fall_back(tmp_path):
+    rf64 = tmp_path / 'short_ds64.wav'
+    rf64.write_bytes(b'RF64' + struct.pack('<I', 0xFFFFFFFF) + b'WAVE' + b'ds64' + struct.pack('<I', 28) + b'\0' * 8)
+    aiff = tmp_path / 'short_comm.aiff'
+    aiff.write_bytes(b'FORM' + struct.pack('>I', 30) + b'AIFF' + b'COMM' + struct.pack('>I', 18) + b'\0' * 6)
+    tiny = tmp_path / 'tiny.wav'
+    tiny.write_bytes(b'RIFF')
+    probe = AudioProbe(fallback=fallback_info)
+    for path in (rf64, aiff, tiny):
+        assert read_header(str(path)) is None
+        assert probe.probe(str(path))['format_name'] == 'fallback'
+    results = probe.probe_many([str(rf64), str(aiff), str(tmp_path / 'missing.wav')])
+    assert sorted(results) == [str(aiff), str(rf64)]
+    assert all(info['format_name'] == 'fallback' for info in results.values())
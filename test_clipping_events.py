@@ -0,0 +1,56 @@
+import numpy as np
+
+from ClippingEvents import ClippingEvents, find_clipping_runs
+
+
+def naive_runs(y, threshold):
+    # (start, length, channel) of every run, one sample at a time
+    runs = []
+    for channel, samples in enumerate(np.atleast_2d(y)):
+        start = None
+        for position, value in enumerate(np.append(np.abs(samples), 0)):
+            if value > threshold and start is None:
+                start = position
+            elif value <= threshold and start is not None:
+                runs.append((start, position - start, channel))
+                start = None
+    return runs
+
+
+def test_runs_of_one_channel():
+    y = np.array([0.0, 1.0, 1.0, 0.2, -1.0, 0.0, 0.995, -0.999, 1.0], dtype=np.float32)
+    events = find_clipping_runs(y, 0.99)
+    assert [(int(e['start']), int(e['length'])) for e in events] == [(1, 2), (4, 1), (6, 3)]
+    assert events['peak'].tolist() == [1.0, 1.0, 1.0]
+
+
+def test_runs_do_not_cross_channels_or_blocks():
+    rng = np.random.default_rng(7)
+    y = rng.uniform(-1.0, 1.0, size=(3, 5000)).astype(np.float32)
+    y[0, -40:] = 1.0  # a run at the end of one channel ...
+    y[1, :40] = -1.0  # ... must not continue into the start of the next
+    expected = naive_runs(y, 0.9)
+    for block_size in (64, 1000, 1 << 20):
+        events = find_clipping_runs(y, 0.9, block_size=block_size)
+        found = sorted((int(e['start']), int(e['length']), int(e['channel'])) for e in events)
+        assert found == sorted(expected)
+
+
+def test_summary_histogram_and_indices():
+    sr = 10
+    y = np.zeros((2, 35), dtype=np.float32)
+    y[0, 8:13] = 1.0  # crosses the first second boundary
+    y[1, 20:22] = -1.0
+    clipping = ClippingEvents.from_signal(y, sr, 0.99, block_size=16)
+    assert clipping.summary() == {'clipped_samples': 7, 'events': 2, 'clipped_ratio': 7 / 70, 'longest_run': 5,
+                                  'peak': 1.0}
+    assert clipping.per_second_histogram().tolist() == [2, 3, 2, 0]
+    assert clipping.indices(channel=0).tolist() == [8, 9, 10, 11, 12]
+    assert clipping.indices().tolist() == [8, 9, 10, 11, 12, 20, 21]
+
+
+def test_no_clipping():
+    clipping = ClippingEvents.from_signal(np.zeros(100, dtype=np.float32), 10, 0.99)
+    assert clipping.summary() == {'clipped_samples': 0, 'events': 0, 'clipped_ratio': 0.0, 'longest_run': 0,
+                                  'peak': 0.0}
+    assert clipping.indices().tolist() == []
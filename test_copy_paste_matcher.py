@@ -0,0 +1,50 @@
+import numpy as np
+
+from CopyPasteMatcher import CopyPasteMatcher
+
+
+def naive_matches(source, target, atol=1e-1):
+    # The original sliding-window search the matcher replaces
+    pattern = source[:, :source.shape[1] // 2]
+    length = min(pattern.shape[1], target.shape[1])
+    pattern = pattern[:, :length]
+    return [start for start in range(target.shape[1] - length + 1)
+            if np.all(np.isclose(target[:, start:start + length], pattern, atol=atol))]
+
+
+def spectrogram(rng, frames, bins=32):
+    return rng.gamma(2.0, 1.0, size=(bins, frames)).astype(np.float32)
+
+
+def test_finds_the_pasted_half_of_the_source():
+    rng = np.random.default_rng(1)
+    source = spectrogram(rng, 40)
+    target = spectrogram(rng, 120)
+    target[:, 17:37] = source[:, :20] + rng.uniform(-0.05, 0.05, size=(32, 20))
+    matcher = CopyPasteMatcher(source, sr=22050, hop_length=512)
+    matches = matcher.find_matches(target)
+    assert [offset for offset, _ in matches] == [17]
+    assert matches[0][1] > 0.99
+    assert matcher.offset_seconds(17) == 17 * 512 / 22050
+
+
+def test_agrees_with_the_sliding_window_search():
+    rng = np.random.default_rng(2)
+    for _ in range(20):
+        source = spectrogram(rng, int(rng.integers(2, 30)), bins=8)
+        target = spectrogram(rng, int(rng.integers(1, 60)), bins=8)
+        pattern = source[:, :source.shape[1] // 2]
+        for offset in rng.integers(0, max(1, target.shape[1] - pattern.shape[1]), size=2):
+            window = target[:, offset:offset + pattern.shape[1]]
+            # Some copies just inside the tolerance, some just outside it
+            window[:] = pattern[:, :window.shape[1]] + rng.choice([0.09, 0.11]) * rng.choice([-1, 1])
+        found = [offset for offset, _ in CopyPasteMatcher(source).find_matches(target)]
+        assert found == naive_matches(source, target)
+
+
+def test_unrelated_or_mismatched_targets():
+    rng = np.random.default_rng(3)
+    matcher = CopyPasteMatcher(spectrogram(rng, 40))
+    assert matcher.find_matches(spectrogram(rng, 200)) == []
+    assert matcher.find_matches(spectrogram(rng, 200, bins=16)) == []
+    assert matcher.find_matches(np.zeros((32, 0), dtype=np.float32)) == []
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+from FeatureCache import MISSING, FeatureCache
+
+
+def make_cache(tmp_path):
+    return FeatureCache(str(tmp_path / 'cache.sqlite'))
+
+
+def write_file(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_get_returns_what_was_put(tmp_path):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'audio' * 100)
+    cache.put(audio, 'rms', {'db': -20.5}, {'frame': 2048})
+    cache.put(audio, 'spectrum', np.arange(6, dtype=np.float32).reshape(2, 3))
+    assert cache.get(audio, 'rms', {'frame': 2048}) == {'db': -20.5}
+    spectrum = cache.get(audio, 'spectrum')
+    assert spectrum.dtype == np.float32 and spectrum.tolist() == [[0, 1, 2], [3, 4, 5]]
+    assert cache.stats()['hits'] == 2
+
+
+def test_params_and_name_are_part_of_the_key(tmp_path):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'audio' * 100)
+    cache.put(audio, 'rms', 1.0, {'frame': 2048})
+    assert cache.get(audio, 'rms', {'frame': 1024}) is MISSING
+    assert cache.get(audio, 'rms') is MISSING
+    assert cache.get(audio, 'snr', {'frame': 2048}) is MISSING
+    # Key order of the params does not matter
+    cache.put(audio, 'snr', 2.0, {'a': 1, 'b': 2})
+    assert cache.get(audio, 'snr', {'b': 2, 'a': 1}) == 2.0
+
+
+def test_rewritten_file_misses(tmp_path):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'a' * 1000)
+    cache.put(audio, 'rms', 1.0)
+    stat = os.stat(audio)
+    # Same size and modification time, different content: only the content hash tells them apart. A new
+    # instance reads it, as one instance remembers the hash of a (path, size, mtime) it has seen.
+    write_file(audio, b'b' * 1000)
+    os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert FeatureCache(cache.db_path).get(audio, 'rms') is MISSING
+    # A new modification time alone is enough
+    write_file(audio, b'a' * 1000)
+    os.utime(audio, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.get(audio, 'rms') is MISSING
+    assert cache.stats()['misses'] == 1
+
+
+def test_version_bump_misses(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'audio' * 100)
+    cache.put(audio, 'rms', 1.0)
+    monkeypatch.setattr(FeatureCache, 'VERSION', FeatureCache.VERSION + 1)
+    assert cache.get(audio, 'rms') is MISSING
+
+
+def test_invalidate_and_missing_file(tmp_path):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'audio' * 100)
+    cache.put(audio, 'rms', 1.0)
+    cache.invalidate(audio)
+    assert cache.get(audio, 'rms') is MISSING
+    assert cache.get(str(tmp_path / 'gone.wav'), 'rms') is MISSING
+
+
+def test_contains_does_not_count_lookups(tmp_path):
+    cache = make_cache(tmp_path)
+    audio = write_file(tmp_path / 'a.wav', b'audio' * 100)
+    cache.put(audio, 'rms', 1.0, {'frame': 2048})
+    assert cache.contains(audio, 'rms', {'frame': 2048})
+    assert not cache.contains(audio, 'rms', {'frame': 1024})
+    assert not cache.contains(str(tmp_path / 'gone.wav'), 'rms')
+    assert cache.stats() == {'hits': 0, 'misses': 0, 'hit_rate': 0.0}
@@ -0,0 +1,66 @@
+import numpy as np
+import soundfile as sf
+
+from FingerprintIndex import FingerprintIndex
+
+SR = 11025
+HOP = 512
+
+
+def tones(rng, seconds):
+    # A sequence of short random chords, so the spectrogram has clear, distinct peaks
+    notes = []
+    for _ in range(int(seconds * 8)):
+        t = np.arange(SR // 8) / SR
+        chord = sum(np.sin(2 * np.pi * rng.uniform(200, 4000) * t) for _ in range(3))
+        notes.append(chord * np.hanning(len(t)))
+    return (0.2 * np.concatenate(notes)).astype(np.float32)
+
+
+def write(path, y):
+    sf.write(str(path), y, SR)
+    return str(path)
+
+
+def make_corpus(tmp_path):
+    rng = np.random.default_rng(5)
+    source = tones(rng, 8)
+    # Frames 20..100 of the source reappear from frame 80 of the copy, on the same hop grid
+    copy = tones(rng, 8)
+    copy[80 * HOP:160 * HOP] = source[20 * HOP:100 * HOP]
+    return (write(tmp_path / 'source.wav', source), write(tmp_path / 'copy.wav', copy),
+            write(tmp_path / 'unrelated.wav', tones(rng, 8)))
+
+
+def test_reused_material_is_found_once_with_its_offsets(tmp_path):
+    source, copy, unrelated = make_corpus(tmp_path)
+    index = FingerprintIndex(str(tmp_path / 'index.sqlite'))
+    assert index.add_files([source, copy, unrelated, str(tmp_path / 'missing.wav')]) == 3
+    assert index.file_count() == 3
+
+    matches = list(index.find_reused_material())
+    assert [(match['source'], match['file']) for match in matches] == [(source, copy)]
+    match = matches[0]
+    frame = HOP / SR
+    assert abs(match['query_offset'] - 20 * frame) <= 8 * frame
+    assert abs(match['offset'] - match['query_offset'] - 60 * frame) <= frame
+    assert match['duration'] > 40 * frame
+    assert 0 < match['confidence'] <= 1
+    index.close()
+
+
+def test_query_and_reindexing(tmp_path):
+    source, copy, unrelated = make_corpus(tmp_path)
+    index = FingerprintIndex(str(tmp_path / 'index.sqlite'))
+    index.add_files([copy, unrelated])
+    assert [match['file'] for match in index.query_file(source)] == [copy]
+    # A file does not match itself, and unchanged files are not indexed again
+    assert index.query_file(unrelated) == []
+    assert not index.add_file(copy)
+
+    write(copy, tones(np.random.default_rng(9), 8))
+    assert index.add_file(copy)
+    assert index.query_file(source) == []
+    assert index.remove_file(unrelated) and not index.remove_file(unrelated)
+    assert index.file_count() == 1
+    index.close()
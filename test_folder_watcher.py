@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import FolderWatcher
+
+WALL_OFFSET = 1_700_000_000.0
+
+
+class Clock:
+    # Stands in for the time module: monotonic and wall time advance together, only when told to
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return WALL_OFFSET + self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(FolderWatcher, 'time', clock)
+    return clock
+
+
+def write(clock, path, content, age=0.0):
+    # Writes path as if it happened age seconds ago by the fake clock; the directory's mtime moves on too,
+    # as it does on a real file system when an entry is added
+    with open(path, 'ab') as f:
+        f.write(content)
+    mtime_ns = int((clock.time() - age) * 1e9)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    directory = os.path.dirname(path)
+    os.utime(directory, ns=(mtime_ns, os.stat(directory).st_mtime_ns + 1))
+    return str(path)
+
+
+def test_growing_file_waits_until_it_settles(tmp_path, clock):
+    watcher = FolderWatcher.FolderWatcher([str(tmp_path)], settle_seconds=2.0)
+    take = write(clock, tmp_path / 'take.wav', b'x' * 100)
+    assert watcher.poll() == []
+    assert watcher.pending_count == 1
+
+    clock.now += 1.5
+    write(clock, take, b'x' * 100)  # still being written
+    assert watcher.poll() == []
+    clock.now += 1.5
+    assert watcher.poll() == []  # 1.5 s since the last change
+    clock.now += 0.5
+    assert watcher.poll() == [take]
+    assert watcher.pending_count == 0
+    clock.now += 10
+    assert watcher.poll() == []
+
+
+def test_files_written_long_ago_need_no_settle_wait(tmp_path, clock):
+    old = write(clock, tmp_path / 'old.wav', b'x' * 100, age=3600)
+    write(clock, tmp_path / 'notes.txt', b'not audio', age=3600)
+    (tmp_path / 'sub').mkdir()
+    nested = write(clock, tmp_path / 'sub' / 'nested.FLAC', b'x' * 100, age=3600)
+    watcher = FolderWatcher.FolderWatcher([str(tmp_path)])
+    assert watcher.poll() == sorted([old, nested])
+
+
+def test_existing_files_can_be_skipped(tmp_path, clock):
+    write(clock, tmp_path / 'old.wav', b'x' * 100, age=3600)
+    watcher = FolderWatcher.FolderWatcher([str(tmp_path)], include_existing=False)
+    assert watcher.poll() == []
+    new = write(clock, tmp_path / 'new.wav', b'x' * 100, age=3600)
+    assert watcher.poll() == [new]
+
+
+def test_rewrite_in_place_is_found_at_the_next_rescan(tmp_path, clock):
+    take = write(clock, tmp_path / 'take.wav', b'x' * 100, age=3600)
+    watcher = FolderWatcher.FolderWatcher([str(tmp_path)], rescan_interval=60.0)
+    assert watcher.poll() == [take]
+
+    # Rewriting a file leaves its directory's mtime alone, so only the periodic rescan sees it
+    directory_mtime = os.stat(tmp_path).st_mtime_ns
+    write(clock, take, b'y' * 100, age=3600)
+    os.utime(tmp_path, ns=(directory_mtime, directory_mtime))
+    clock.now += 30
+    assert watcher.poll() == []
+    clock.now += 30
+    assert watcher.poll() == [take]
+
+
+def test_forget_and_deleted_files(tmp_path, clock):
+    take = write(clock, tmp_path / 'take.wav', b'x' * 100, age=3600)
+    watcher = FolderWatcher.FolderWatcher([str(tmp_path)], rescan_interval=0.0)
+    assert watcher.poll() == [take]
+    watcher.forget(take)
+    assert watcher.poll() == [take]
+
+    fresh = write(clock, tmp_path / 'fresh.wav', b'x' * 100)
+    assert watcher.poll() == []
+    os.remove(fresh)
+    assert watcher.poll() == []
+    assert watcher.pending_count == 0
@@ -0,0 +1,58 @@
+import json
+import os
+
+from Manifest import Manifest, is_manifest
+
+
+def write_lines(path, lines):
+    # Mixed line endings and blank lines, as hand-edited manifests have them
+    path.write_bytes(b''.join(line.encode('utf-8') + (b'\r\n' if i % 2 else b'\n') for i, line in enumerate(lines)))
+    return str(path)
+
+
+def test_is_manifest():
+    assert is_manifest('files.CSV') and is_manifest('/a/files.jsonl')
+    assert not is_manifest('take.wav')
+
+
+def test_csv_with_header_and_expectations(tmp_path):
+    path = write_lines(tmp_path / 'files.csv', [
+        'path,sample_rate,format', 'a.wav,48000,.WAV', '', '/abs/b.flac,,flac', 'c.wav,not a number,wav'])
+    skipped = []
+    manifest = Manifest(path, on_skipped=skipped.append)
+    assert list(manifest) == [(os.path.join(str(tmp_path), 'a.wav'), {'sample_rate': 48000, 'format': 'wav'}),
+                              ('/abs/b.flac', {'format': 'flac'})]
+    assert skipped == ["Skipping entry 3 of files.csv: invalid literal for int() with base 10: 'not a number'"]
+    # The index counts every non-blank entry line, unreadable ones included
+    assert len(manifest) == 3
+    assert manifest.entry(1) == ('/abs/b.flac', {'format': 'flac'})
+    assert manifest.entry(2) is None
+
+
+def test_csv_without_header_is_bare_paths(tmp_path):
+    path = write_lines(tmp_path / 'files.csv', ['a.wav', 'b.wav,ignored'])
+    manifest = Manifest(path)
+    assert [file_path for file_path, _ in manifest] == [os.path.join(str(tmp_path), 'a.wav'),
+                                                        os.path.join(str(tmp_path), 'b.wav')]
+    assert len(manifest) == 2
+
+
+def test_jsonl_rows_by_offset(tmp_path):
+    lines = [json.dumps({'file_path': f'take_{i}.wav', 'channels': 2}) for i in range(50)]
+    lines[10] = '["not", "an", "object"]'
+    lines.insert(20, '')
+    path = write_lines(tmp_path / 'files.jsonl', lines)
+    skipped = []
+    manifest = Manifest(path, on_skipped=skipped.append)
+    assert len(manifest) == 50
+    assert manifest.entry(49) == (os.path.join(str(tmp_path), 'take_49.wav'), {'channels': 2})
+    assert manifest.entry(10) is None
+
+    expectations = {}
+    paths = list(manifest.paths(expectations, 8, 13))
+    assert [os.path.basename(file_path) for file_path in paths] == ['take_8.wav', 'take_9.wav', 'take_11.wav',
+                                                                      'take_12.wav']
+    assert expectations == {file_path: {'channels': 2} for file_path in paths}
+    assert skipped == ["Skipping entry 11 of files.jsonl: JSONL entries must be objects"]
+    assert list(manifest.entries(60)) == []
+    manifest.close()
@@ -0,0 +1,76 @@
+import os
+import threading
+import time
+
+from Prefetcher import Prefetcher
+
+
+def make_files(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f'{i}.wav'
+        path.write_bytes(b'x' * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_items_come_in_order_with_their_decode(tmp_path):
+    paths = make_files(tmp_path, [100, 200, 300, 400])
+
+    def decode(file_path):
+        time.sleep(0.02)
+        return ('audio', file_path)
+
+    items = list(Prefetcher(decode, depth=2).iterate(iter(paths)))
+    assert [item.file_path for item in items] == paths
+    assert [item.audio for item in items] == [('audio', path) for path in paths]
+    assert [item.bytes_read for item in items] == [100, 200, 300, 400]
+    assert all(item.decode_s >= 0.02 for item in items)
+
+
+def test_byte_budget_and_oversized_files(tmp_path):
+    paths = make_files(tmp_path, [100, 100, 1000, 100])
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def decode(file_path):
+        with lock:
+            in_flight.append(file_path)
+            peak.append(sum(os.path.getsize(path) for path in in_flight))
+        time.sleep(0.01)
+        with lock:
+            in_flight.remove(file_path)
+        return 'audio'
+
+    items = list(Prefetcher(decode, depth=4, max_bytes=250).iterate(paths))
+    assert [item.audio for item in items] == ['audio', 'audio', None, 'audio']
+    assert max(peak) <= 250
+
+
+def test_files_without_decode_need_and_failures(tmp_path):
+    paths = make_files(tmp_path, [100, 100, 100])
+
+    def decode(file_path):
+        if file_path == paths[2]:
+            raise ValueError('corrupt')
+        return 'audio'
+
+    prefetcher = Prefetcher(decode, needs_decode=lambda file_path: file_path != paths[0])
+    items = list(prefetcher.iterate(paths))
+    assert [(item.audio, item.bytes_read, item.decode_s) for item in items[::2]] == [(None, 0, 0.0), (None, 0, 0.0)]
+    assert (items[1].audio, items[1].bytes_read) == ('audio', 100)
+
+
+def test_read_mode_and_cancel(tmp_path):
+    paths = make_files(tmp_path, [3 * 1024 * 1024, 10, 10])
+    items = list(Prefetcher(None, mode='read').iterate(paths))
+    assert [(item.audio, item.bytes_read, item.decode_s) for item in items] == [
+        (None, 3 * 1024 * 1024, 0.0), (None, 10, 0.0), (None, 10, 0.0)]
+
+    prefetcher = Prefetcher(lambda file_path: 'audio')
+    seen = []
+    for item in prefetcher.iterate(paths):
+        seen.append(item.file_path)
+        prefetcher.cancel()
+    assert seen == paths[:1]
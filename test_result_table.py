@@ -0,0 +1,64 @@
+from ResultTable import RECORD_FIELDS, TIMING_COLUMNS, ResultRecord, ResultTable
+
+
+def record(name, valid=True, **fields):
+    return dict({'file_path': f'/corpus/{name}', 'file_name': name, 'valid': valid,
+                 'invalid_reasons': [] if valid else ['Clipping Detected']}, **fields)
+
+
+def test_upsert_appends_then_replaces_in_place():
+    table = ResultTable()
+    assert table.upsert(record('a.wav', valid=False, noise_db=-40.0)) == (0, False)
+    assert table.upsert(record('b.wav', noise_db=-60.0)) == (1, False)
+    revision = table.revision
+    assert table.upsert(record('a.wav', noise_db=-50.0)) == (0, True)
+    assert table.revision > revision
+    assert len(table) == 2 and '/corpus/a.wav' in table
+    assert table.invalid_count == 0
+    assert table.columns['noise_db'] == [-50.0, -60.0]
+    assert table.record(0).invalid_reasons == ()
+
+
+def test_counts_follow_replacements():
+    table = ResultTable()
+    table.upsert(record('a.wav', timings={'total_s': 1.0}))
+    table.upsert(record('b.wav', valid=False))
+    assert (table.invalid_count, table.timed_count) == (1, 1)
+    table.upsert(record('a.wav', valid=False))
+    assert (table.invalid_count, table.timed_count) == (2, 0)
+    table.clear()
+    assert (len(table), table.invalid_count, table.timed_count) == (0, 0, 0)
+
+
+def test_export_rows():
+    table = ResultTable()
+    table.upsert(record('a.wav', channel_rms_db=[-20.0, -21.5], repeat_segments=['0.00-1.00', '2.00-3.00']))
+    assert table.header == RECORD_FIELDS
+    row = dict(zip(table.header, next(table.rows())))
+    assert row['channel_rms_db'] == '-20;-21.5'
+    assert row['repeat_segments'] == '0.00-1.00;2.00-3.00'
+    assert row['noise_db'] is None
+
+    table.upsert(record('b.wav', timings={'total_s': 2.0, 'noise_s': 0.5}))
+    assert table.header == RECORD_FIELDS + TIMING_COLUMNS
+    rows = [dict(zip(table.header, values)) for values in table.rows()]
+    assert rows[0]['timing_total_s'] is None
+    assert (rows[1]['timing_total_s'], rows[1]['timing_noise_s']) == (2.0, 0.5)
+
+
+def test_statistics_and_round_trip():
+    table = ResultTable()
+    for i, noise_db in enumerate([-60.0, -50.0, -40.0]):
+        table.upsert(record(f'{i}.wav', valid=noise_db < -45, noise_db=noise_db, channel_mode='stereo',
+                            clipping=i == 2, clipping_points=5 * i))
+    stats = table.statistics()
+    assert stats['files'] == 3 and stats['invalid'] == 1
+    assert stats['invalid_reasons'] == {'Clipping Detected': 1}
+    assert stats['noise_db'] == {'count': 3, 'mean': -50.0, 'min': -60.0, 'median': -50.0, 'max': -40.0}
+    assert stats['snr_db'] is None
+    assert (stats['clipping_files'], stats['clipping_points'], stats['channel_modes']) == (1, 15, {'stereo': 3})
+
+    copy = ResultTable()
+    for result in table.records():
+        copy.upsert(ResultRecord.from_dict(result.to_dict()))
+    assert list(copy.rows()) == list(table.rows())
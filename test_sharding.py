@@ -0,0 +1,72 @@
+import io
+
+import pytest
+
+from Sharding import PartialWriter, in_shard, merge_partials, parse_shard, shard_of
+
+SETTINGS = {'target_rates': [44100, 48000], 'prefetch_files': 2}
+FILES = [f'/corpus/take_{i:03d}.wav' for i in range(200)]
+
+
+def record(file_path, valid=True):
+    return {'file_path': file_path, 'file_name': file_path.rsplit('/', 1)[-1], 'valid': valid,
+            'invalid_reasons': [] if valid else ['Noise Too High'], 'noise_db': -60.0}
+
+
+def write_shard(tmp_path, index, count, finish=True, settings=SETTINGS, checks=('noise',)):
+    stream = io.StringIO()
+    writer = PartialWriter(stream, index, count, checks, settings, ['/corpus'])
+    for file_path in in_shard(FILES, index, count):
+        writer.write(record(file_path, valid=not file_path.endswith('7.wav')))
+    if finish:
+        writer.finish()
+    path = tmp_path / f'shard_{index}.jsonl'
+    path.write_text(stream.getvalue(), encoding='utf-8')
+    return str(path)
+
+
+def test_parse_shard():
+    assert parse_shard('2/4') == (2, 4)
+    for value in ('4/4', '-1/4', '1/0', 'x/4', '1'):
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_shards_partition_the_inputs():
+    skipped = []
+    shards = [list(in_shard(FILES, index, 3)) for index in range(3)]
+    list(in_shard(FILES, 0, 3, skipped=skipped.append))
+    assert sorted(sum(shards, [])) == FILES
+    assert all(shards)
+    assert sorted(skipped + shards[0]) == FILES
+    # The same path lands in the same shard however it is spelled
+    assert shard_of('/corpus/./take_001.wav', 3) == shard_of('/corpus/take_001.wav', 3)
+
+
+def test_merge_round_trip(tmp_path):
+    paths = [write_shard(tmp_path, index, 3) for index in range(3)]
+    table, problems = merge_partials(paths)
+    assert problems == []
+    assert sorted(table.columns['file_path']) == FILES
+    assert table.invalid_count == sum(file_path.endswith('7.wav') for file_path in FILES)
+    assert table.statistics()['noise_db']['count'] == len(FILES)
+
+
+def test_merge_reports_missing_incomplete_and_mismatched_shards(tmp_path):
+    paths = [write_shard(tmp_path, 0, 3), write_shard(tmp_path, 1, 3, finish=False)]
+    table, problems = merge_partials(paths + [paths[0]])
+    assert any('did not finish' in problem for problem in problems)
+    assert any('Missing shard(s) 2 of 3' in problem for problem in problems)
+    assert any('already read' in problem for problem in problems)
+    # What was read is still merged, once
+    assert len(table) == len(list(in_shard(FILES, 0, 3))) + len(list(in_shard(FILES, 1, 3)))
+
+    other = write_shard(tmp_path, 2, 3, settings=dict(SETTINGS, target_rates=[48000]))
+    _, problems = merge_partials(paths[:1] + [other])
+    assert any('different checks or settings' in problem for problem in problems)
+
+
+def test_merge_ignores_machine_local_settings(tmp_path):
+    paths = [write_shard(tmp_path, 0, 2), write_shard(tmp_path, 1, 2, settings=dict(SETTINGS, prefetch_files=0))]
+    _, problems = merge_partials(paths)
+    assert problems == []